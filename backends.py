@@ -0,0 +1,220 @@
+"""
+Registry of the XML <-> JSON backends.
+
+Backends are only imported when first used, so importing this module (or
+fxppreset) does not pull in BeautifulSoup, lxml, xmltodict or pytinyxml2.
+
+    backend = get_backend("lxml_etree_json")
+    json_str = backend.xml_to_json(xml_str)
+    available_backends(streaming=True)
+"""
+
+import importlib
+import importlib.util
+import json
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+import instrument
+
+CAPABILITIES = ("streaming", "round_trip_exact", "typed", "canonical")
+
+# What every backend's xml_to_json accepts. Bytes-like input is parsed as is
+XMLInput = Union[str, bytes, bytearray, memoryview, BinaryIO]
+
+
+class Backend:
+    """
+    A backend module exposing xml_to_json(xml) -> str and json_to_xml(str) -> str.
+
+    xml may be str, bytes, bytearray, memoryview or a binary file object. A
+    module may also provide xml_to_dict (the tree before json.dumps) and
+    json_to_xml_bytes; otherwise they are derived from the two above.
+
+    Capabilities:
+        streaming: output is produced while parsing, without building a tree
+        round_trip_exact: json_to_xml(xml_to_json(x)) gives back x's document
+        typed: values come back as numbers rather than strings
+        canonical: the JSON is in json_normalize's canonical shape and
+            json_to_xml_bytes(json, style) writes it with xml_writer, in
+            the given xml_writer.XMLStyle
+    """
+
+    def __init__(
+        self,
+        name: str,
+        module_name: Optional[str] = None,
+        requires: Tuple[str, ...] = (),
+        **capabilities: bool,
+    ):
+        unknown = set(capabilities) - set(CAPABILITIES)
+        if unknown:
+            raise ValueError(f"Unknown capabilities: {sorted(unknown)}")
+        self.name: str = name
+        self.module_name: str = module_name or name
+        # Third-party modules the backend imports
+        self.requires: Tuple[str, ...] = requires
+        self.capabilities: Dict[str, bool] = {
+            c: capabilities.get(c, False) for c in CAPABILITIES
+        }
+        self._module = None
+
+    def __repr__(self) -> str:
+        return f"Backend({self.name!r})"
+
+    @property
+    def available(self) -> bool:
+        """Whether the backend's dependencies are installed. Does not import them."""
+        if self._module is not None:
+            return True
+        return all(
+            importlib.util.find_spec(name) is not None
+            for name in self.requires + (self.module_name,)
+        )
+
+    @property
+    def module(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.module_name)
+            self._bind()
+        return self._module
+
+    def _bind(self) -> None:
+        # Bind the converters once instead of looking them up on every call.
+        # With instrumentation on, the timed wrappers below are bound instead,
+        # so there is no cost when it is off.
+        module = self._module
+        timed = instrument.enabled()
+        self.xml_to_json = self._timed_xml_to_json if timed else module.xml_to_json
+        self.json_to_xml = self._timed_json_to_xml if timed else module.json_to_xml
+        if hasattr(module, "xml_to_dict"):
+            self.xml_to_dict = self._timed_xml_to_dict if timed else module.xml_to_dict
+        if hasattr(module, "json_to_xml_bytes"):
+            self.json_to_xml_bytes = (
+                self._timed_json_to_xml_bytes if timed else module.json_to_xml_bytes
+            )
+
+    def _timed_xml_to_json(self, xml: XMLInput) -> str:
+        xml_to_dict = getattr(self._module, "xml_to_dict", None)
+        if xml_to_dict is None:
+            with instrument.stage("xml_to_json", instrument.size(xml)):
+                return self._module.xml_to_json(xml)
+        # Same as the module's xml_to_json, split into its two stages
+        with instrument.stage("parse", instrument.size(xml)):
+            tree = xml_to_dict(xml)
+        with instrument.stage("dump") as stage:
+            json_str = json.dumps(tree, indent=4)
+            stage.add_bytes(len(json_str))
+        return json_str
+
+    def _timed_xml_to_dict(self, xml: XMLInput) -> dict:
+        with instrument.stage("parse", instrument.size(xml)):
+            return self._module.xml_to_dict(xml)
+
+    def _timed_json_to_xml(self, json_str: Union[str, bytes], *style) -> str:
+        with instrument.stage("json_to_xml", len(json_str)):
+            return self._module.json_to_xml(json_str, *style)
+
+    def _timed_json_to_xml_bytes(self, json_str: Union[str, bytes], *style) -> bytes:
+        with instrument.stage("json_to_xml", len(json_str)):
+            return self._module.json_to_xml_bytes(json_str, *style)
+
+    # These run only until the module is imported, which binds the converters
+    # over them (or, for the last two, when the module doesn't provide them)
+
+    def xml_to_json(self, xml: XMLInput) -> str:
+        self.module
+        return self.xml_to_json(xml)
+
+    def json_to_xml(self, json_str: Union[str, bytes], *style) -> str:
+        self.module
+        return self.json_to_xml(json_str, *style)
+
+    def xml_to_dict(self, xml: XMLInput) -> dict:
+        """The parsed tree, without a json.dumps/json.loads round trip if possible."""
+        if hasattr(self.module, "xml_to_dict"):
+            return self.xml_to_dict(xml)
+        return json.loads(self.xml_to_json(xml))
+
+    def json_to_xml_bytes(self, json_str: Union[str, bytes], *style) -> bytes:
+        """UTF-8 XML, for writing straight into a preset."""
+        if hasattr(self.module, "json_to_xml_bytes"):
+            return self.json_to_xml_bytes(json_str, *style)
+        return self.json_to_xml(json_str, *style).encode("utf-8")
+
+
+_registry: Dict[str, Backend] = {}
+
+
+def register(backend: Backend) -> Backend:
+    _registry[backend.name] = backend
+    return backend
+
+
+def get_backend(name: str) -> Backend:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError(
+            f"Unknown backend {name!r}, expected one of {sorted(_registry)}"
+        ) from None
+
+
+def backend_names() -> List[str]:
+    """All registered backends, installed or not."""
+    return sorted(_registry)
+
+
+def available_backends(**capabilities: bool) -> List[str]:
+    """Installed backends, optionally filtered, e.g. available_backends(streaming=True)."""
+    return [
+        name
+        for name in backend_names()
+        if _registry[name].available
+        and all(_registry[name].capabilities[c] == v for c, v in capabilities.items())
+    ]
+
+
+def _rebind_all() -> None:
+    for backend in _registry.values():
+        if backend._module is not None:
+            backend._bind()
+
+
+instrument.on_change(_rebind_all)
+
+# bs4 uses lxml for its "xml" parser; pytinyxml2_json borrows helpers from
+# the lxml backends. Canonical backends write XML with
+# xml_writer, which gives back the layout of Surge's own files.
+register(Backend("bs4_json", requires=("bs4", "lxml")))
+register(
+    Backend(
+        "lxml_etree_iterparse_json",
+        requires=("lxml",),
+        round_trip_exact=True,
+        canonical=True,
+    )
+)
+register(Backend("lxml_etree_json", requires=("lxml",)))
+register(
+    Backend(
+        "lxml_etree_sax_json", requires=("lxml",), round_trip_exact=True, canonical=True
+    )
+)
+register(
+    Backend(
+        "lxml_etree_stream_json",
+        requires=("lxml",),
+        streaming=True,
+        round_trip_exact=True,
+        canonical=True,
+    )
+)
+register(
+    Backend(
+        "pytinyxml2_json",
+        requires=("pytinyxml2", "lxml"),
+        round_trip_exact=True,
+        canonical=True,
+    )
+)
+register(Backend("xmltodict_json", requires=("xmltodict",)))
@@ -0,0 +1,288 @@
+"""
+Benchmark the XML <-> JSON backends on synthetic Surge-shaped patches.
+
+    python benchmark.py -o results.json
+    python benchmark.py --backends lxml_etree_json xmltodict_json --sizes medium
+    python benchmark.py -o new.json --compare results.json
+    python benchmark.py --validation
+
+For each backend and patch size, xml_to_json is timed on the patch and
+json_to_xml on that backend's own JSON. Reported per direction: p50/p99/mean
+latency, throughput, tracemalloc peak of one call, and the peak RSS of the
+(fresh) process that ran the backend.
+
+--validation instead measures what each typeguard validation level (see
+validation.py) adds to loading and re-serializing one preset.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from backends import available_backends, get_backend
+
+# Number of parameters per synthetic patch. A Surge XT patch has ~800.
+SIZES: Dict[str, int] = {"small": 100, "medium": 800, "large": 8000}
+
+_GROUPS = ["osc1", "osc2", "osc3", "filter1", "filter2", "env1", "env2", "lfo1"]
+_FIELDS = ["pitch", "octave", "cutoff", "resonance", "attack", "decay", "rate"]
+
+
+def synthetic_patch_xml(num_params: int, seed: int = 0) -> str:
+    """Surge-style patch XML with num_params parameters, some with modroutings."""
+    rng = random.Random(seed)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>',
+        '<patch revision="16">',
+        f'    <meta name="Synthetic {seed}" category="Bench" comment="" author="benchmark" />',
+        "    <parameters>",
+    ]
+    for i in range(num_params):
+        scene = "ab"[i % 2]
+        name = f"{scene}_{_GROUPS[i // 2 % len(_GROUPS)]}_{_FIELDS[i // 16 % len(_FIELDS)]}{i // 112}"
+        type_ = rng.choice((0, 1, 2, 2, 2))
+        value = rng.uniform(-10, 10) if type_ == 2 else rng.randint(0, 8)
+        if i % 7:
+            lines.append(f'        <{name} type="{type_}" value="{value}" />')
+            continue
+        lines.append(f'        <{name} type="{type_}" value="{value}">')
+        for _ in range(rng.randint(1, 3)):
+            lines.append(
+                f'            <modrouting source="{rng.randint(1, 40)}" '
+                f'depth="{rng.uniform(-1, 1):.6f}" muted="{rng.randint(0, 1)}" '
+                f'source_index="{rng.randint(0, 3)}" />'
+            )
+        lines.append(f"        </{name}>")
+    lines += ["    </parameters>", "</patch>", ""]
+    return "\n".join(lines)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest-rank percentile
+    i = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[i]
+
+
+def _time(func, arg, repeats: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        "p50_ms": _percentile(timings, 50) * 1e3,
+        "p99_ms": _percentile(timings, 99) * 1e3,
+        "mean_ms": mean * 1e3,
+        "docs_per_s": 1 / mean,
+        "tracemalloc_peak_bytes": peak,
+    }
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_backend(name: str, sizes: List[str], repeats: int) -> List[dict]:
+    """Benchmark one backend on every size. Meant to run in a fresh process."""
+    backend = get_backend(name)
+    results = []
+    for size in sizes:
+        xml_str = synthetic_patch_xml(SIZES[size])
+        json_str = None
+        for direction in ("xml_to_json", "json_to_xml"):
+            result = {"backend": name, "size": size, "direction": direction}
+            try:
+                if direction == "xml_to_json":
+                    func, arg = backend.xml_to_json, xml_str
+                else:
+                    func, arg = backend.json_to_xml, json_str
+                if arg is None:
+                    raise RuntimeError("xml_to_json failed, nothing to convert back")
+                result["input_bytes"] = len(arg.encode("utf-8"))
+                output = func(arg)
+                if direction == "xml_to_json":
+                    json_str = output
+                result.update(_time(func, arg, repeats))
+                result["throughput_mb_s"] = (
+                    result["input_bytes"] * result["docs_per_s"] / 1e6
+                )
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            result["max_rss_bytes"] = _max_rss_bytes()
+            results.append(result)
+    return results
+
+
+def run(backends: List[str], sizes: List[str], repeats: int) -> dict:
+    results = []
+    # One fresh process per backend so max RSS and imports are not shared
+    context = multiprocessing.get_context("spawn")
+    for name in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results += executor.submit(run_backend, name, sizes, repeats).result()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "repeats": repeats,
+            "sizes": {size: SIZES[size] for size in sizes},
+        },
+        "results": results,
+    }
+
+
+def synthetic_fxp_bytes(num_params: int, seed: int = 0) -> bytes:
+    """A complete .fxp file around synthetic_patch_xml."""
+    from fxppreset import FXP, PatchHeader
+
+    xml = synthetic_patch_xml(num_params, seed).encode("utf-8")
+    patch_header = PatchHeader(b"sub3", len(xml), 0, 0, 0, 0, 0, 0)
+    fxp = FXP(
+        b"CcnK",
+        0,
+        b"FPCh",
+        1,
+        int.from_bytes(b"cjs3", "big"),
+        1,
+        1,
+        f"Synthetic {seed}",
+        32 + len(xml),
+        patch_header,
+        xml,
+        [b""],
+    )
+    return fxp.to_bytes()
+
+
+def validation_cost(size: str = "medium", repeats: int = 2000) -> List[dict]:
+    """Mean time of FXP.load + to_bytes (no XML parsing) at each validation level."""
+    import validation
+    from fxppreset import FXP
+
+    data = synthetic_fxp_bytes(SIZES[size])
+
+    def load(data):
+        FXP.load(data).to_bytes()
+
+    previous = validation.validation_level()
+    results = []
+    try:
+        for level in validation.LEVELS:
+            validation.set_validation_level(level)
+            load(data)  # instrument outside the timed loop
+            timing = _time(load, data, repeats)
+            results.append({"level": level, "size": size, **timing})
+    finally:
+        validation.set_validation_level(previous)
+    return results
+
+
+def format_validation_table(results: List[dict]) -> str:
+    base = results[0]["mean_ms"]
+    lines = [f"{'level':10} {'p50 us':>9} {'mean us':>9} {'overhead us':>12}"]
+    for r in results:
+        lines.append(
+            f"{r['level']:10} {r['p50_ms'] * 1e3:9.1f} {r['mean_ms'] * 1e3:9.1f} "
+            f"{(r['mean_ms'] - base) * 1e3:12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(old: dict, new: dict, threshold: float) -> List[str]:
+    """Regressions: p50 latency more than threshold (e.g. 0.1 = 10%) above old."""
+
+    def key(r):
+        return r["backend"], r["size"], r["direction"]
+
+    before = {key(r): r for r in old["results"] if "error" not in r}
+    regressions = []
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None or "error" in r:
+            continue
+        if r["p50_ms"] > o["p50_ms"] * (1 + threshold):
+            regressions.append(
+                f"{r['backend']} {r['size']} {r['direction']}: "
+                f"p50 {o['p50_ms']:.3f}ms -> {r['p50_ms']:.3f}ms"
+            )
+    return regressions
+
+
+def format_table(report: dict) -> str:
+    lines = [
+        f"{'backend':28} {'size':7} {'direction':12} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'MB/s':>8} {'peak KiB':>9} {'RSS MiB':>8}"
+    ]
+    for r in report["results"]:
+        prefix = f"{r['backend']:28} {r['size']:7} {r['direction']:12}"
+        if "error" in r:
+            lines.append(f"{prefix} {r['error']}")
+            continue
+        rss = r["max_rss_bytes"]
+        lines.append(
+            f"{prefix} {r['p50_ms']:9.3f} {r['p99_ms']:9.3f} "
+            f"{r['throughput_mb_s']:8.2f} {r['tracemalloc_peak_bytes'] / 1024:9.0f} "
+            f"{rss / 2**20 if rss else float('nan'):8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=None)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("-n", "--repeats", type=int, default=20)
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--compare", help="previous results JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--validation",
+        action="store_true",
+        help="measure the per-load cost of each validation level instead",
+    )
+    args = parser.parse_args(argv)
+
+    if args.validation:
+        print(format_validation_table(validation_cost()))
+        return 0
+
+    report = run(args.backends or available_backends(), args.sizes, args.repeats)
+    print(format_table(report))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
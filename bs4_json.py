@@ -4,8 +4,10 @@ from collections import defaultdict
 import bs4
 from bs4 import BeautifulSoup
 
+from lxml_etree_json import XMLInput, xml_bytes
 
-def xml_to_json(xml_string: str) -> str:
+
+def xml_to_dict(xml_string: XMLInput) -> dict:
     def element_to_dict(element):
         elem_dict = {element.name: {}}
 
@@ -37,9 +39,16 @@ def xml_to_json(xml_string: str) -> str:
 
         return elem_dict
 
+    if not isinstance(xml_string, str):
+        # BeautifulSoup takes bytes, not other buffers
+        xml_string = bytes(xml_bytes(xml_string))
     soup = BeautifulSoup(xml_string, "xml")
     root = soup.find()
-    return json.dumps(element_to_dict(root), indent=4)
+    return element_to_dict(root)
+
+
+def xml_to_json(xml_string: XMLInput) -> str:
+    return json.dumps(xml_to_dict(xml_string), indent=4)
 
 
 def json_to_xml(json_string: str) -> str:
@@ -0,0 +1,210 @@
+"""
+asyncio front end for preset I/O and conversion.
+
+Blocking file I/O runs in asyncio's default thread pool; the CPU-bound
+xml_to_json/json_to_xml calls run in the converter's executor, at most
+max_concurrency at a time, so a burst of conversions queues up instead of
+stalling the event loop or swamping the workers.
+
+    configure(executor=ProcessPoolExecutor(), max_concurrency=8)
+    fxp = await FXP.aload(request_body)  # path, bytes or (async) stream
+    json_str = await fxp.ajson()
+    await fxp.asave(writer)
+    summary = await convert_library(src_dir, dst_dir)
+"""
+
+import asyncio
+import inspect
+import os
+import time
+import weakref
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, Union
+
+from backends import get_backend
+from fxpbatch import (
+    FXP_SUFFIX,
+    JSON_SUFFIX,
+    BatchSummary,
+    _convert_one,
+    iter_files,
+    output_path,
+)
+from fxpcache import ConversionCache, content_key
+from fxppreset import DEFAULT_BACKEND
+
+
+def _xml_to_json(backend: str, xml: Union[str, bytes]) -> str:
+    # Top-level so a ProcessPoolExecutor can pickle it
+    return get_backend(backend).xml_to_json(xml)
+
+
+def _json_to_xml(backend: str, json_str: str) -> str:
+    return get_backend(backend).json_to_xml(json_str)
+
+
+def _json_to_xml_bytes(backend: str, json_str: str, *style) -> bytes:
+    # style: an xml_writer.XMLStyle, for canonical backends only
+    return get_backend(backend).json_to_xml_bytes(json_str, *style)
+
+
+class AsyncConverter:
+    def __init__(
+        self, executor: Optional[Executor] = None, max_concurrency: Optional[int] = None
+    ):
+        # None means the event loop's default (thread pool) executor. Pure
+        # Python backends hold the GIL, so a ProcessPoolExecutor scales better.
+        self.executor: Optional[Executor] = executor
+        self.max_concurrency: int = max_concurrency or 2 * (os.cpu_count() or 1)
+        # One per event loop, created on first use inside it: a semaphore is
+        # bound to the loop it first waits in, and a converter outlives loops
+        # (each asyncio.run() has its own)
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def run(self, func: Callable, *args) -> Any:
+        """func(*args) in the executor, waiting for a free slot first."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def xml_to_json(
+        self,
+        xml: Union[str, bytes],
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> str:
+        if cache is None:
+            return await self.run(_xml_to_json, backend, xml)
+        key = content_key(xml, backend)
+        # The disk tier does blocking I/O, the memory tier doesn't
+        if cache.directory is None:
+            json_str = cache.get(key)
+        else:
+            json_str = await asyncio.to_thread(cache.get, key)
+        if json_str is None:
+            json_str = await self.run(_xml_to_json, backend, xml)
+            if cache.directory is None:
+                cache.put(key, json_str)
+            else:
+                await asyncio.to_thread(cache.put, key, json_str)
+        return json_str
+
+    async def json_to_xml(self, json_str: str, backend: str = DEFAULT_BACKEND) -> str:
+        return await self.run(_json_to_xml, backend, json_str)
+
+    async def json_to_xml_bytes(
+        self, json_str: str, backend: str = DEFAULT_BACKEND, *style
+    ) -> bytes:
+        return await self.run(_json_to_xml_bytes, backend, json_str, *style)
+
+
+_converter = AsyncConverter()
+
+
+def configure(
+    executor: Optional[Executor] = None, max_concurrency: Optional[int] = None
+) -> AsyncConverter:
+    """Replace the converter used when none is passed explicitly."""
+    global _converter
+    _converter = AsyncConverter(executor, max_concurrency)
+    return _converter
+
+
+def get_converter() -> AsyncConverter:
+    return _converter
+
+
+def _read_file(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_file(path, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+async def read_source(source: Any) -> Union[bytes, bytearray, memoryview]:
+    """Contents of a path, bytes-like object, or sync or async binary stream."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return await asyncio.to_thread(_read_file, source)
+    if inspect.iscoroutinefunction(source.read):
+        return await source.read()
+    # A sync stream blocks, so it is read in a thread like a file
+    data = await asyncio.to_thread(source.read)
+    if inspect.isawaitable(data):
+        data = await data
+    return data
+
+
+async def write_target(target: Any, data: bytes) -> None:
+    """Write data to a path, or to a sync or async binary stream."""
+    if isinstance(target, (str, os.PathLike)):
+        await asyncio.to_thread(_write_file, target, data)
+        return
+    drain = getattr(target, "drain", None)
+    if drain is not None:
+        # asyncio.StreamWriter: write() only buffers and must stay on the
+        # loop; wait for the transport's buffer to drain
+        target.write(data)
+        await drain()
+    elif inspect.iscoroutinefunction(target.write):
+        await target.write(data)
+    else:
+        # A sync stream blocks, so it is written in a thread like a file
+        written = await asyncio.to_thread(target.write, data)
+        if inspect.isawaitable(written):
+            await written
+
+
+async def convert_library(
+    src_dir: str,
+    dst_dir: str,
+    reverse: bool = False,
+    converter: Optional[AsyncConverter] = None,
+    backend: Optional[str] = None,
+) -> BatchSummary:
+    """
+    fxpbatch.convert_library for use inside an event loop: each file is
+    converted in the converter's executor, with at most max_concurrency
+    files in flight. backend defaults to FXP's DEFAULT_BACKEND.
+    """
+    converter = converter or get_converter()
+    src_suffix, dst_suffix = (
+        (JSON_SUFFIX, FXP_SUFFIX) if reverse else (FXP_SUFFIX, JSON_SUFFIX)
+    )
+    summary = BatchSummary()
+    start = time.perf_counter()
+
+    async def convert(src_path: str) -> None:
+        dst_path = output_path(src_path, src_dir, dst_dir, dst_suffix)
+        # Stage timings are recorded by whichever process ran the conversion
+        src_path, error, _ = await converter.run(
+            _convert_one, src_path, dst_path, reverse, backend
+        )
+        if error is None:
+            summary.converted += 1
+        else:
+            summary.failed += 1
+            summary.errors.append((src_path, error))
+
+    src_paths = await asyncio.to_thread(list, iter_files(src_dir, src_suffix))
+    in_flight = set()
+    for src_path in src_paths:
+        if len(in_flight) >= converter.max_concurrency:
+            done, in_flight = await asyncio.wait(
+                in_flight, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                task.result()
+        in_flight.add(asyncio.ensure_future(convert(src_path)))
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+    summary.elapsed = time.perf_counter() - start
+    return summary
@@ -0,0 +1,411 @@
+"""
+FXB banks: a bank header followed by numPrograms programs, each framed
+exactly like a .fxp file (FXP header, PatchHeader, XML, wavetables).
+
+FXBReader maps the bank and indexes it in one pass over the headers only,
+hopping from program to program by chunkSize; no XML is read until a
+program is asked for, and then only that program's:
+
+    with FXBReader("bank.fxb") as bank:
+        print(len(bank), bank.names)
+        fxp = bank[3]                   # just program 3, as an FXP
+        with bank.reader(3) as reader:  # or zero-copy, see FXPReader
+            reader.patchHeader.xmlSize
+
+FXB is the editable bank. Programs that were never replaced or modified
+are written straight from the source mapping on save, without being parsed
+or re-serialized:
+
+    bank = FXB.load("bank.fxb")
+    bank[3].set_param("a_volume", value=0.5)
+    bank.append(FXP.load("lead.fxp"))
+    bank.save("bank.fxb")
+
+    python fxpbank.py list bank.fxb
+    python fxpbank.py split bank.fxb programs/
+    python fxpbank.py join bank.fxb programs/*.fxp
+"""
+
+import argparse
+import os
+import re
+import sys
+from typing import BinaryIO, ByteString, Iterator, List, Optional, Union
+
+import instrument
+from fxpcache import ConversionCache
+from fxpheader import (
+    BANK_HEADER,
+    BANK_HEADER_SIZE,
+    BANK_MAGIC,
+    FXP_HEADER,
+    FXP_HEADER_SIZE,
+    OPAQUE_BANK_MAGIC,
+    PATCH_HEADER,
+    XML_OFFSET,
+)
+from fxppreset import DEFAULT_BACKEND, FXP, FXPReader, map_source
+from validation import validated
+
+FXB_SUFFIX = ".fxb"
+FXP_CHUNK_MAGIC = b"FPCh"
+
+
+class ProgramEntry:
+    """Where one program of a bank lies, from its headers alone."""
+
+    __slots__ = ("offset", "size", "prgName", "xmlSize")
+
+    def __init__(self, offset: int, size: int, prgName: str, xmlSize: int):
+        # Start of the program's FXP header, and its length including it
+        self.offset = offset
+        self.size = size
+        self.prgName = prgName
+        self.xmlSize = xmlSize
+
+    @property
+    def xml_offset(self) -> int:
+        return self.offset + XML_OFFSET
+
+    @property
+    def wavetable_offset(self) -> int:
+        return self.offset + XML_OFFSET + self.xmlSize
+
+    @property
+    def wavetable_size(self) -> int:
+        return self.offset + self.size - self.wavetable_offset
+
+    def __repr__(self) -> str:
+        return f"ProgramEntry({self.prgName!r}, offset={self.offset}, size={self.size})"
+
+
+@validated
+class FXBReader:
+    """
+    Read-only, indexed view of a bank. source is a path (memory-mapped) or
+    any bytes-like object. Views handed out by program_view/reader must be
+    released before close().
+    """
+
+    def __init__(self, source: Union[str, ByteString, memoryview]):
+        self._mmap, self._buffer = map_source(source, BANK_HEADER_SIZE, "an FXB file")
+        try:
+            with instrument.stage("header") as stage:
+                self._unpack_header()
+                self.entries: List[ProgramEntry] = self._index()
+                stage.add_bytes(BANK_HEADER_SIZE + XML_OFFSET * len(self.entries))
+        except Exception:
+            self.close()
+            raise
+
+    def _unpack_header(self) -> None:
+        (
+            self.chunkmagic,
+            self.byteSize,
+            self.fxMagic,
+            self.version,
+            self.fxId,
+            self.fxVersion,
+            self.numPrograms,
+            # Reserved; format version 2 keeps the current program here
+            self.future,
+        ) = BANK_HEADER.unpack_from(self._buffer, 0)
+        assert self.chunkmagic == b"CcnK", "Chunk magic must be 'CcnK'"
+        if self.fxMagic == OPAQUE_BANK_MAGIC:
+            raise ValueError(
+                "Bank is saved as one opaque chunk (FBCh), it has no separate programs"
+            )
+        assert self.fxMagic == BANK_MAGIC, "FX magic must be 'FxBk'"
+
+    def _index(self) -> List[ProgramEntry]:
+        entries = []
+        offset = BANK_HEADER_SIZE
+        end = len(self._buffer)
+        for i in range(self.numPrograms):
+            if offset + XML_OFFSET > end:
+                raise ValueError(f"Program {i} at byte {offset} runs past the bank")
+            fields = FXP_HEADER.unpack_from(self._buffer, offset)
+            assert fields[2] == FXP_CHUNK_MAGIC, f"Program {i} FX magic must be 'FPCh'"
+            size = FXP_HEADER_SIZE + fields[8]
+            patch_fields = PATCH_HEADER.unpack_from(
+                self._buffer, offset + FXP_HEADER_SIZE
+            )
+            xml_size = patch_fields[1]
+            if offset + size > end or XML_OFFSET + xml_size > size:
+                raise ValueError(f"Program {i} at byte {offset} runs past the bank")
+            name = fields[7].strip(b"\x00").decode("utf-8", "replace")
+            entries.append(ProgramEntry(offset, size, name, xml_size))
+            offset += size
+        return entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def names(self) -> List[str]:
+        return [entry.prgName for entry in self.entries]
+
+    def program_view(self, i: int) -> memoryview:
+        """The program's bytes, a complete .fxp file, without copying."""
+        entry = self.entries[i]
+        return self._buffer[entry.offset : entry.offset + entry.size]
+
+    def reader(self, i: int) -> FXPReader:
+        return FXPReader(self.program_view(i))
+
+    def load(
+        self,
+        i: int,
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> FXP:
+        """Program i as an FXP; only its headers are parsed until its XML is used."""
+        view = self.program_view(i)
+        try:
+            with instrument.record(f"program {i}"), FXPReader(view) as reader:
+                return reader.to_fxp(backend, cache)
+        finally:
+            view.release()
+
+    def __getitem__(self, i: int) -> FXP:
+        return self.load(i)
+
+    def __iter__(self) -> Iterator[FXP]:
+        for i in range(len(self)):
+            yield self.load(i)
+
+    def close(self) -> None:
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "FXBReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@validated(boundary=("load", "save", "append", "from_programs"))
+class FXB:
+    def __init__(
+        self,
+        fxId: int,
+        fxVersion: int,
+        version: int = 1,
+        byteSize: int = 0,
+        future: bytes = bytes(128),
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ):
+        self.chunkmagic: bytes = b"CcnK"
+        self.fxMagic: bytes = BANK_MAGIC
+        self.version: int = version
+        self.fxId: int = fxId
+        self.fxVersion: int = fxVersion
+        self.byteSize: int = byteSize
+        self.future: bytes = future
+        self.backend: str = backend
+        self.cache: Optional[ConversionCache] = cache
+        # An FXP, or the index of an untouched program of self._reader
+        self._programs: List[Union[int, FXP]] = []
+        self._reader: Optional[FXBReader] = None
+
+    @staticmethod
+    def load(
+        source: Union[str, ByteString, memoryview],
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> "FXB":
+        """
+        Index a bank. The source stays mapped until close(): programs are
+        loaded from it on first access and untouched ones are saved from it.
+        """
+        reader = FXBReader(source)
+        bank = FXB(
+            reader.fxId,
+            reader.fxVersion,
+            reader.version,
+            reader.byteSize,
+            reader.future,
+            backend,
+            cache,
+        )
+        bank._reader = reader
+        bank._programs = list(range(len(reader)))
+        return bank
+
+    @staticmethod
+    def from_programs(
+        programs: List[FXP],
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> "FXB":
+        """A new bank of programs; fxId and fxVersion come from the first one."""
+        assert programs, "A bank needs at least one program to take its fxId from"
+        bank = FXB(
+            programs[0].fxId, programs[0].fxVersion, backend=backend, cache=cache
+        )
+        bank._programs = list(programs)
+        return bank
+
+    def __len__(self) -> int:
+        return len(self._programs)
+
+    def __getitem__(self, i: int) -> FXP:
+        """Program i, loaded from the source bank on first access."""
+        program = self._programs[i]
+        if isinstance(program, int):
+            program = self._reader.load(program, self.backend, self.cache)
+            # Unmodified, it still saves byte-identical to the original
+            self._programs[i] = program
+        return program
+
+    def __setitem__(self, i: int, program: FXP) -> None:
+        self._programs[i] = program
+
+    def __delitem__(self, i: int) -> None:
+        del self._programs[i]
+
+    def append(self, program: FXP) -> None:
+        self._programs.append(program)
+
+    @property
+    def names(self) -> List[str]:
+        return [
+            self._reader.entries[p].prgName if isinstance(p, int) else p.prgName
+            for p in self._programs
+        ]
+
+    def _chunks(self) -> List[ByteString]:
+        # Untouched programs are views of the source mapping
+        chunks: List[ByteString] = []
+        for program in self._programs:
+            if isinstance(program, int):
+                chunks.append(self._reader.program_view(program))
+            else:
+                chunks.extend(program._serialize())
+        size = BANK_HEADER_SIZE + sum(len(c) for c in chunks)
+        # As with FXP: byteSize stays 0 if it was, else counts what follows it
+        byte_size = self.byteSize and size - 8
+        header = BANK_HEADER.pack(
+            self.chunkmagic,
+            byte_size,
+            self.fxMagic,
+            self.version,
+            self.fxId,
+            self.fxVersion,
+            len(self._programs),
+            self.future,
+        )
+        return [header] + chunks
+
+    def _release(self, chunks: List[ByteString]) -> None:
+        for chunk in chunks:
+            if isinstance(chunk, memoryview):
+                chunk.release()
+
+    def to_bytes(self) -> bytes:
+        chunks = self._chunks()
+        try:
+            return b"".join(chunks)
+        finally:
+            self._release(chunks)
+
+    def save(self, target: Union[str, BinaryIO]) -> None:
+        """
+        Write the bank to a path or a binary stream. A path is written to a
+        temporary file and renamed over, so a bank can be saved over its own
+        (still mapped) source.
+        """
+        with instrument.record(target if isinstance(target, str) else "<stream>"):
+            chunks = self._chunks()
+            try:
+                with instrument.stage("write", sum(len(c) for c in chunks)):
+                    if isinstance(target, str):
+                        tmp_path = target + ".tmp"
+                        with open(tmp_path, "wb") as f:
+                            f.writelines(chunks)
+                        os.replace(tmp_path, target)
+                    else:
+                        target.writelines(chunks)
+            finally:
+                self._release(chunks)
+
+    def close(self) -> None:
+        """Release the source bank. Load any programs still needed first."""
+        if self._reader is not None:
+            for i in range(len(self._programs)):
+                if isinstance(self._programs[i], int):
+                    self[i]
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self) -> "FXB":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _file_name(i: int, name: str) -> str:
+    safe = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", name).strip() or "program"
+    return f"{i:03d} {safe}.fxp"
+
+
+def split_bank(source: str, out_dir: str) -> List[str]:
+    """Write each program to out_dir as its own .fxp, byte for byte, unparsed."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    with FXBReader(source) as reader:
+        for i, entry in enumerate(reader.entries):
+            path = os.path.join(out_dir, _file_name(i, entry.prgName))
+            view = reader.program_view(i)
+            try:
+                with open(path, "wb") as f:
+                    f.write(view)
+            finally:
+                view.release()
+            paths.append(path)
+    return paths
+
+
+def join_programs(paths: List[str], target: str) -> FXB:
+    """Bank of the given .fxp files, in order. Their XML is not parsed."""
+    bank = FXB.from_programs([FXP.load(path) for path in paths])
+    bank.save(target)
+    return bank
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Read, split and join FXB banks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="list a bank's programs")
+    list_parser.add_argument("bank")
+    split_parser = commands.add_parser("split", help="write each program as .fxp")
+    split_parser.add_argument("bank")
+    split_parser.add_argument("out_dir")
+    join_parser = commands.add_parser("join", help="build a bank from .fxp files")
+    join_parser.add_argument("bank")
+    join_parser.add_argument("programs", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        with FXBReader(args.bank) as reader:
+            for i, entry in enumerate(reader.entries):
+                print(
+                    f"{i:4} {entry.prgName:28} {entry.xmlSize:9} XML "
+                    f"{entry.wavetable_size:9} wavetable bytes"
+                )
+    elif args.command == "split":
+        paths = split_bank(args.bank, args.out_dir)
+        print(f"{len(paths)} programs written to {args.out_dir}")
+    else:
+        bank = join_programs(args.programs, args.bank)
+        print(f"{len(bank)} programs written to {args.bank}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Bulk conversion of whole preset libraries, FXP -> JSON or JSON -> FXP.
+
+    python fxpbatch.py "/Library/Application Support/Surge XT/patches_3rdparty" out/
+    python fxpbatch.py --reverse out/ roundtrip/
+    python fxpbatch.py --profile profile.json patches/ out/
+    python fxpbatch.py --backend lxml_etree_iterparse_json patches/ out/
+
+Files are converted in a process pool. At most ``max_in_flight`` conversions
+are queued at any time, so walking a huge tree never builds a huge backlog of
+futures. A failing file is recorded and the run carries on. With --profile,
+each worker times every conversion stage (see instrument.py) and the
+per-file records plus stage histograms are written as JSON.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+import instrument
+from validation import BOUNDARY, ENV_VAR, LEVELS, use_validation_level
+
+FXP_SUFFIX = ".fxp"
+JSON_SUFFIX = ".json"
+# Typeguard level of the command-line tools, unless FXP2JSON_VALIDATION or
+# --validation says otherwise: "full" costs about 20x per load
+# (benchmark.py --validation), in every worker
+CLI_VALIDATION = BOUNDARY
+
+
+class BatchSummary:
+    def __init__(self):
+        self.converted: int = 0
+        self.failed: int = 0
+        self.elapsed: float = 0.0
+        # (source path, formatted exception)
+        self.errors: List[Tuple[str, str]] = []
+        # Per-file stage timings, when profiling
+        self.recorder: Optional[instrument.Recorder] = None
+
+    @property
+    def total(self) -> int:
+        return self.converted + self.failed
+
+    @property
+    def files_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.total} files in {self.elapsed:.2f}s "
+            f"({self.files_per_second:.1f} files/s): "
+            f"{self.converted} converted, {self.failed} failed"
+        )
+
+
+def iter_files(src_dir: str, suffix: str) -> Iterator[str]:
+    """Walk src_dir lazily, yielding files that end with suffix (case-insensitive)."""
+    for dirpath, dirnames, filenames in os.walk(src_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(suffix):
+                yield os.path.join(dirpath, filename)
+
+
+def output_path(src_path: str, src_dir: str, dst_dir: str, suffix: str) -> str:
+    rel = os.path.relpath(src_path, src_dir)
+    return os.path.join(dst_dir, os.path.splitext(rel)[0] + suffix)
+
+
+def resolve_backend(name: Optional[str]) -> str:
+    """name, or FXP's default backend if None. ValueError if not installed."""
+    from backends import available_backends, get_backend
+    from fxppreset import DEFAULT_BACKEND
+
+    name = name or DEFAULT_BACKEND
+    if not get_backend(name).available:
+        raise ValueError(
+            f"Backend {name!r} is not installed, " f"use one of {available_backends()}"
+        )
+    return name
+
+
+def add_validation_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--validation",
+        choices=LEVELS,
+        help=f"typeguard checking (default: ${ENV_VAR}, else {CLI_VALIDATION})",
+    )
+
+
+def fxp_to_json_file(
+    src_path: str, dst_path: str, backend: Optional[str] = None
+) -> None:
+    from fxppreset import DEFAULT_BACKEND, FXP
+
+    fxp = FXP.load(src_path, backend or DEFAULT_BACKEND)
+    json_str = fxp.to_json_document()
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    with instrument.stage("write", len(json_str)):
+        with open(dst_path, "w", encoding="utf-8") as f:
+            f.write(json_str)
+
+
+def json_to_fxp_file(
+    src_path: str, dst_path: str, backend: Optional[str] = None
+) -> None:
+    from fxppreset import DEFAULT_BACKEND, FXP
+
+    with open(src_path, "r", encoding="utf-8") as f:
+        fxp = FXP.from_json_document(f.read(), backend or DEFAULT_BACKEND)
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    fxp.save(dst_path)
+
+
+def _convert_one(
+    src_path: str, dst_path: str, reverse: bool, backend: Optional[str] = None
+) -> Tuple[str, Optional[str], Optional[dict]]:
+    # Runs in a worker process. Never raise: the error travels back as text
+    # so one bad preset (or an unpicklable exception) can't kill the run.
+    # The stage timings travel back too, if the worker is instrumented.
+    error = None
+    with instrument.record(src_path) as record:
+        try:
+            if reverse:
+                json_to_fxp_file(src_path, dst_path, backend)
+            else:
+                fxp_to_json_file(src_path, dst_path, backend)
+        except Exception:
+            error = traceback.format_exc()
+    if not isinstance(record, instrument.Record):
+        return src_path, error, None
+    return src_path, error, record.to_dict()
+
+
+def _enable_profiling() -> None:
+    # Worker initializer; the parent aggregates the records sent back
+    instrument.enable(instrument.Recorder(max_records=1))
+
+
+def convert_library(
+    src_dir: str,
+    dst_dir: str,
+    reverse: bool = False,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    profile: bool = False,
+    backend: Optional[str] = None,
+) -> BatchSummary:
+    """
+    Convert every preset under src_dir into the same relative layout under dst_dir.
+
+    reverse=False converts .fxp -> .json, reverse=True converts .json -> .fxp.
+    max_in_flight bounds the number of submitted-but-unfinished conversions
+    (default: 4 per worker). profile=True collects stage timings into
+    summary.recorder. backend defaults to FXP's DEFAULT_BACKEND.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 4 * max_workers
+    src_suffix, dst_suffix = (
+        (JSON_SUFFIX, FXP_SUFFIX) if reverse else (FXP_SUFFIX, JSON_SUFFIX)
+    )
+
+    summary = BatchSummary()
+    if profile:
+        summary.recorder = instrument.Recorder()
+    start = time.perf_counter()
+
+    def collect(done) -> None:
+        for future in done:
+            src_path, error, record = future.result()
+            if record is not None and summary.recorder is not None:
+                summary.recorder.add_record(record)
+            if error is None:
+                summary.converted += 1
+            else:
+                summary.failed += 1
+                summary.errors.append((src_path, error))
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_enable_profiling if profile else None,
+    ) as executor:
+        in_flight = set()
+        for src_path in iter_files(src_dir, src_suffix):
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            dst_path = output_path(src_path, src_dir, dst_dir, dst_suffix)
+            in_flight.add(
+                executor.submit(_convert_one, src_path, dst_path, reverse, backend)
+            )
+        done, _ = wait(in_flight)
+        collect(done)
+
+    summary.elapsed = time.perf_counter() - start
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("src_dir")
+    parser.add_argument("dst_dir")
+    parser.add_argument(
+        "--reverse", action="store_true", help="convert .json back to .fxp"
+    )
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument(
+        "--profile", metavar="FILE", help="write per-stage timings as JSON"
+    )
+    parser.add_argument("--backend", help="XML backend (default: FXP's)")
+    add_validation_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        backend = resolve_backend(args.backend)
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0])
+    use_validation_level(args.validation, CLI_VALIDATION)
+
+    summary = convert_library(
+        args.src_dir,
+        args.dst_dir,
+        reverse=args.reverse,
+        max_workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        profile=args.profile is not None,
+        backend=backend,
+    )
+    for src_path, error in summary.errors:
+        print(f"FAILED {src_path}\n{error}", file=sys.stderr)
+    if summary.recorder is not None:
+        with open(args.profile, "w", encoding="utf-8") as f:
+            json.dump(summary.recorder.to_dict(), f, indent=4)
+        print(summary.recorder.summary())
+    print(summary)
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Content-addressed cache of XML -> JSON conversions.
+
+Entries are keyed by a hash of the XML bytes (or of path + mtime + size) plus
+the backend name. Lookups go to an in-memory LRU first, then to an optional
+on-disk tier that is kept under max_disk_bytes by evicting the least recently
+used files.
+
+    cache = ConversionCache(maxsize=4096, directory="~/.cache/fxp2json")
+    fxp = FXP.load(path, cache=cache)
+    cache.stats  # hits, misses, ...
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from backends import get_backend
+
+
+class CacheStats:
+    def __init__(self):
+        self.memory_hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        # Entries dropped from the memory LRU, and files from the disk tier
+        self.memory_evictions: int = 0
+        self.disk_evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def evictions(self) -> int:
+        return self.memory_evictions + self.disk_evictions
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"CacheStats(hits={self.hits} (memory={self.memory_hits}, "
+            f"disk={self.disk_hits}), misses={self.misses}, "
+            f"evictions={self.evictions} (memory={self.memory_evictions}, "
+            f"disk={self.disk_evictions}), hit_rate={self.hit_rate:.1%})"
+        )
+
+
+def content_key(xml: Union[str, bytes, memoryview], backend: str) -> str:
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    digest = hashlib.blake2b(xml, digest_size=20)
+    digest.update(b"\0" + backend.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def path_key(path: str, backend: str) -> str:
+    """Cheaper key that trusts path, mtime and size instead of hashing content."""
+    st = os.stat(path)
+    ident = f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}"
+    return content_key(ident, backend)
+
+
+class ConversionCache:
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 256 << 20,
+    ):
+        self.maxsize: int = maxsize
+        self.directory: Optional[str] = (
+            os.path.expanduser(directory) if directory else None
+        )
+        self.max_disk_bytes: int = max_disk_bytes
+        self.stats: CacheStats = CacheStats()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        # Guards _memory and stats; callers may share the cache across
+        # threads (fxpasync runs it in executor threads)
+        self._lock = threading.Lock()
+        # Guards _disk_bytes and eviction, so a directory scan doesn't hold
+        # up memory hits
+        self._disk_lock = threading.Lock()
+        self._disk_bytes: int = 0
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _disk_entries(self):
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(".json"):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield st.st_mtime, path, st.st_size
+
+    def _remember(self, key: str, json_str: str) -> None:
+        with self._lock:
+            self._memory[key] = json_str
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+                self.stats.memory_evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            json_str = self._memory.get(key)
+            if json_str is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return json_str
+        if self.directory is not None:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    json_str = f.read()
+                # mtime doubles as the disk tier's LRU clock
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            else:
+                with self._lock:
+                    self.stats.disk_hits += 1
+                self._remember(key, json_str)
+                return json_str
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    def put(self, key: str, json_str: str) -> None:
+        self._remember(key, json_str)
+        if self.directory is None:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json_str)
+        with self._disk_lock:
+            try:
+                # Overwriting an entry replaces its bytes rather than adding
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            self._disk_bytes += os.path.getsize(path) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        # Called with _disk_lock held. Drop least recently used files until
+        # 90% of the budget is free, so eviction (a directory scan) doesn't
+        # run on every put
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, _, size in entries)
+        target = self.max_disk_bytes * 0.9
+        evicted = 0
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._disk_bytes = total
+        with self._lock:
+            self.stats.disk_evictions += evicted
+
+    def xml_to_json(
+        self,
+        xml: Union[str, bytes, memoryview],
+        backend: str,
+        key: Optional[str] = None,
+    ) -> str:
+        """backend's xml_to_json, skipped entirely on a cache hit."""
+        if key is None:
+            key = content_key(xml, backend)
+        json_str = self.get(key)
+        if json_str is None:
+            json_str = get_backend(backend).xml_to_json(xml)
+            self.put(key, json_str)
+        return json_str
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
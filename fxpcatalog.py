@@ -0,0 +1,167 @@
+"""
+Header-only catalog of a preset library.
+
+Only the first 92 bytes (FXP header + PatchHeader) of each file are read.
+The result is a NumPy structured array, one row per file, saved as .npy:
+
+    python fxpcatalog.py "/Library/Application Support/Surge XT/patches_factory" factory.npy
+
+    catalog = Catalog.load("factory.npy")
+    catalog.paths(catalog.records["numWavetables"] > 0)
+    catalog.query(fxVersion=1)
+
+Rebuilding against an existing catalog only re-reads files whose mtime or
+size changed; rows for deleted files are dropped.
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fxpbatch import FXP_SUFFIX, iter_files
+from fxpheader import RAW_FIELDS, read_headers
+
+HEADER_FIELDS: List[Tuple[str, str]] = [
+    ("chunkmagic", "S4"),
+    ("byteSize", "i4"),
+    ("fxMagic", "S4"),
+    ("version", "i4"),
+    ("fxId", "i4"),
+    ("fxVersion", "i4"),
+    ("numPrograms", "i4"),
+    ("prgName", "U28"),
+    ("chunkSize", "i4"),
+    ("patchmagic", "S4"),
+    ("xmlSize", "i4"),
+    ("patchVersion", "i4"),
+    ("numWavetables", "i4"),
+    ("numSamples", "i4"),
+    ("numZones", "i4"),
+    ("numModMatrix", "i4"),
+    ("numModMatrixRows", "i4"),
+]
+KEY_FIELDS: List[Tuple[str, str]] = [("mtime", "f8"), ("size", "i8")]
+# The header bytes as they are on disk; decoded into HEADER_FIELDS column-wise
+RAW_DTYPE = np.dtype(RAW_FIELDS)
+
+
+def _dtype(path_width: int) -> np.dtype:
+    return np.dtype([("path", f"U{max(path_width, 1)}")] + KEY_FIELDS + HEADER_FIELDS)
+
+
+class Catalog:
+    def __init__(self, records: Optional[np.ndarray] = None):
+        if records is None:
+            records = np.zeros(0, dtype=_dtype(1))
+        self.records: np.ndarray = records
+        # (path, formatted exception) for files that could not be read
+        self.errors: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def load(index_path: str) -> "Catalog":
+        return Catalog(np.load(index_path, allow_pickle=False))
+
+    def save(self, index_path: str) -> None:
+        # Write-then-rename so an interrupted save never leaves a torn index
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, self.records, allow_pickle=False)
+        os.replace(tmp_path, index_path)
+
+    def update(self, root: str) -> int:
+        """
+        Bring the catalog in line with the .fxp files under root.
+
+        Unchanged files (same mtime and size) keep their row without being
+        opened. Returns the number of files whose header was (re-)read.
+        """
+        existing: Dict[str, int] = {
+            path: i for i, path in enumerate(self.records["path"].tolist())
+        }
+        self.errors = []
+        paths: List[str] = []
+        stats: List[Tuple[float, int]] = []
+        # Row of self.records to keep for each path, -1 to re-read its header
+        old_rows: List[int] = []
+        for path in iter_files(root, FXP_SUFFIX):
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                self.errors.append((path, f"{type(e).__name__}: {e}"))
+                continue
+            i = existing.get(path, -1)
+            if i >= 0:
+                old = self.records[i]
+                if old["mtime"] != st.st_mtime or old["size"] != st.st_size:
+                    i = -1
+            paths.append(path)
+            stats.append((st.st_mtime, st.st_size))
+            old_rows.append(i)
+
+        # Headers of every changed file land in one array, decoded per column
+        rows = np.array(old_rows, dtype=np.intp)
+        kept = np.flatnonzero(rows >= 0)
+        stale = np.flatnonzero(rows < 0)
+        raw = np.zeros(len(stale), dtype=RAW_DTYPE)
+        ok = np.ones(len(paths), dtype=bool)
+        for j, error in read_headers([paths[k] for k in stale], raw):
+            ok[stale[j]] = False
+            self.errors.append((paths[stale[j]], error))
+
+        width = max((len(p) for p, good in zip(paths, ok) if good), default=1)
+        records = np.zeros(len(paths), dtype=_dtype(width))
+        records["path"] = paths
+        if paths:
+            records["mtime"], records["size"] = zip(*stats)
+        for name, _ in HEADER_FIELDS:
+            records[name][kept] = self.records[name][rows[kept]]
+            column = raw[name]
+            if name == "prgName":
+                column = np.char.decode(column, "utf-8", "replace")
+            records[name][stale] = column
+        self.records = records[ok]
+        return len(stale) - (len(ok) - int(ok.sum()))
+
+    def query(self, **equals) -> np.ndarray:
+        """Rows whose fields equal the given values, e.g. query(fxVersion=1)."""
+        mask = np.ones(len(self.records), dtype=bool)
+        for field, value in equals.items():
+            mask &= self.records[field] == value
+        return self.records[mask]
+
+    def paths(self, mask: np.ndarray) -> List[str]:
+        return self.records["path"][mask].tolist()
+
+
+def build_catalog(root: str, index_path: str) -> Catalog:
+    """Load index_path if present, update it against root and save it back."""
+    if os.path.exists(index_path):
+        catalog = Catalog.load(index_path)
+    else:
+        catalog = Catalog()
+    catalog.update(root)
+    catalog.save(index_path)
+    return catalog
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root")
+    parser.add_argument("index", help="catalog file (.npy), updated in place")
+    args = parser.parse_args(argv)
+
+    catalog = build_catalog(args.root, args.index)
+    for path, error in catalog.errors:
+        print(f"SKIPPED {path}: {error}", file=sys.stderr)
+    print(f"{len(catalog)} presets in {args.index}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""
+Duplicate and near-duplicate presets across a library.
+
+Each patch tree gets two fingerprints:
+
+- a canonical hash: blake2b of the tree without patch/meta (name, author,
+  ...), with attributes sorted, numbers in one spelling ("0.500000" ==
+  "0.5") and repeated elements as an unordered set. Equal hashes are exact
+  duplicates, however the files are formatted or named.
+- a MinHash signature over the set of "path@attribute=value" features,
+  numbers quantized to QUANT_DIGITS significant digits. The fraction of
+  equal signature slots estimates the Jaccard similarity of the feature sets.
+
+Signatures are split into bands and bucketed (LSH): only presets that share
+a bucket are compared, so indexing n presets is O(n) and finding near
+duplicates costs a bucket lookup per preset, not n^2 compare_json calls.
+
+    python fxpdedupe.py SRC_DIR --threshold 0.8
+
+    index = DedupeIndex()
+    for path in paths:
+        index.add(path, FXP.load(path).json_tree)
+    index.exact_duplicates()  # [[path, path, ...], ...]
+    index.near_duplicates()   # [[path, path, ...], ...], exact ones included
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from fxpbatch import (
+    CLI_VALIDATION,
+    FXP_SUFFIX,
+    add_validation_argument,
+    iter_files,
+    resolve_backend,
+)
+from validation import use_validation_level
+
+# Parts of the tree that say nothing about the sound
+IGNORED_PATHS = ("patch/meta",)
+# Numbers become features at 2 significant digits: 0.501 and 0.504 are the
+# same feature, 0.50 and 0.51 are not. More digits tell more tweaks apart.
+QUANT_DIGITS = 2
+NUM_PERM = 128
+# LSH: b bands of r = NUM_PERM / b rows put two presets of similarity s in a
+# shared bucket with probability 1 - (1 - s**r)**b. That S-curve is centred
+# on (1/b)**(1/r), about 0.71 for 16 bands of 8 rows. A pair at 0.8 is found
+# with 95% probability, one at 0.5 with 6%. Only pairs that share a bucket
+# are checked against the threshold. For thresholds well below 0.7 use
+# more bands, at the cost of more candidate pairs.
+NUM_BANDS = 16
+DEFAULT_THRESHOLD = 0.8
+# Universal hashing (a * x + b) mod p, over 32-bit feature hashes
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _canonical(value: Any) -> Any:
+    if type(value) is dict:
+        return {k: _canonical(v) for k, v in value.items()}
+    if type(value) is list:
+        items = [_canonical(v) for v in value]
+        # Order of repeated elements does not count
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+    if type(value) is str:
+        number = _number(value)
+        return value if number is None else repr(number)
+    return value
+
+
+def _without(tree: dict, ignore: Iterable[str]) -> dict:
+    """A shallow copy of tree without the elements at the ignored paths."""
+    tree = dict(tree)
+    for path in ignore:
+        *parents, leaf = path.split("/")
+        node = tree
+        for tag in parents:
+            child = node.get(tag)
+            if type(child) is not dict:
+                break
+            node[tag] = node = dict(child)
+        else:
+            node.pop(leaf, None)
+    return tree
+
+
+def canonical_hash(tree: dict, ignore: Iterable[str] = IGNORED_PATHS) -> str:
+    """Hex digest that is equal for presets with equal parameters."""
+    canonical = _canonical(_without(tree, ignore))
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def features(
+    tree: dict,
+    digits: int = QUANT_DIGITS,
+    ignore: Iterable[str] = IGNORED_PATHS,
+) -> Set[str]:
+    """The "path@attribute=value" set a MinHash signature is computed over."""
+    result = set()
+    stack: List[Tuple[str, Any]] = list(_without(tree, ignore).items())
+    while stack:
+        path, value = stack.pop()
+        if type(value) is list:
+            stack.extend((path, v) for v in value)
+            continue
+        if type(value) is not dict:
+            # A text-only element, or None for an empty one
+            value = {} if value is None else {"#text": value}
+            result.add(path)
+        for k, v in value.items():
+            if type(v) is dict or type(v) is list or v is None:
+                stack.append((f"{path}/{k}", v))
+                continue
+            number = _number(v) if type(v) is str else None
+            if number is not None:
+                v = f"{number:.{digits}g}"
+            result.add(f"{path}@{k}={v}")
+    return result
+
+
+class MinHasher:
+    """num_perm hash functions, fixed by seed so signatures can be stored."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def signature(self, features: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little"
+                )
+                for f in features
+            ),
+            dtype=np.uint64,
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # (num_perm, n) hash values; a and x are below 2**32, so no overflow
+        permuted = (
+            self.a[:, None] * hashes[None, :] + self.b[:, None]
+        ) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def similarity(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the feature sets behind two signatures."""
+    return float(np.count_nonzero(signature1 == signature2)) / len(signature1)
+
+
+class DedupeIndex:
+    """
+    Canonical hash -> keys for exact duplicates, and banded LSH buckets of
+    one signature per distinct hash for near duplicates.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = NUM_PERM,
+        num_bands: int = NUM_BANDS,
+        threshold: float = DEFAULT_THRESHOLD,
+        digits: int = QUANT_DIGITS,
+        seed: int = 1,
+    ):
+        if num_perm % num_bands:
+            raise ValueError(f"num_perm={num_perm} is not a multiple of {num_bands}")
+        self.hasher = MinHasher(num_perm, seed)
+        self.num_bands = num_bands
+        self.rows = num_perm // num_bands
+        self.threshold = threshold
+        self.digits = digits
+        self.groups: Dict[str, List[Hashable]] = {}
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, List[str]]] = [
+            defaultdict(list) for _ in range(num_bands)
+        ]
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self.groups.values())
+
+    @property
+    def lsh_threshold(self) -> float:
+        """Similarity at which a pair has about even odds to share a bucket."""
+        return (1 / self.num_bands) ** (1 / self.rows)
+
+    def fingerprint(self, tree: dict) -> Tuple[str, np.ndarray]:
+        return (
+            canonical_hash(tree),
+            self.hasher.signature(features(tree, self.digits)),
+        )
+
+    def add(self, key: Hashable, tree: dict) -> None:
+        self.add_fingerprint(key, *self.fingerprint(tree))
+
+    def add_fingerprint(
+        self, key: Hashable, digest: str, signature: np.ndarray
+    ) -> None:
+        """Add a fingerprint computed elsewhere, e.g. in a worker process."""
+        keys = self.groups.get(digest)
+        if keys is not None:
+            keys.append(key)
+            return
+        self.groups[digest] = [key]
+        self.signatures[digest] = signature
+        for band, bucket in zip(self._bands(signature), self.buckets):
+            bucket[band].append(digest)
+
+    def _bands(self, signature: np.ndarray) -> List[bytes]:
+        rows = self.rows
+        return [
+            signature[i * rows : (i + 1) * rows].tobytes()
+            for i in range(self.num_bands)
+        ]
+
+    def exact_duplicates(self) -> List[List[Hashable]]:
+        return [keys for keys in self.groups.values() if len(keys) > 1]
+
+    def _candidates(self, signature: np.ndarray) -> Set[str]:
+        candidates = set()
+        for band, bucket in zip(self._bands(signature), self.buckets):
+            candidates.update(bucket.get(band, ()))
+        return candidates
+
+    def query(
+        self, tree: dict, threshold: Optional[float] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """(key, estimated similarity) of the indexed presets similar to tree."""
+        threshold = self.threshold if threshold is None else threshold
+        digest, signature = self.fingerprint(tree)
+        matches = []
+        for candidate in self._candidates(signature):
+            score = (
+                1.0
+                if candidate == digest
+                else similarity(signature, self.signatures[candidate])
+            )
+            if score >= threshold:
+                matches.extend((key, score) for key in self.groups[candidate])
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def near_duplicates(
+        self, threshold: Optional[float] = None
+    ) -> List[List[Hashable]]:
+        """Groups of presets linked by estimated similarity >= threshold."""
+        threshold = self.threshold if threshold is None else threshold
+        # Union-find over distinct hashes
+        parent = {digest: digest for digest in self.groups}
+
+        def find(digest: str) -> str:
+            while parent[digest] != digest:
+                parent[digest] = parent[parent[digest]]
+                digest = parent[digest]
+            return digest
+
+        for bucket in self.buckets:
+            for digests in bucket.values():
+                if len(digests) < 2:
+                    continue
+                for i, first in enumerate(digests):
+                    for second in digests[i + 1 :]:
+                        if find(first) == find(second):
+                            continue
+                        score = similarity(
+                            self.signatures[first], self.signatures[second]
+                        )
+                        if score >= threshold:
+                            parent[find(second)] = find(first)
+
+        clusters: Dict[str, List[Hashable]] = defaultdict(list)
+        for digest, keys in self.groups.items():
+            clusters[find(digest)].extend(keys)
+        return [keys for keys in clusters.values() if len(keys) > 1]
+
+
+def _fingerprint_file(
+    path: str, backend: Optional[str], digits: int, num_perm: int, seed: int
+) -> Tuple[str, Optional[Tuple[str, np.ndarray]], Optional[str]]:
+    from fxppreset import FXP
+
+    try:
+        fxp = FXP.load(path, backend=backend) if backend else FXP.load(path)
+        tree = fxp.json_tree
+        signature = MinHasher(num_perm, seed).signature(features(tree, digits))
+        return path, (canonical_hash(tree), signature), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def index_library(
+    src_dir: str,
+    index: Optional[DedupeIndex] = None,
+    backend: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> Tuple[DedupeIndex, List[Tuple[str, str]]]:
+    """Fingerprint every preset under src_dir in a process pool -> (index, errors)."""
+    if index is None:
+        index = DedupeIndex()
+    errors = []
+    num_perm, seed = index.hasher.num_perm, index.hasher.seed
+    paths = list(iter_files(src_dir, FXP_SUFFIX))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            _fingerprint_file,
+            paths,
+            [backend] * len(paths),
+            [index.digits] * len(paths),
+            [num_perm] * len(paths),
+            [seed] * len(paths),
+            chunksize=64,
+        )
+        for path, fingerprint, error in results:
+            if error is not None:
+                errors.append((path, error))
+            else:
+                index.add_fingerprint(path, *fingerprint)
+    return index, errors
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("src_dir")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument(
+        "--bands",
+        type=int,
+        default=NUM_BANDS,
+        help=f"LSH bands, a divisor of {NUM_PERM} (more: lower thresholds)",
+    )
+    parser.add_argument(
+        "--digits",
+        type=int,
+        default=QUANT_DIGITS,
+        help="significant digits numbers are compared at",
+    )
+    parser.add_argument("--backend", help="XML backend (default: FXP's)")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", help="write the groups as JSON")
+    add_validation_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        backend = resolve_backend(args.backend)
+        index = DedupeIndex(
+            num_bands=args.bands, threshold=args.threshold, digits=args.digits
+        )
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0])
+    use_validation_level(args.validation, CLI_VALIDATION)
+
+    index, errors = index_library(args.src_dir, index, backend, args.workers)
+    for path, error in errors:
+        print(f"SKIPPED {path}: {error}", file=sys.stderr)
+    exact = index.exact_duplicates()
+    near = index.near_duplicates()
+
+    def relative(keys: List[str]) -> List[str]:
+        return [os.path.relpath(key, args.src_dir) for key in keys]
+
+    for kind, groups in (("exact", exact), ("near", near)):
+        for keys in groups:
+            print(f"{kind}: " + "  ".join(relative(keys)))
+    print(
+        f"{len(index)} presets, {len(errors)} skipped: "
+        f"{len(exact)} exact duplicate groups, {len(near)} near-duplicate "
+        f"groups (threshold {args.threshold}, LSH ~{index.lsh_threshold:.2f})"
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "exact": [relative(keys) for keys in exact],
+                    "near": [relative(keys) for keys in near],
+                    "skipped": [relative([path])[0] for path, _ in errors],
+                },
+                f,
+                indent=4,
+            )
+    # Groups from a partial index may be missing members
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+In-place edits of Surge patch XML, without parsing it into a tree.
+
+ParamEditor scans the XML bytes once, recording the byte span of each
+parameter element (the children of <parameters>). Edits replace only those
+spans; apply() splices them into the original buffer in one pass.
+
+    editor = ParamEditor(xml_bytes)
+    editor.set_param("a_env1_attack", value="-3.5")
+    editor.add_modrouting("a_env1_attack", source=10, depth=0.25)
+    new_xml_bytes = editor.apply()
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+# Attribute values are matched whole, so a ">" inside quotes does not end the tag
+_TAG = re.compile(
+    rb"<(/?)([A-Za-z_][\w.\-:]*)(?:\s(?:[^>\"']|\"[^\"]*\"|'[^']*')*?)?(/?)>"
+)
+# Comments, processing instructions, CDATA and doctypes are skipped whole
+_SKIP = re.compile(rb"<(?:!--.*?-->|\?.*?\?>|!\[CDATA\[.*?\]\]>|![^>]*>)", re.S)
+
+
+class ParamSpan:
+    __slots__ = ("start", "start_end", "end", "self_closing", "indent")
+
+    def __init__(
+        self, start: int, start_end: int, self_closing: bool, indent: Optional[bytes]
+    ):
+        # Byte offsets: start tag is [start, start_end); the whole element
+        # is [start, end), end being set when the end tag is found
+        self.start = start
+        self.start_end = start_end
+        self.end = start_end
+        self.self_closing = self_closing
+        # Whitespace before the element on its line (b"" in a layout with
+        # line breaks but no indentation), None if it does not start a line
+        self.indent = indent
+
+
+def _indent_before(xml: bytes, pos: int) -> Optional[bytes]:
+    line_start = xml.rfind(b"\n", 0, pos) + 1
+    indent = xml[line_start:pos]
+    return indent if not indent.strip() else None
+
+
+def index_params(xml: bytes) -> Dict[str, ParamSpan]:
+    """Byte spans of the direct children of <parameters>, keyed by tag."""
+    spans: Dict[str, ParamSpan] = {}
+    depth = None  # depth below <parameters>, None until it is found
+    current: Optional[ParamSpan] = None
+    pos = 0
+    while True:
+        lt = xml.find(b"<", pos)
+        if lt < 0:
+            break
+        skip = _SKIP.match(xml, lt)
+        if skip:
+            pos = skip.end()
+            continue
+        m = _TAG.match(xml, lt)
+        if m is None:
+            raise ValueError(f"Malformed tag at byte {lt}")
+        pos = m.end()
+        closing, name, self_closing = m.group(1), m.group(2), m.group(3)
+        if depth is None:
+            if name == b"parameters" and not closing and not self_closing:
+                depth = 0
+            continue
+        if closing:
+            depth -= 1
+            if depth < 0:
+                break  # </parameters>
+            if depth == 0:
+                current.end = m.end()
+            continue
+        if depth == 0:
+            current = ParamSpan(
+                lt, m.end(), bool(self_closing), _indent_before(xml, lt)
+            )
+            spans[name.decode("utf-8")] = current
+        if not self_closing:
+            depth += 1
+    return spans
+
+
+def _format(value) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value)
+
+
+# Control characters XML 1.0 cannot represent, even as character references
+_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _escape(value: str) -> bytes:
+    invalid = _INVALID.search(value)
+    if invalid is not None:
+        raise ValueError(
+            f"Character {invalid.group()!r} cannot be written to XML: {value!r}"
+        )
+    # Tabs and line breaks by number, or parsers normalize them to spaces
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace('"', "&quot;")
+        .replace("\t", "&#x09;")
+        .replace("\n", "&#x0A;")
+        .replace("\r", "&#x0D;")
+        .encode("utf-8")
+    )
+
+
+@lru_cache(maxsize=None)
+def _attribute_pattern(name: str):
+    # From the start of the tag, over whole attributes in either quote style,
+    # so text inside another attribute's value is never taken for name
+    return re.compile(
+        rb"(<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:\"[^\"]*\"|'[^']*'))*?\s+"
+        + re.escape(name.encode("utf-8"))
+        + rb"\s*=\s*)(?:\"[^\"]*\"|'[^']*')"
+    )
+
+
+def _set_attributes(start_tag: bytes, attrs: Dict[str, object]) -> bytes:
+    for name, value in attrs.items():
+        quoted = b'"' + _escape(_format(value)) + b'"'
+        start_tag, n = _attribute_pattern(name).subn(
+            lambda m: m.group(1) + quoted, start_tag, count=1
+        )
+        if not n:
+            # New attribute goes last, keeping whatever precedes "/>" or ">"
+            tail = 2 if start_tag.endswith(b"/>") else 1
+            body = start_tag[:-tail].rstrip()
+            attribute = b" " + name.encode("utf-8") + b"=" + quoted
+            start_tag = body + attribute + start_tag[len(body) :]
+    return start_tag
+
+
+def _modrouting(attrs: Dict[str, object]) -> bytes:
+    return (
+        b"<modrouting"
+        + b"".join(
+            b" " + k.encode("utf-8") + b'="' + _escape(_format(v)) + b'"'
+            for k, v in attrs.items()
+        )
+        + b" />"
+    )
+
+
+class ParamEditor:
+    def __init__(self, xml: Union[bytes, bytearray, memoryview]):
+        self.xml = bytes(xml)
+        self.spans = index_params(self.xml)
+        self.newline = b"\r\n" if b"\r\n" in self.xml else b"\n"
+        # name -> (new start tag, new child elements)
+        self._edits: Dict[str, Tuple[bytes, List[bytes]]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.spans
+
+    @property
+    def modified(self) -> bool:
+        return bool(self._edits)
+
+    def _edit(self, name: str) -> Tuple[bytes, List[bytes]]:
+        try:
+            span = self.spans[name]
+        except KeyError:
+            raise KeyError(f"No parameter {name!r} in patch") from None
+        if name not in self._edits:
+            self._edits[name] = (self.xml[span.start : span.start_end], [])
+        return self._edits[name]
+
+    def set_param(self, name: str, value=None, **attrs) -> None:
+        """Set attributes of a parameter element, e.g. set_param("a_volume", value=0.5)."""
+        if value is not None:
+            attrs["value"] = value
+        start_tag, children = self._edit(name)
+        self._edits[name] = (_set_attributes(start_tag, attrs), children)
+
+    def add_modrouting(
+        self,
+        name: str,
+        source: int,
+        depth: float,
+        muted: int = 0,
+        source_index: int = 0,
+        **attrs,
+    ) -> None:
+        """Append a <modrouting> to a parameter."""
+        _, children = self._edit(name)
+        children.append(
+            _modrouting(
+                dict(
+                    source=source,
+                    depth=depth,
+                    muted=muted,
+                    source_index=source_index,
+                    **attrs,
+                )
+            )
+        )
+
+    def _splice(self, name: str) -> Tuple[bytes, int]:
+        """Replacement bytes for the edited part of name, and where it ends."""
+        span = self.spans[name]
+        start_tag, children = self._edits[name]
+        if not children:
+            return start_tag, span.start_end
+        # XML with line breaks gets one child per line, indented one level
+        # deeper if the parameter is; compact XML stays compact
+        if span.indent is None:
+            line = b""
+            unit = b""
+        else:
+            line = self.newline + span.indent
+            if not span.indent:
+                unit = b""
+            else:
+                unit = b"\t" if span.indent.startswith(b"\t") else b"    "
+        added = b"".join(line + unit + c for c in children)
+        if span.self_closing:
+            # <x ... /> becomes <x ...> children </x>
+            open_tag = start_tag[:-2].rstrip() + b">"
+            close_tag = b"</" + name.encode("utf-8") + b">"
+            return open_tag + added + line + close_tag, span.start_end
+        # New children go after the existing ones, right before the end tag
+        # (and before the whitespace that precedes it)
+        last_child_end = self.xml.rindex(b"</", span.start_end, span.end)
+        while (
+            last_child_end > span.start_end
+            and self.xml[last_child_end - 1 : last_child_end].isspace()
+        ):
+            last_child_end -= 1
+        body = self.xml[span.start_end : last_child_end]
+        return start_tag + body + added, span.start_end + len(body)
+
+    def apply(self) -> bytes:
+        """The XML with every pending edit spliced in."""
+        pieces = []
+        pos = 0
+        for name in sorted(self._edits, key=lambda n: self.spans[n].start):
+            replacement, end = self._splice(name)
+            pieces.append(self.xml[pos : self.spans[name].start])
+            pieces.append(replacement)
+            pos = end
+        pieces.append(self.xml[pos:])
+        return b"".join(pieces)
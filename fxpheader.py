@@ -0,0 +1,174 @@
+"""
+Fixed-layout headers at the start of every .fxp file.
+
+    FXP header   60 bytes, big-endian:    ">4si4siiii28si"
+    PatchHeader  32 bytes, little-endian: "<4siiiiiii"
+    Bank header 156 bytes, big-endian:    ">4si4siiii128s" (.fxb files only,
+                 followed by numPrograms FXP-framed programs)
+
+Both are precompiled struct.Struct codecs, so the format string is parsed
+once at import rather than on every load or save. read_headers() fills the
+92-byte headers of many files into one preallocated buffer; with a NumPy
+structured array of RAW_FIELDS as the buffer, the fields can then be read
+column-wise without touching each file's bytes in Python (see fxpcatalog).
+"""
+
+import struct
+from typing import List, Sequence, Tuple
+
+from validation import validated
+
+FXP_HEADER = struct.Struct(">4si4siiii28si")
+PATCH_HEADER = struct.Struct("<4siiiiiii")
+FXP_HEADER_SIZE = FXP_HEADER.size
+PATCH_HEADER_SIZE = PATCH_HEADER.size
+# Offset of the XML in a .fxp file
+XML_OFFSET = FXP_HEADER_SIZE + PATCH_HEADER_SIZE
+# chunkmagic, byteSize, fxMagic, version, fxId, fxVersion, numPrograms, future
+BANK_HEADER = struct.Struct(">4si4siiii128s")
+BANK_HEADER_SIZE = BANK_HEADER.size
+# fxMagic of a bank of programs, and of a bank saved as one opaque chunk
+BANK_MAGIC = b"FxBk"
+OPAQUE_BANK_MAGIC = b"FBCh"
+BANK_MAGICS = (BANK_MAGIC, OPAQUE_BANK_MAGIC)
+
+# The XML_OFFSET header bytes as NumPy structured dtype fields, in file order
+# and byte order. The PatchHeader's version is renamed patchVersion to keep
+# field names unique.
+RAW_FIELDS: List[Tuple[str, str]] = [
+    ("chunkmagic", "S4"),
+    ("byteSize", ">i4"),
+    ("fxMagic", "S4"),
+    ("version", ">i4"),
+    ("fxId", ">i4"),
+    ("fxVersion", ">i4"),
+    ("numPrograms", ">i4"),
+    ("prgName", "S28"),
+    ("chunkSize", ">i4"),
+    ("patchmagic", "S4"),
+    ("xmlSize", "<i4"),
+    ("patchVersion", "<i4"),
+    ("numWavetables", "<i4"),
+    ("numSamples", "<i4"),
+    ("numZones", "<i4"),
+    ("numModMatrix", "<i4"),
+    ("numModMatrixRows", "<i4"),
+]
+
+_ZEROS = bytes(XML_OFFSET)
+
+
+@validated
+class PatchHeader:
+    # TODO: Check each field is correctly named
+    # In Surge this is struct patch_header { char tag[4]; unsigned int xmlsize,
+    # wtsize[n_scenes = 2][n_oscs = 3]; }: the six ints after xmlSize are the
+    # byte sizes of each oscillator's wavetable (see wavetableSizes).
+    __slots__ = (
+        "patchmagic",
+        "xmlSize",
+        "version",
+        "numWavetables",
+        "numSamples",
+        "numZones",
+        "numModMatrix",
+        "numModMatrixRows",
+    )
+
+    def __init__(
+        self,
+        patchmagic: bytes,
+        xmlSize: int,
+        version: int,
+        numWavetables: int,
+        numSamples: int,
+        numZones: int,
+        numModMatrix: int,
+        numModMatrixRows: int,
+    ):
+        self.patchmagic = patchmagic
+        # assert self.patchmagic == b'cTfx', "Patch magic must be 'cTfx'"
+        self.xmlSize = xmlSize
+        self.version = version
+        self.numWavetables = numWavetables
+        self.numSamples = numSamples
+        self.numZones = numZones
+        self.numModMatrix = numModMatrix
+        self.numModMatrixRows = numModMatrixRows
+
+    @staticmethod
+    def unpack_from(buffer, offset: int = 0) -> "PatchHeader":
+        return PatchHeader(*PATCH_HEADER.unpack_from(buffer, offset))
+
+    @property
+    def fields(self) -> tuple:
+        """The header fields in file order."""
+        return (
+            self.patchmagic,
+            self.xmlSize,
+            self.version,
+            self.numWavetables,
+            self.numSamples,
+            self.numZones,
+            self.numModMatrix,
+            self.numModMatrixRows,
+        )
+
+    @property
+    def wavetableSizes(self) -> List[List[int]]:
+        """Wavetable byte size per [scene][oscillator], 0 when there is none."""
+        return [
+            [self.version, self.numWavetables, self.numSamples],
+            [self.numZones, self.numModMatrix, self.numModMatrixRows],
+        ]
+
+    @wavetableSizes.setter
+    def wavetableSizes(self, sizes: List[List[int]]) -> None:
+        (
+            (self.version, self.numWavetables, self.numSamples),
+            (self.numZones, self.numModMatrix, self.numModMatrixRows),
+        ) = sizes
+
+    def pack_into(self, buffer, offset: int = 0) -> None:
+        PATCH_HEADER.pack_into(buffer, offset, *self.fields)
+
+    @property
+    def to_bytes(self) -> bytes:
+        # The Struct always packs exactly PATCH_HEADER_SIZE bytes
+        return PATCH_HEADER.pack(*self.fields)
+
+    def __repr__(self) -> str:
+        return f"PatchHeader{self.fields!r}"
+
+
+def read_headers(paths: Sequence[str], out, start: int = 0) -> List[Tuple[int, str]]:
+    """
+    Read the first XML_OFFSET bytes of each file into consecutive
+    XML_OFFSET-byte slots of out, starting at slot start.
+
+    out is any writable buffer: a bytearray, or a NumPy array of dtype
+    RAW_FIELDS with a row per file. Files are read unbuffered straight into
+    their slot, so nothing but the open file is allocated per file. Returns
+    (index into paths, formatted exception) for files that could not be read;
+    their slots are zeroed.
+    """
+    view = memoryview(out).cast("B")
+    end = (start + len(paths)) * XML_OFFSET
+    if end > len(view):
+        raise ValueError(f"{len(view)} byte buffer is too small for {end} bytes")
+    errors: List[Tuple[int, str]] = []
+    offset = start * XML_OFFSET
+    for i, path in enumerate(paths):
+        slot = view[offset : offset + XML_OFFSET]
+        try:
+            with open(path, "rb", buffering=0) as f:
+                size = f.readinto(slot)
+            if size < XML_OFFSET:
+                raise ValueError(f"{path}: {size} bytes is too short for an FXP file")
+        except (OSError, ValueError) as e:
+            slot[:] = _ZEROS
+            errors.append((i, f"{type(e).__name__}: {e}"))
+        slot.release()
+        offset += XML_OFFSET
+    view.release()
+    return errors
@@ -1,114 +1,71 @@
-
-
-import importlib
+import base64
 import json
-import struct
-from typing import ByteString, Dict, List
-
-from typeguard import typechecked
-
-import pytinyxml2_json as xmljson
-
-# List of module names
-modules = [
-    "bs4_json",
-    "lxml_etree_iterparse_json",
-    "lxml_etree_json",
-    "lxml_etree_sax_json",
-    "pytinyxml2_json",
-    "xmltodict_json",
-]
-
-# TODO: FXPHeader
-
-
-@typechecked
-class PatchHeader:
-    # TODO: Check each field is correctly named
-    def __init__(
-        self,
-        patchmagic: bytes,
-        xmlSize: int,
-        version: int,
-        numWavetables: int,
-        numSamples: int,
-        numZones: int,
-        numModMatrix: int,
-        numModMatrixRows: int,
-    ):
-        self.patchmagic: bytes = patchmagic
-        # assert self.patchmagic == b'cTfx', "Patch magic must be 'cTfx'"
-        self.xmlSize: int = xmlSize
-        self.version: int = version
-        self.numWavetables: int = numWavetables
-        self.numSamples: int = numSamples
-        self.numZones: int = numZones
-        self.numModMatrix: int = numModMatrix
-        self.numModMatrixRows: int = numModMatrixRows
-
-    @property
-    def to_bytes(self) -> bytes:
-        b = struct.pack(
-            "<4siiiiiii",
-            self.patchmagic,
-            self.xmlSize,
-            self.version,
-            self.numWavetables,
-            self.numSamples,
-            self.numZones,
-            self.numModMatrix,
-            self.numModMatrixRows,
-        )
-        assert len(b) == 32, "Patch header size must be 32 bytes"
-        return b
+import mmap
+import os
+from typing import Any, BinaryIO, ByteString, Dict, List, Optional, Tuple, Union
+
+import instrument
+from backends import Backend, available_backends, get_backend
+from fxpcache import ConversionCache
+from fxpedit import ParamEditor
+from fxpheader import (
+    BANK_MAGICS,
+    FXP_HEADER,
+    FXP_HEADER_SIZE,
+    PATCH_HEADER_SIZE,
+    XML_OFFSET,
+    PatchHeader,
+)
+from fxpverify import verify_xml as verify_backends
+from json_normalize import json_equal
+from validation import validated
+from xml_writer import SURGE_STYLE, XMLStyle, detect_style, dict_to_xml_bytes
+
+# Names of the installed backends, cross-checked by xml_to_json/verify
+modules = available_backends()
+
+# Backend used by FXP to go XML -> JSON on load and JSON -> XML on save
+DEFAULT_BACKEND = "pytinyxml2_json"
 
 
 def compare_json(json1, json2):
-    dict1 = json.loads(json1)
-    dict2 = json.loads(json2)
-    return dict1 == dict2
-
-
-@typechecked
-def xml_to_json(xml_str: str) -> Dict[str, str]:
-    #xml_str = open("test3.xml").read()
-    module_to_json = {}
-    # Iterate over modules, convert XML to JSON, and save to file
-    for module_name in modules:
-        module = importlib.import_module(module_name)
+    return json_equal(json1, json2)
 
-        if hasattr(module, "xml_to_json"):
-            #            try:
-            # Convert XML to JSON
-            json_str = module.xml_to_json(xml_str)
 
-            # Define the filename
-            json_filename = f"{module_name}.json"
+@validated(boundary=True)
+def xml_to_json(
+    xml_str: str, module_names: List[str] = modules, dump_dir: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Convert xml_str with every backend in module_names, concurrently.
 
+    This is the (slow) cross-checking path: every backend's JSON is compared
+    against the first one's, raising AssertionError with the first divergence
+    of each backend that disagrees. Nothing touches the disk unless dump_dir
+    is given, in which case each backend's output is written there as
+    <module>.json for inspection.
+    """
+    report = verify_backends(xml_str, module_names)
+    module_to_json = {
+        name: result.json_str
+        for name, result in report.results.items()
+        if result.error is None
+    }
+
+    if dump_dir is not None:
+        for module_name, json_str in module_to_json.items():
+            json_filename = os.path.join(dump_dir, f"{module_name}.json")
             with open(json_filename, "w", encoding="utf-8") as f:
                 f.write(json.dumps(json.loads(json_str), indent=4, sort_keys=True))
 
-            print(f"Successfully saved JSON to {json_filename}")
-
-            module_to_json[module_name] = json_str
-    #            except Exception as e:
-    #                print(f"Failed to process module {module_name}: {e}")
-    #        else:
-    #            print(f"Module {module_name} does not have an 'xml_to_json' method")
-
-    for module_name in modules:
-        for module_name2 in modules:
-            if module_name != module_name2:
-                continue
-            assert module_to_json[module_name] == module_to_json[module_name2]
-
+    assert report.ok, str(report)
     return module_to_json
 
 
 # TODO: Also try lxml
-@typechecked
-def verify_xml(xml_str: str) -> None:
-    xml_to_json(xml_str)
+@validated(boundary=True)
+def verify_xml(xml_str: str, dump_dir: Optional[str] = None) -> None:
+    xml_to_json(xml_str, dump_dir=dump_dir)
 
     """
     json_str_tinyxml2 = pytinyxml2_json.xml_to_json(xml_str)
@@ -154,7 +111,171 @@ def verify_xml(xml_str: str) -> None:
     """
 
 
-@typechecked
+def map_source(
+    source: Union[str, ByteString, memoryview], min_size: int, kind: str
+) -> Tuple[Optional[mmap.mmap], memoryview]:
+    """
+    (mapping, byte view) of a path (memory-mapped read-only) or of a
+    bytes-like object (mapping None). Raises ValueError below min_size bytes.
+    """
+    if isinstance(source, str):
+        with instrument.stage("read") as stage, open(source, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < min_size:
+                raise ValueError(f"{source}: {size} bytes is too short for {kind}")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stage.add_bytes(size)
+        return mapping, memoryview(mapping)
+    buffer = memoryview(source).cast("B")
+    if len(buffer) < min_size:
+        size = len(buffer)
+        buffer.release()
+        raise ValueError(f"{size} bytes is too short for {kind}")
+    return None, buffer
+
+
+@validated
+class FXPReader:
+    """
+    Read-only, zero-copy view of a .fxp file.
+
+    The FXP header and PatchHeader are unpacked up front; the XML and
+    wavetable regions are memoryview slices of the mapped file and are only
+    decoded when asked for. Reading prgName/fxId/numWavetables therefore never
+    touches the XML.
+
+        with FXPReader(path) as reader:
+            print(reader.prgName, reader.patchHeader.numWavetables)
+
+    source is a path (memory-mapped) or any bytes-like object. Views handed out
+    by xml_view/wavetable_view must be released before close().
+    """
+
+    __slots__ = (
+        "_mmap",
+        "_buffer",
+        "chunkmagic",
+        "byteSize",
+        "fxMagic",
+        "version",
+        "fxId",
+        "fxVersion",
+        "numPrograms",
+        "prgName",
+        "chunkSize",
+        "patchHeader",
+        "_xml_view",
+        "_wavetable_view",
+        "_xmlContent",
+    )
+
+    def __init__(self, source: Union[str, ByteString, memoryview]):
+        self._mmap, self._buffer = map_source(source, XML_OFFSET, "an FXP file")
+        self._xml_view: Optional[memoryview] = None
+        self._wavetable_view: Optional[memoryview] = None
+        self._xmlContent: Optional[str] = None
+        try:
+            with instrument.stage("header", XML_OFFSET):
+                self._unpack_headers()
+            if self.fxMagic in BANK_MAGICS:
+                raise ValueError(
+                    "This is a bank (FXB) file, read it with fxpbank.FXBReader"
+                )
+        except BaseException:
+            # Nobody gets a reader to close, so the mapping is closed here
+            self.close()
+            raise
+
+    def _unpack_headers(self) -> None:
+        (
+            self.chunkmagic,
+            self.byteSize,
+            self.fxMagic,
+            self.version,
+            self.fxId,
+            self.fxVersion,
+            self.numPrograms,
+            prgName,
+            self.chunkSize,
+        ) = FXP_HEADER.unpack_from(self._buffer, 0)
+        self.prgName: str = prgName.strip(b"\x00").decode("utf-8")
+        self.patchHeader: PatchHeader = PatchHeader.unpack_from(
+            self._buffer, FXP_HEADER_SIZE
+        )
+
+    @property
+    def xml_view(self) -> memoryview:
+        if self._xml_view is None:
+            self._xml_view = self._buffer[
+                XML_OFFSET : XML_OFFSET + self.patchHeader.xmlSize
+            ]
+        return self._xml_view
+
+    @property
+    def wavetable_view(self) -> memoryview:
+        if self._wavetable_view is None:
+            self._wavetable_view = self._buffer[XML_OFFSET + self.patchHeader.xmlSize :]
+        return self._wavetable_view
+
+    @property
+    def xmlContent(self) -> str:
+        # Decoded straight from the mapping, on first access only
+        if self._xmlContent is None:
+            with instrument.stage("decode", len(self.xml_view)):
+                self._xmlContent = str(self.xml_view, "utf-8")
+        return self._xmlContent
+
+    def to_fxp(
+        self, backend: str = DEFAULT_BACKEND, cache: Optional[ConversionCache] = None
+    ) -> "FXP":
+        """Materialize an FXP that no longer depends on this reader."""
+        with instrument.stage("copy", len(self._buffer) - XML_OFFSET):
+            xml_bytes = bytes(self.xml_view)
+            wavetable_bytes = bytes(self.wavetable_view)
+        return FXP(
+            self.chunkmagic,
+            self.byteSize,
+            self.fxMagic,
+            self.version,
+            self.fxId,
+            self.fxVersion,
+            self.numPrograms,
+            self.prgName,
+            self.chunkSize,
+            self.patchHeader,
+            xml_bytes,
+            [wavetable_bytes],
+            backend,
+            cache,
+        )
+
+    def close(self) -> None:
+        for view in (self._xml_view, self._wavetable_view, self._buffer):
+            if view is not None:
+                view.release()
+        self._xml_view = self._wavetable_view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "FXPReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# Constructing an FXP is internal to load(), so it is only checked at "full"
+@validated(
+    boundary=(
+        "load",
+        "from_bytes",
+        "from_json_document",
+        "save",
+        "set_param",
+        "add_modrouting",
+    )
+)
 class FXP:
     def __init__(
         self,
@@ -169,9 +290,10 @@ class FXP:
         # prgName: bytes,
         chunkSize: int,
         patchHeader: PatchHeader,
-        xmlContent: str,
-        # xmlContent: bytes,
+        xmlContent: Union[str, ByteString],
         wavetables: List[ByteString],
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
     ):
         assert (
             len(prgName.encode("utf-8")) <= 28
@@ -191,35 +313,310 @@ class FXP:
         # self.prgName: bytes = prgName
         self.chunkSize: int = chunkSize
         self.patchHeader: PatchHeader = patchHeader
-        self.xmlContent: str = xmlContent
         self.wavetables: List[ByteString] = wavetables
 
-        print(self.xmlContent)
-        open("1.xml", "w").write(self.xmlContent)
+        self.backend: str = backend
+        self.cache: Optional[ConversionCache] = cache
+        # The XML is kept as the original bytes and only decoded on demand, so
+        # an unmodified preset is saved byte-for-byte.
+        self._xmlBytes: Optional[ByteString] = None
+        self._xmlContent: Optional[str] = None
+        if isinstance(xmlContent, str):
+            self._xmlContent = xmlContent
+        else:
+            self._xmlBytes = xmlContent
+        # Layout of the original XML, kept for XML regenerated from json
+        self._xmlStyle: Optional[XMLStyle] = None
+        self._json: Optional[str] = None
+        # json was assigned: the XML has to be regenerated from it on save
+        self._jsonDirty: bool = False
+        self._dirty: bool = False
+        # Wavetables changed (mark_dirty): wtsize has to be recomputed
+        self._wavetablesDirty: bool = False
+        # Pending set_param/add_modrouting edits, spliced into the XML bytes
+        # the next time they are needed
+        self._editor: Optional[ParamEditor] = None
+
+    @property
+    def _xmljson(self) -> Backend:
+        return get_backend(self.backend)
+
+    def _apply_edits(self) -> None:
+        if self._editor is not None:
+            if self._editor.modified:
+                self._xmlBytes = self._editor.apply()
+                self._xmlContent = None
+            self._editor = None
+
+    @property
+    def xmlContent(self) -> str:
+        self._apply_edits()
+        if self._jsonDirty:
+            self._regenerate_xml()
+        if self._xmlContent is None:
+            with instrument.stage("decode", len(self._xmlBytes)):
+                self._xmlContent = str(self._xmlBytes, "utf-8")
+        return self._xmlContent
+
+    @xmlContent.setter
+    def xmlContent(self, xml_str: str) -> None:
+        self._editor = None
+        self._xmlContent = xml_str
+        self._xmlBytes = None
+        self._xmlStyle = None
+        self._json = None
+        self._jsonDirty = False
+        self._dirty = True
+
+    @property
+    def xmlBytes(self) -> ByteString:
+        """The XML region as it will be written by save()."""
+        self._apply_edits()
+        if self._jsonDirty:
+            self._regenerate_xml()
+        if self._xmlBytes is None:
+            with instrument.stage("encode") as stage:
+                self._xmlBytes = self._xmlContent.encode("utf-8")
+                stage.add_bytes(len(self._xmlBytes))
+        return self._xmlBytes
+
+    @property
+    def xmlStyle(self) -> XMLStyle:
+        """Layout (indentation, " />", declaration) of the original XML."""
+        if self._xmlStyle is None:
+            xml = self._xmlBytes if self._xmlBytes is not None else self._xmlContent
+            if xml is None:
+                return SURGE_STYLE
+            self._xmlStyle = detect_style(xml)
+        return self._xmlStyle
+
+    def _style_args(self) -> tuple:
+        # Canonical backends write XML in the original layout, see xml_writer
+        if self._xmljson.capabilities["canonical"]:
+            return (self.xmlStyle,)
+        return ()
+
+    def _regenerate_xml(self) -> None:
+        style_args = self._style_args()
+        self._xmlBytes = self._xmljson.json_to_xml_bytes(self._json, *style_args)
+        self._xmlContent = None
+        self._jsonDirty = False
+
+    @property
+    def json(self) -> str:
+        # Parsed once, with one backend, on first access
+        if self._json is None:
+            if self.cache is not None:
+                self._json = self.cache.xml_to_json(self.xmlBytes, self.backend)
+            else:
+                # Backends parse the bytes directly, no decode to str first
+                self._json = self._xmljson.xml_to_json(self.xmlBytes)
+        return self._json
+
+    @json.setter
+    def json(self, json_str: str) -> None:
+        self._editor = None
+        self._json = json_str
+        self._jsonDirty = True
+        self._dirty = True
+
+    @property
+    def json_tree(self) -> dict:
+        """The patch as a parsed JSON tree, skipping the JSON text if possible."""
+        if self._json is None and self.cache is None:
+            return self._xmljson.xml_to_dict(self.xmlBytes)
+        return json.loads(self.json)
+
+    def project(self, targets: List[str]) -> Dict[str, Any]:
+        """Only the given parameters/paths of the patch, see fxpproject."""
+        # Imported here: fxpproject needs lxml
+        from fxpproject import project
+
+        return project(self.xmlBytes, targets)
+
+    def _edit(self) -> ParamEditor:
+        if self._editor is None:
+            self._editor = ParamEditor(self.xmlBytes)
+        # Any cached JSON/str no longer matches the edited XML
+        self._json = None
+        self._xmlContent = None
+        self._dirty = True
+        return self._editor
+
+    def set_param(self, name: str, value=None, **attrs) -> None:
         """
-        # self.xmlContent: bytes = xmlContent
-        print(self.xmlContent)
-        open("1.xml", "w").write(self.xmlContent)
-        self.wavetables: List[ByteString] = wavetables
+        Set attributes of a parameter, e.g. set_param("a_env1_attack", value=-3.5).
 
-        # Parse XML and convert to JSON
-        json_str = xml_to_json(self.xmlContent)
-        xml_str = json_to_xml(json_str)
-        open("2.xml", "w").write(xml_str)
-        assert xml_str == self.xmlContent, "XML to JSON to XML conversion failed"
+        Only the parameter's start tag is rewritten; the rest of the XML is
+        spliced through unchanged on save.
         """
+        self._edit().set_param(name, value, **attrs)
+
+    def add_modrouting(
+        self,
+        name: str,
+        source: int,
+        depth: float,
+        muted: int = 0,
+        source_index: int = 0,
+        **attrs,
+    ) -> None:
+        """Append a <modrouting> entry to parameter name."""
+        self._edit().add_modrouting(name, source, depth, muted, source_index, **attrs)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether save() will have to re-serialize the XML and fix up sizes."""
+        return self._dirty
+
+    def decode_wavetables(self) -> list:
+        """fxpwavetables.Wavetable per oscillator, viewing self.wavetables (no copy)."""
+        # Imported here: fxpwavetables needs numpy and imports this module
+        from fxpwavetables import split_wavetables
+
+        if len(self.wavetables) == 1:
+            region = self.wavetables[0]
+        else:
+            region = b"".join(self.wavetables)
+        if self._wavetablesDirty:
+            self._update_wavetable_sizes(region)
+        return split_wavetables(self.patchHeader, region)
+
+    def mark_dirty(self) -> None:
+        """
+        Call after changing wavetables, in place or by assigning new blocks,
+        so sizes (each oscillator's wtsize too) are recomputed.
+        """
+        self._dirty = True
+        self._wavetablesDirty = True
+
+    def _update_wavetable_sizes(self, region: ByteString) -> None:
+        from fxpwavetables import wavetable_sizes
 
-        verify_xml(self.xmlContent)
-        self.json = xmljson.xml_to_json(self.xmlContent)
-        open("2.xml", "w").write(xmljson.json_to_xml(self.json))
-        verify_xml(xmljson.json_to_xml(self.json))
+        self.patchHeader.wavetableSizes = wavetable_sizes(self.patchHeader, region)
+        self._wavetablesDirty = False
 
+    def _update_sizes(self, xml_size: int, wavetable_size: int) -> None:
+        self.patchHeader.xmlSize = xml_size
+        self.chunkSize = PATCH_HEADER_SIZE + xml_size + wavetable_size
+        # Surge writes byteSize as 0; otherwise it counts everything after it
+        if self.byteSize != 0:
+            self.byteSize = FXP_HEADER_SIZE - 8 + self.chunkSize
 
-    def save(self, filename: str) -> None:
-        fxp_header: ByteString = struct.pack(
-            ">4si4siiii28si",
+    def verify(self, dump_dir: Optional[str] = None) -> None:
+        """
+        Cross-check the XML with every backend, then check that XML
+        regenerated from self.json does too. Raises AssertionError on mismatch.
+
+        If dump_dir is given, the original XML (1.xml), the regenerated XML
+        (2.xml) and each backend's JSON are written there.
+        """
+        xml_str = self._xmljson.json_to_xml(self.json)
+        if dump_dir is not None:
+            with open(os.path.join(dump_dir, "1.xml"), "w") as f:
+                f.write(self.xmlContent)
+            with open(os.path.join(dump_dir, "2.xml"), "w") as f:
+                f.write(xml_str)
+        verify_xml(self.xmlContent, dump_dir=dump_dir)
+        verify_xml(xml_str)
+
+    def _json_document(self) -> dict:
+        return {
+            "chunkmagic": self.chunkmagic.decode("latin-1"),
+            "byteSize": self.byteSize,
+            "fxMagic": self.fxMagic.decode("latin-1"),
+            "version": self.version,
+            "fxId": self.fxId,
+            "fxVersion": self.fxVersion,
+            "numPrograms": self.numPrograms,
+            "prgName": self.prgName,
+            "chunkSize": self.chunkSize,
+            "patchHeader": {
+                "patchmagic": self.patchHeader.patchmagic.decode("latin-1"),
+                "xmlSize": self.patchHeader.xmlSize,
+                "version": self.patchHeader.version,
+                "numWavetables": self.patchHeader.numWavetables,
+                "numSamples": self.patchHeader.numSamples,
+                "numZones": self.patchHeader.numZones,
+                "numModMatrix": self.patchHeader.numModMatrix,
+                "numModMatrixRows": self.patchHeader.numModMatrixRows,
+            },
+            # So from_json_document can write the XML back in its layout
+            "xmlStyle": self.xmlStyle._asdict(),
+            "patch": self.json_tree,
+            "wavetables": base64.b64encode(b"".join(self.wavetables)).decode("ascii"),
+        }
+
+    def to_json_document(self) -> str:
+        """Serialize the whole preset (headers, patch tree, wavetables) as JSON."""
+        return json.dumps(self._json_document(), indent=4)
+
+    @staticmethod
+    def from_json_document(
+        json_str: Union[str, ByteString], backend: str = DEFAULT_BACKEND
+    ) -> "FXP":
+        """Inverse of to_json_document. The XML is regenerated from the patch tree."""
+        doc = json.loads(json_str)
+        ph = doc["patchHeader"]
+        if get_backend(backend).capabilities["canonical"]:
+            # Written straight from the parsed tree, in the original layout
+            # (Surge's, for documents that do not record it)
+            style = doc.get("xmlStyle")
+            style = SURGE_STYLE if style is None else XMLStyle(**style)
+            xml_content = dict_to_xml_bytes(doc["patch"], style)
+        else:
+            xml_content = get_backend(backend).json_to_xml_bytes(
+                json.dumps(doc["patch"])
+            )
+        wavetables = base64.b64decode(doc["wavetables"])
+        patchHeader = PatchHeader(
+            ph["patchmagic"].encode("latin-1"),
+            len(xml_content),
+            ph["version"],
+            ph["numWavetables"],
+            ph["numSamples"],
+            ph["numZones"],
+            ph["numModMatrix"],
+            ph["numModMatrixRows"],
+        )
+        fxp = FXP(
+            doc["chunkmagic"].encode("latin-1"),
+            doc["byteSize"],
+            doc["fxMagic"].encode("latin-1"),
+            doc["version"],
+            doc["fxId"],
+            doc["fxVersion"],
+            doc["numPrograms"],
+            doc["prgName"],
+            doc["chunkSize"],
+            patchHeader,
+            xml_content,
+            [wavetables],
+            backend,
+        )
+        # The XML was regenerated: byteSize and chunkSize follow its new size
+        fxp._update_sizes(len(xml_content), len(wavetables))
+        return fxp
+
+    def _serialize(self) -> List[ByteString]:
+        xml_bytes = self.xmlBytes
+        with instrument.stage("serialize"):
+            return self._pack(xml_bytes)
+
+    def _pack(self, xml_bytes: ByteString) -> List[ByteString]:
+        wavetable_data: ByteString = b"".join(self.wavetables)
+        if self._dirty:
+            if self._wavetablesDirty:
+                self._update_wavetable_sizes(wavetable_data)
+            self._update_sizes(len(xml_bytes), len(wavetable_data))
+
+        # Both headers packed into one buffer, written as a single chunk
+        header = bytearray(XML_OFFSET)
+        FXP_HEADER.pack_into(
+            header,
+            0,
             self.chunkmagic,  # b'CcnK',
-            self.byteSize,  # len(self.xmlContent) + 28,
+            self.byteSize,
             self.fxMagic,  # b'FPCh',
             self.version,
             self.fxId,
@@ -229,77 +626,103 @@ class FXP:
             # self.prgName,
             self.chunkSize,
         )
+        self.patchHeader.pack_into(header, FXP_HEADER_SIZE)
+        return [header, xml_bytes, wavetable_data]
 
-        assert len(fxp_header) == 60, "FXP header size must be 60 bytes"
+    def to_bytes(self) -> bytes:
+        """The .fxp file contents save() would write."""
+        return b"".join(self._serialize())
 
-        wavetable_data: ByteString = b"".join(self.wavetables)
+    def save(self, target: Union[str, BinaryIO]) -> None:
+        """
+        Write the preset to a path or a binary stream. An unmodified preset is
+        written from its original XML bytes and comes out byte-identical; a
+        modified one is re-serialized and byteSize, chunkSize and xmlSize are
+        recomputed.
+        """
+        with instrument.record(target if isinstance(target, str) else "<stream>"):
+            chunks = self._serialize()
+            with instrument.stage("write", sum(len(c) for c in chunks)):
+                if isinstance(target, str):
+                    with open(target, "wb") as f:
+                        f.writelines(chunks)
+                else:
+                    target.writelines(chunks)
+        # What is on disk is now the baseline for the next save
+        self._dirty = False
 
-        with open(filename, "wb") as f:
-            f.write(fxp_header)
-            f.write(self.patchHeader.to_bytes)
-            #f.write(self.xmlContent.encode("utf-8"))
-            f.write(xmljson.json_to_xml(self.json).encode("utf-8"))
-            # f.write(self.xmlContent)
-            f.write(wavetable_data)
+    @staticmethod
+    def load(
+        source: Union[str, ByteString, memoryview, BinaryIO],
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> "FXP":
+        """Load from a path (memory-mapped), bytes-like object or binary stream."""
+        with instrument.record(source if isinstance(source, str) else "<bytes>"):
+            if not isinstance(source, (str, bytes, bytearray, memoryview)):
+                with instrument.stage("read") as stage:
+                    source = source.read()
+                    stage.add_bytes(len(source))
+            with FXPReader(source) as reader:
+                return reader.to_fxp(backend, cache)
 
     @staticmethod
-    def load(filename: str) -> "FXP":
-        with open(filename, "rb") as f:
-            patch_content = f.read()
-            fxp_header: ByteString = patch_content[:60]  # f.read(60)
-            assert len(fxp_header) == 60, "FXP header size must be 60 bytes"
-
-            (
-                chunkmagic,
-                byteSize,
-                fxMagic,
-                version,
-                fxId,
-                fxVersion,
-                numPrograms,
-                prgName,
-                chunkSize,
-            ) = struct.unpack(">4si4siiii28si", fxp_header)
-
-            print("chunkSize", chunkSize)
-            patch_header_bytes: ByteString = patch_content[60:92]  # f.read(32)
-            patch_header_unpack = struct.unpack("<4siiiiiii", patch_header_bytes)
-            patchHeader = PatchHeader(*patch_header_unpack)
-
-            # xml_content: ByteString = f.read(chunkSize)
-            xml_content: ByteString = patch_content[
-                92 : 92 + patchHeader.xmlSize
-            ]  # f.read(xml_size)
-            wavetables: ByteString = patch_content[
-                92 + patchHeader.xmlSize :
-            ]  # f.read()
-
-            assert (
-                len(prgName.strip(b"\x00")) <= 28
-            ), "Program name must be at most 28 bytes long"
+    def from_bytes(
+        data: Union[ByteString, memoryview],
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> "FXP":
+        return FXP.load(data, backend, cache)
 
-        return FXP(
-            chunkmagic,
-            byteSize,
-            fxMagic,
-            version,
-            fxId,
-            fxVersion,
-            numPrograms,
-            # prgName,
-            prgName.strip(b"\x00").decode("utf-8"),
-            chunkSize,
-            patchHeader,
-            # xml_content,
-            xml_content.decode("utf-8"),
-            [wavetables],
-        )
+    # asyncio variants; the conversions run in fxpasync's executor, see there
+
+    @staticmethod
+    async def aload(
+        source: Any,
+        backend: str = DEFAULT_BACKEND,
+        cache: Optional[ConversionCache] = None,
+    ) -> "FXP":
+        """
+        Like load(), without blocking the event loop. source may also be an
+        asyncio stream (anything whose read() is awaitable).
+        """
+        from fxpasync import read_source
+
+        return FXP.from_bytes(await read_source(source), backend, cache)
+
+    async def ajson(self, converter: Any = None) -> str:
+        """self.json, converted in the executor instead of on the event loop."""
+        from fxpasync import get_converter
+
+        self._apply_edits()
+        if self._json is None:
+            converter = converter or get_converter()
+            self._json = await converter.xml_to_json(
+                self.xmlBytes, self.backend, self.cache
+            )
+        return self._json
+
+    async def asave(self, target: Any, converter: Any = None) -> None:
+        """Like save(); target may also be an asyncio stream."""
+        from fxpasync import get_converter, write_target
+
+        self._apply_edits()
+        if self._jsonDirty:
+            converter = converter or get_converter()
+            self._xmlBytes = await converter.json_to_xml_bytes(
+                self._json, self.backend, *self._style_args()
+            )
+            self._xmlContent = None
+            self._jsonDirty = False
+        await write_target(target, self.to_bytes())
+        self._dirty = False
 
 
 if __name__ == "__main__":
     fxp = FXP.load(
         "/Library/Application Support/Surge XT/patches_3rdparty/Rare Earth/Basses/Bass Tuba.fxp"
     )
+    fxp.verify()
     fxp.save("tmp/test.fxp")
     assert (
         open("tmp/test.fxp", "rb").read()
@@ -0,0 +1,280 @@
+"""
+Projection: pull a few fields out of patch XML without converting all of it.
+
+Targets are element paths from the root, with "*" matching any one tag, or
+bare parameter names (short for "patch/parameters/<name>"; write "/patch"
+for the root element itself):
+
+    project(xml, ["a_osc1_pitch", "patch/meta"])
+    # {"a_osc1_pitch": {"type": "2", "value": "0.000000"}, "patch/meta": {...}}
+    project(xml, ["patch/parameters/*/modrouting"])
+    # {"patch/parameters/*/modrouting": {"patch/parameters/a_osc1_pitch/modrouting": [...], ...}}
+    param_values(xml, ["a_volume", "a_osc1_pitch"])  # {"a_volume": 0.89, ...}
+
+A literal target maps to its subtree, in json_normalize's canonical shape
+(a list if the element repeats, None if absent); a wildcard target maps the
+concrete path of each match to its subtree.
+
+The XML is fed to a SAX-style lxml parser in CHUNK_SIZE pieces. Elements
+that cannot lead to a target are only counted, nothing is built for them,
+and parsing stops as soon as no further match is possible: after the last
+literal target, or once the element enclosing a wildcard target's matches
+has ended. Surge patches keep repeated tags contiguous, which the early stop
+relies on.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from backends import XMLInput
+from json_normalize import add_child, close_element
+
+# Bytes handed to the parser at a time; parsing stops between chunks
+CHUNK_SIZE = 1 << 14
+PARAMETERS_PATH = "patch/parameters"
+WILDCARD = "*"
+
+
+class _Node:
+    __slots__ = ("children", "wildcard", "targets")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.wildcard: Optional["_Node"] = None
+        # Indices of the targets that end at this node
+        self.targets: List[int] = []
+
+
+def _target_path(target: str) -> Tuple[str, ...]:
+    if "/" not in target:
+        target = f"{PARAMETERS_PATH}/{target}"
+    return tuple(target.strip("/").split("/"))
+
+
+class Projection:
+    """A compiled set of targets; call it on XML to project it."""
+
+    def __init__(self, targets: Iterable[str]):
+        self.targets: List[str] = list(dict.fromkeys(targets))
+        self.paths: List[Tuple[str, ...]] = [_target_path(t) for t in self.targets]
+        self.wildcard: List[bool] = [WILDCARD in path for path in self.paths]
+        self.root = _Node()
+        # Path of the element whose end means a target can match no more:
+        # the parent of a literal target, the part of a wildcard target
+        # before its first "*"
+        self.scopes: Dict[Tuple[str, ...], List[int]] = {}
+        for i, path in enumerate(self.paths):
+            node = self.root
+            for segment in path:
+                if segment == WILDCARD:
+                    if node.wildcard is None:
+                        node.wildcard = _Node()
+                    node = node.wildcard
+                else:
+                    node = node.children.setdefault(segment, _Node())
+            node.targets.append(i)
+            if self.wildcard[i]:
+                scope = path[: path.index(WILDCARD)]
+            else:
+                scope = path[:-1]
+            self.scopes.setdefault(scope, []).append(i)
+        self.scope_depths = {len(scope) for scope in self.scopes}
+
+    def __call__(self, xml: XMLInput) -> Dict[str, Any]:
+        handler = _Handler(self)
+        parser = etree.XMLParser(target=handler)
+        for chunk in _chunks(xml):
+            parser.feed(chunk)
+            if handler.remaining == 0:
+                # Everything asked for has been seen: abandon the parse
+                break
+        else:
+            parser.close()
+        return handler.results()
+
+
+def _chunks(xml: XMLInput) -> Iterator[bytes]:
+    if hasattr(xml, "read"):
+        while True:
+            chunk = xml.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    elif isinstance(xml, str):
+        for start in range(0, len(xml), CHUNK_SIZE):
+            yield xml[start : start + CHUNK_SIZE].encode("utf-8")
+    else:
+        view = memoryview(xml).cast("B")
+        try:
+            for start in range(0, len(view), CHUNK_SIZE):
+                yield bytes(view[start : start + CHUNK_SIZE])
+        finally:
+            # Let FXPReader close its mapping even after an early stop
+            view.release()
+
+
+class _Handler:
+    """lxml parser target. Builds dicts only inside matched elements."""
+
+    def __init__(self, projection: Projection):
+        self.projection = projection
+        self.remaining = len(projection.targets)
+        self.done = [False] * self.remaining
+        self.values: List[Any] = [None] * self.remaining
+        self.found = [False] * self.remaining
+        # Depth of the subtree being skipped, 0 if none
+        self.skip = 0
+        self.path: List[str] = []
+        # Per open element: (trie nodes, content dict or None, targets ending here)
+        self.frames: List[Tuple[List[_Node], Optional[dict], List[int]]] = [
+            ([projection.root], None, [])
+        ]
+        # Character data since the last start/end, and whether that was the
+        # start of a built element: only text before an element's first child
+        # is kept, as the other backends do
+        self.text: List[str] = []
+        self.after_start = False
+        # Literal targets whose element just ended: finished unless the next
+        # event starts another element with the same tag
+        self.closing: List[int] = []
+
+    def _finish(self, indices: Iterable[int]) -> None:
+        for i in indices:
+            if not self.done[i]:
+                self.done[i] = True
+                self.remaining -= 1
+
+    def _settle_closing(self, tag: Optional[str]) -> None:
+        still_open = []
+        for i in self.closing:
+            if tag == self.projection.paths[i][-1]:
+                still_open.append(i)
+        self._finish(i for i in self.closing if i not in still_open)
+        self.closing = []
+
+    def start(self, tag: str, attrib) -> None:
+        if self.skip:
+            self.skip += 1
+            return
+        if self.closing:
+            self._settle_closing(tag)
+        nodes, parent, _ = self.frames[-1]
+        if self.text:
+            self._take_text(parent)
+        next_nodes = []
+        for node in nodes:
+            child = node.children.get(tag)
+            if child is not None:
+                next_nodes.append(child)
+            if node.wildcard is not None:
+                next_nodes.append(node.wildcard)
+        ending = [i for node in next_nodes for i in node.targets if not self.done[i]]
+        if parent is None and not ending:
+            if not next_nodes:
+                self.skip = 1
+                return
+            self.path.append(tag)
+            self.frames.append((next_nodes, None, ending))
+            return
+        content = dict(attrib)
+        if parent is not None:
+            add_child(parent, tag, content)
+        self.path.append(tag)
+        self.frames.append((next_nodes, content, ending))
+        self.after_start = True
+
+    def end(self, tag: str) -> None:
+        if self.skip:
+            self.skip -= 1
+            return
+        if self.closing:
+            self._settle_closing(None)
+        nodes, content, ending = self.frames.pop()
+        if self.text:
+            self._take_text(content)
+        self.after_start = False
+        if content is not None:
+            close_element(content)
+            for i in ending:
+                self._found(i, content or None)
+        depths = self.projection.scope_depths
+        if len(self.path) in depths:
+            self._finish(self.projection.scopes.get(tuple(self.path), ()))
+        self.path.pop()
+
+    def _found(self, i: int, value: Any) -> None:
+        if self.projection.wildcard[i]:
+            if not self.found[i]:
+                self.values[i] = {}
+            add_child(self.values[i], "/".join(self.path), value)
+        else:
+            if self.found[i]:
+                # A repeated element: collect its run of siblings
+                if type(self.values[i]) is not list:
+                    self.values[i] = [self.values[i]]
+                self.values[i].append(value)
+            else:
+                self.values[i] = value
+            self.closing.append(i)
+        self.found[i] = True
+
+    def _take_text(self, content: Optional[dict]) -> None:
+        if self.after_start and content is not None:
+            text = "".join(self.text).strip()
+            if text:
+                content["#text"] = text
+        self.text = []
+
+    def data(self, data: str) -> None:
+        if not self.skip and self.frames[-1][1] is not None:
+            self.text.append(data)
+
+    def close(self) -> None:
+        return None
+
+    def results(self) -> Dict[str, Any]:
+        results = {}
+        for i, target in enumerate(self.projection.targets):
+            value = self.values[i]
+            if value is None and self.projection.wildcard[i]:
+                value = {}
+            results[target] = value
+        return results
+
+
+@lru_cache(maxsize=64)
+def _compiled(targets: Tuple[str, ...]) -> Projection:
+    return Projection(targets)
+
+
+def project(xml: XMLInput, targets: Iterable[str]) -> Dict[str, Any]:
+    """Target -> subtree, see the module docstring. Compiled targets are cached."""
+    return _compiled(tuple(targets))(xml)
+
+
+def param_values(xml: XMLInput, names: Iterable[str]) -> Dict[str, Optional[float]]:
+    """The value attribute of each named parameter as a float (None if absent)."""
+    values = {}
+    for name, content in project(xml, names).items():
+        if type(content) is list:
+            content = content[0]
+        value = content.get("value") if content else None
+        values[name] = None if value is None else float(value)
+    return values
+
+
+def project_files(
+    paths: Iterable[str], targets: Iterable[str]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    (path, projection) for each .fxp file, read through FXPReader: with an
+    early stop, the rest of the file's XML is never even paged in.
+    """
+    from fxppreset import FXPReader
+
+    projection = _compiled(tuple(targets))
+    for path in paths:
+        with FXPReader(path) as reader:
+            yield path, projection(reader.xml_view)
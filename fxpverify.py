@@ -0,0 +1,266 @@
+"""
+Differential verification: convert the same XML with several backends at
+once and report where their (canonical) JSON first diverges.
+
+    report = verify_xml(xml_str, ["lxml_etree_json", "xmltodict_json"])
+    report.ok, report.differences
+
+    python fxpverify.py patches/ --backends lxml_etree_iterparse_json xmltodict_json
+
+For a whole corpus, verify_files() spreads every (file, backend) conversion
+over one process pool, so a file costs about one parse of wall time.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from backends import XMLInput, available_backends, get_backend
+from json_normalize import Difference, first_difference
+
+XML_SUFFIX = ".xml"
+
+
+class BackendResult:
+    def __init__(
+        self,
+        name: str,
+        tree: Any = None,
+        error: Optional[str] = None,
+        seconds: float = 0.0,
+    ):
+        self.name = name
+        # The backend's parsed JSON tree; compared directly, no JSON text
+        self.tree = tree
+        # Formatted exception if the backend failed
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def json_str(self) -> Optional[str]:
+        return None if self.error else json.dumps(self.tree, indent=4)
+
+    def __repr__(self) -> str:
+        status = "error" if self.error else f"{self.seconds * 1e3:.1f}ms"
+        return f"BackendResult({self.name!r}, {status})"
+
+
+class VerifyReport:
+    def __init__(
+        self,
+        results: Dict[str, BackendResult],
+        reference: Optional[str],
+        differences: Dict[str, Difference],
+        source: Optional[str] = None,
+        pairwise: bool = False,
+    ):
+        self.results = results
+        # Backend the others were compared against (None if all failed)
+        self.reference = reference
+        # Backend name, or "a vs b" when comparing pairwise -> first divergence
+        self.differences = differences
+        self.source = source
+        self.pairwise = pairwise
+
+    @property
+    def errors(self) -> Dict[str, str]:
+        return {n: r.error for n, r in self.results.items() if r.error is not None}
+
+    @property
+    def ok(self) -> bool:
+        return not self.differences and not self.errors
+
+    def __str__(self) -> str:
+        lines = [f"{self.source or '<xml>'}: {'ok' if self.ok else 'FAILED'}"]
+        for name, error in self.errors.items():
+            lines.append(f"  {name} raised {error.strip().splitlines()[-1]}")
+        for name, difference in self.differences.items():
+            against = "" if self.pairwise else f" vs {self.reference}"
+            lines.append(f"  {name}{against}: {difference}")
+        return "\n".join(lines)
+
+
+def _convert(name: str, xml: XMLInput) -> BackendResult:
+    # Never raises, so a broken backend is reported instead of ending the run
+    start = time.perf_counter()
+    try:
+        tree = get_backend(name).xml_to_dict(xml)
+    except Exception:
+        return BackendResult(name, error=traceback.format_exc())
+    return BackendResult(name, tree, seconds=time.perf_counter() - start)
+
+
+def compare_results(
+    results: Dict[str, BackendResult],
+    reference: Optional[str] = None,
+    pairwise: bool = False,
+    source: Optional[str] = None,
+) -> VerifyReport:
+    """
+    Compare every successful result against reference (default: the first
+    successful one), or every pair of results if pairwise.
+    """
+    trees = {n: r.tree for n, r in results.items() if not r.error}
+    if reference not in trees:
+        reference = next(iter(trees), None)
+    differences: Dict[str, Difference] = {}
+    names = list(trees)
+    if pairwise:
+        for i, a in enumerate(names):
+            for b in names[i + 1 :]:
+                difference = first_difference(trees[a], trees[b])
+                if difference is not None:
+                    differences[f"{a} vs {b}"] = difference
+    else:
+        for name in names:
+            if name == reference:
+                continue
+            difference = first_difference(trees[name], trees[reference])
+            if difference is not None:
+                differences[name] = difference
+    return VerifyReport(results, reference, differences, source, pairwise)
+
+
+def verify_xml(
+    xml_str: XMLInput,
+    backends: Optional[List[str]] = None,
+    reference: Optional[str] = None,
+    pairwise: bool = False,
+    executor: Optional[Executor] = None,
+) -> VerifyReport:
+    """
+    Convert xml_str with every backend concurrently and compare the results.
+
+    Runs in a thread pool unless an executor is given; pass a
+    ProcessPoolExecutor to run pure-Python backends truly in parallel.
+    """
+    if backends is None:
+        backends = available_backends()
+    if hasattr(xml_str, "read"):
+        # Every backend needs its own pass over the document
+        xml_str = xml_str.read()
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=max(1, len(backends))) as pool:
+            return verify_xml(xml_str, backends, reference, pairwise, pool)
+    futures = [executor.submit(_convert, name, xml_str) for name in backends]
+    results = {name: f.result() for name, f in zip(backends, futures)}
+    return compare_results(results, reference, pairwise)
+
+
+def read_xml(path: str) -> bytes:
+    """The patch XML of an .fxp file, or the contents of an .xml file."""
+    if path.lower().endswith(XML_SUFFIX):
+        with open(path, "rb") as f:
+            return f.read()
+    from fxppreset import FXPReader
+
+    with FXPReader(path) as reader:
+        return bytes(reader.xml_view)
+
+
+def _convert_file(path: str, name: str) -> BackendResult:
+    try:
+        xml_str = read_xml(path)
+    except Exception:
+        return BackendResult(name, error=traceback.format_exc())
+    return _convert(name, xml_str)
+
+
+def verify_files(
+    paths: Iterable[str],
+    backends: Optional[List[str]] = None,
+    reference: Optional[str] = None,
+    pairwise: bool = False,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[VerifyReport]:
+    """
+    Yield a report per file, in completion order.
+
+    Each (file, backend) conversion is its own task in a process pool, and at
+    most max_in_flight (default: 4 per worker) are queued at a time.
+    """
+    if backends is None:
+        backends = available_backends()
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 4 * max_workers
+    pending: Dict[str, Dict[str, BackendResult]] = {}
+
+    def collect(done) -> Iterator[VerifyReport]:
+        for future in done:
+            path = future_paths.pop(future)
+            result = future.result()
+            pending[path][result.name] = result
+            if len(pending[path]) == len(backends):
+                results = pending.pop(path)
+                # Report in the order backends were given, not completion order
+                results = {name: results[name] for name in backends}
+                yield compare_results(results, reference, pairwise, source=path)
+
+    future_paths = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for path in paths:
+            pending[path] = {}
+            for name in backends:
+                if len(future_paths) >= max_in_flight:
+                    done, _ = wait(future_paths, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+                future = executor.submit(_convert_file, path, name)
+                future_paths[future] = path
+        while future_paths:
+            done, _ = wait(future_paths, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+
+def _iter_paths(sources: List[str]) -> Iterator[str]:
+    from fxpbatch import FXP_SUFFIX, iter_files
+
+    for source in sources:
+        if os.path.isdir(source):
+            yield from iter_files(source, FXP_SUFFIX)
+        else:
+            yield source
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("sources", nargs="+", help=".fxp/.xml files or directories")
+    parser.add_argument("--backends", nargs="+", default=None)
+    parser.add_argument("--reference", default=None)
+    parser.add_argument("--pairwise", action="store_true")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    checked = failed = 0
+    for report in verify_files(
+        _iter_paths(args.sources),
+        backends=args.backends,
+        reference=args.reference,
+        pairwise=args.pairwise,
+        max_workers=args.workers,
+    ):
+        checked += 1
+        if not report.ok:
+            failed += 1
+        if args.verbose or not report.ok:
+            print(report)
+    print(f"{checked} files checked, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,477 @@
+"""
+Keep a JSON mirror of a preset directory in sync, incrementally.
+
+    python fxpwatch.py patches/ mirror/          # sync, then watch
+    python fxpwatch.py --once patches/ mirror/   # sync and exit
+
+The mirror has the layout of fxpbatch's output. A state file in the mirror
+records each preset's size, mtime and content hash: on start-up only
+presets whose size or mtime changed are hashed, and only those whose
+content changed are converted again. Mirror files of deleted presets are
+removed.
+
+Changes are picked up with inotify where available (Linux), else by
+polling. Events are debounced: a burst of writes is handled as one batch,
+once the directory has been quiet for `debounce` seconds, and only the
+paths named in the events are looked at. Conversions run in a process pool
+that stays up for the whole session, so a single edited preset is mirrored
+in milliseconds.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fxpbatch import (
+    CLI_VALIDATION,
+    FXP_SUFFIX,
+    JSON_SUFFIX,
+    BatchSummary,
+    _convert_one,
+    add_validation_argument,
+    iter_files,
+    output_path,
+    resolve_backend,
+)
+from validation import use_validation_level
+
+STATE_FILE = ".fxpwatch-state.json"
+STATE_VERSION = 1
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class SyncSummary(BatchSummary):
+    def __init__(self):
+        super().__init__()
+        # Mirror files removed because their preset was deleted
+        self.removed: int = 0
+        # Presets whose mtime changed but content did not
+        self.unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.total or self.removed)
+
+    def __str__(self) -> str:
+        return (
+            f"{super().__str__()}, {self.removed} removed, "
+            f"{self.unchanged} touched but unchanged"
+        )
+
+
+def file_digest(path: str) -> str:
+    # Same digest as fxpcache.content_key
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=20).hexdigest()
+
+
+class Mirror:
+    """The source directory, its JSON mirror and the state tying them together."""
+
+    def __init__(
+        self,
+        src_dir: str,
+        dst_dir: str,
+        state_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        backend: Optional[str] = None,
+    ):
+        self.src_dir = os.path.abspath(src_dir)
+        self.dst_dir = os.path.abspath(dst_dir)
+        self.state_path = state_path or os.path.join(self.dst_dir, STATE_FILE)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # None: FXP's DEFAULT_BACKEND
+        self.backend = backend
+        # Path relative to src_dir -> [size, mtime_ns, content digest]
+        self.state: Dict[str, list] = self._load_state()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _load_state(self) -> Dict[str, list]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if doc.get("version") != STATE_VERSION or doc.get("src_dir") != self.src_dir:
+            # Unknown layout or another source: rebuild from scratch
+            return {}
+        return doc["files"]
+
+    def save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "src_dir": self.src_dir,
+                    "files": self.state,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Started once and kept, so workers have fxppreset imported already
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "Mirror":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def mirror_path(self, src_path: str) -> str:
+        return output_path(src_path, self.src_dir, self.dst_dir, JSON_SUFFIX)
+
+    def sync(self) -> SyncSummary:
+        """Bring the whole mirror up to date."""
+        candidates = set(iter_files(self.src_dir, FXP_SUFFIX))
+        candidates.update(os.path.join(self.src_dir, rel) for rel in self.state)
+        return self._reconcile(candidates)
+
+    def update(self, paths: Iterable[str]) -> SyncSummary:
+        """
+        Bring the mirror up to date for paths only: presets, or directories
+        (everything under them, on disk or in the state) that changed.
+        """
+        candidates: Set[str] = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                candidates.update(iter_files(path, FXP_SUFFIX))
+            candidates.add(path)
+            prefix = os.path.relpath(path, self.src_dir) + os.sep
+            candidates.update(
+                os.path.join(self.src_dir, rel)
+                for rel in self.state
+                if rel.startswith(prefix)
+            )
+        return self._reconcile(candidates)
+
+    def _reconcile(self, candidates: Iterable[str]) -> SyncSummary:
+        summary = SyncSummary()
+        start = time.perf_counter()
+        to_convert: List[Tuple[str, list]] = []
+        for path in sorted(candidates):
+            rel = os.path.relpath(path, self.src_dir)
+            try:
+                st = os.stat(path)
+                is_preset = os.path.isfile(path) and path.lower().endswith(FXP_SUFFIX)
+            except FileNotFoundError:
+                is_preset = False
+            if not is_preset:
+                if self.state.pop(rel, None) is not None:
+                    self._remove_mirror(path)
+                    summary.removed += 1
+                continue
+            old = self.state.get(rel)
+            if old is not None and old[:2] == [st.st_size, st.st_mtime_ns]:
+                continue
+            try:
+                digest = file_digest(path)
+            except OSError:
+                # Gone again, or unreadable for now; the next event retries it
+                continue
+            entry = [st.st_size, st.st_mtime_ns, digest]
+            if (
+                old is not None
+                and old[2] == digest
+                and os.path.exists(self.mirror_path(path))
+            ):
+                self.state[rel] = entry
+                summary.unchanged += 1
+                continue
+            to_convert.append((path, entry))
+
+        self._convert(to_convert, summary)
+        if summary.changed or summary.unchanged:
+            self.save_state()
+        summary.elapsed = time.perf_counter() - start
+        return summary
+
+    def _convert(self, jobs: List[Tuple[str, list]], summary: SyncSummary) -> None:
+        if not jobs:
+            return
+        entries = {path: entry for path, entry in jobs}
+        max_in_flight = 4 * self.max_workers
+
+        def collect(done) -> None:
+            for future in done:
+                src_path, error, _ = future.result()
+                # Failures are recorded too, so they are retried once the
+                # preset changes again, not on every event
+                self.state[os.path.relpath(src_path, self.src_dir)] = entries[src_path]
+                if error is None:
+                    summary.converted += 1
+                else:
+                    # The mirror of the last good version no longer matches
+                    # the source; without it, the next change reconverts even
+                    # if the content comes back the same
+                    self._remove_mirror(src_path)
+                    summary.failed += 1
+                    summary.errors.append((src_path, error))
+
+        in_flight = set()
+        for path, _ in jobs:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(
+                self.executor.submit(
+                    _convert_one, path, self.mirror_path(path), False, self.backend
+                )
+            )
+        done, _ = wait(in_flight)
+        collect(done)
+
+    def _remove_mirror(self, src_path: str) -> None:
+        dst_path = self.mirror_path(src_path)
+        try:
+            os.remove(dst_path)
+        except FileNotFoundError:
+            return
+        # Drop directories the removal left empty, up to the mirror root
+        directory = os.path.dirname(dst_path)
+        while directory != self.dst_dir and directory.startswith(self.dst_dir):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+# inotify(7), through libc
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Recursive inotify watch of a directory tree. Raises OSError if unavailable."""
+
+    def __init__(self, root: str):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # Watch descriptor -> directory
+        self.dirs: Dict[int, str] = {}
+        self.add_tree(root)
+
+    def add_tree(self, root: str) -> None:
+        for dirpath, _, _ in os.walk(root):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = dirpath
+
+    def _moved(self, old: str, new: Optional[str]) -> None:
+        """Directory old was renamed to new, or moved out of the tree (None)."""
+        prefix = old + os.sep
+        for wd, path in list(self.dirs.items()):
+            if path != old and not path.startswith(prefix):
+                continue
+            if new is None:
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+            else:
+                # Watches follow the inode: only the paths change
+                self.dirs[wd] = new + path[len(old) :]
+
+    def read(self, timeout: float) -> List[Tuple[str, int]]:
+        """(path, mask) of the events within timeout seconds; [] if none."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        raw = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            raw.append((wd, mask, cookie, data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        # Cookie -> (watch, name) a directory was moved to, within the tree
+        moved_to = {
+            cookie: (wd, name)
+            for wd, mask, cookie, name in raw
+            if mask & IN_ISDIR and mask & IN_MOVED_TO
+        }
+        events = []
+        for wd, mask, cookie, name in raw:
+            directory = self.dirs.get(wd)
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+            if directory is None and not mask & IN_Q_OVERFLOW:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                # Repoint the watches under it before any later event. Moved
+                # out of the tree, or to where its IN_MOVED_TO is not in this
+                # read: drop them, and watch() adds the tree again on
+                # IN_MOVED_TO
+                new = None
+                if cookie in moved_to:
+                    to_wd, to_name = moved_to[cookie]
+                    if to_wd in self.dirs:
+                        new = os.path.join(self.dirs[to_wd], os.fsdecode(to_name))
+                self._moved(path, new)
+            events.append((path, mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def watch(
+    mirror: Mirror,
+    debounce: float = DEFAULT_DEBOUNCE,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    use_inotify: bool = True,
+    on_sync: Optional[Callable[[SyncSummary], None]] = None,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Sync mirror, then keep it in sync until stop is set (or forever). on_sync
+    is called with the summary of every batch that changed something.
+    """
+    stop = stop or threading.Event()
+
+    def report(summary: SyncSummary) -> None:
+        if on_sync is not None and (summary.changed or summary.unchanged):
+            on_sync(summary)
+
+    inotify = None
+    if use_inotify:
+        try:
+            # Watch before the first sync, so nothing changed during it is missed
+            inotify = Inotify(mirror.src_dir)
+        except OSError:
+            inotify = None
+    report(mirror.sync())
+
+    if inotify is None:
+        while not stop.wait(poll_interval):
+            report(mirror.sync())
+        return
+
+    pending: Set[str] = set()
+    full_sync = False
+    deadline: Optional[float] = None
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            timeout = 0.5 if deadline is None else max(0.0, deadline - now)
+            events = inotify.read(min(timeout, 0.5))
+            for path, mask in events:
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: only a full scan can tell what changed
+                    full_sync = True
+                elif mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        inotify.add_tree(path)
+                    pending.add(path)
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    pending.add(path)
+                elif path.lower().endswith(FXP_SUFFIX):
+                    pending.add(path)
+            if events:
+                # Wait for the burst to settle
+                deadline = time.monotonic() + debounce
+            elif deadline is not None and time.monotonic() >= deadline:
+                report(mirror.sync() if full_sync else mirror.update(pending))
+                pending = set()
+                full_sync = False
+                deadline = None
+    finally:
+        inotify.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("src_dir")
+    parser.add_argument("dst_dir")
+    parser.add_argument("--once", action="store_true", help="sync once and exit")
+    parser.add_argument(
+        "--poll", action="store_true", help="poll instead of using inotify"
+    )
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--backend", help="XML backend (default: FXP's)")
+    add_validation_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        backend = resolve_backend(args.backend)
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0])
+    use_validation_level(args.validation, CLI_VALIDATION)
+
+    def report(summary: SyncSummary) -> None:
+        for src_path, error in summary.errors:
+            print(f"FAILED {src_path}\n{error}", file=sys.stderr)
+        print(summary, flush=True)
+
+    with Mirror(
+        args.src_dir, args.dst_dir, max_workers=args.workers, backend=backend
+    ) as mirror:
+        if args.once:
+            summary = mirror.sync()
+            report(summary)
+            return 1 if summary.failed else 0
+        try:
+            watch(
+                mirror,
+                debounce=args.debounce,
+                poll_interval=args.interval,
+                use_inotify=not args.poll,
+                on_sync=report,
+            )
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Wavetables stored after the XML in a Surge .fxp.
+
+The region holds one block per oscillator that uses a wavetable, in
+[scene][oscillator] order, sized by PatchHeader.wavetableSizes. Each block
+starts with Surge's 12-byte wt_header followed by n_tables * n_samples
+samples, int16 or float32 depending on flags. Samples are exposed as NumPy
+views of the underlying buffer, never copied:
+
+    for wt in fxp.decode_wavetables():
+        spectrum = np.fft.rfft(wt.to_float32(), axis=1)
+
+    tables, index = stack_library(paths, n_samples=2048)
+"""
+
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fxppreset import FXPReader, PatchHeader
+
+WT_HEADER = struct.Struct("<4sIHH")
+WT_MAGIC = b"vawt"
+
+# wt_header.flags
+WTF_IS_SAMPLE = 1
+WTF_LOOP_SAMPLE = 2
+WTF_INT16 = 4
+WTF_INT16_IS_16 = 8
+
+
+class Wavetable:
+    def __init__(self, scene: int, osc: int, buffer, offset: int, size: int):
+        self.scene: int = scene
+        self.osc: int = osc
+        # Byte offset of the block within the wavetable region, and its size
+        self.offset: int = offset
+        self.size: int = size
+        magic, self.n_samples, self.n_tables, self.flags = WT_HEADER.unpack_from(
+            buffer, offset
+        )
+        if magic != WT_MAGIC:
+            raise ValueError(
+                f"Scene {scene} osc {osc}: bad wavetable magic {magic!r} at {offset}"
+            )
+        dtype = np.dtype("<i2") if self.flags & WTF_INT16 else np.dtype("<f4")
+        count = self.n_tables * self.n_samples
+        if WT_HEADER.size + count * dtype.itemsize > size:
+            raise ValueError(f"Scene {scene} osc {osc}: wavetable data is truncated")
+        # (n_tables, n_samples), a view of buffer
+        self.samples: np.ndarray = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=offset + WT_HEADER.size
+        ).reshape(self.n_tables, self.n_samples)
+
+    def __repr__(self) -> str:
+        return (
+            f"Wavetable(scene={self.scene}, osc={self.osc}, "
+            f"n_tables={self.n_tables}, n_samples={self.n_samples}, "
+            f"dtype={self.samples.dtype})"
+        )
+
+    @property
+    def block_size(self) -> int:
+        """Bytes of wt_header and samples, the wtsize Surge stores for it."""
+        return WT_HEADER.size + self.samples.nbytes
+
+    @property
+    def is_int16(self) -> bool:
+        return bool(self.flags & WTF_INT16)
+
+    def to_float32(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Samples scaled to [-1, 1). Only int16 tables are converted (copied)."""
+        if not self.is_int16:
+            if out is None:
+                return self.samples
+            out[...] = self.samples
+            return out
+        # Surge's int16 wavetables are 15-bit unless flagged as full 16-bit
+        scale = 1 / 32768 if self.flags & WTF_INT16_IS_16 else 1 / 16384
+        return np.multiply(self.samples, scale, out=out, dtype=np.float32)
+
+
+def split_wavetables(patch_header: PatchHeader, region) -> List[Wavetable]:
+    """Wavetables in the region that follows the XML, views of region."""
+    wavetables = []
+    offset = 0
+    for scene, sizes in enumerate(patch_header.wavetableSizes):
+        for osc, size in enumerate(sizes):
+            if size:
+                wavetables.append(Wavetable(scene, osc, region, offset, size))
+                offset += size
+    return wavetables
+
+
+def wavetable_sizes(patch_header: PatchHeader, region) -> List[List[int]]:
+    """
+    wtsize per [scene][oscillator] from each block's own wt_header, for the
+    oscillators patch_header gives a wavetable. For a region whose blocks
+    were resized, which patch_header's sizes no longer split correctly.
+    """
+    sizes = [[0] * len(row) for row in patch_header.wavetableSizes]
+    offset = 0
+    for scene, row in enumerate(patch_header.wavetableSizes):
+        for osc, size in enumerate(row):
+            if size:
+                wt = Wavetable(scene, osc, region, offset, len(region) - offset)
+                sizes[scene][osc] = wt.block_size
+                offset += wt.block_size
+    if offset != len(region):
+        raise ValueError(f"{len(region) - offset} bytes after the last wavetable")
+    return sizes
+
+
+def stack_library(
+    paths: Sequence[str], n_samples: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Every table with n_samples samples across paths, as one float32 matrix.
+
+    Returns (tables, index) where tables has shape (n, n_samples) and index
+    is a structured array giving (file, scene, osc, table) for each row.
+    Files are memory-mapped twice: once to count tables so the matrix can be
+    preallocated, once to convert straight into it.
+    """
+    counts = []
+    for path in paths:
+        with FXPReader(path) as reader:
+            wavetables = split_wavetables(reader.patchHeader, reader.wavetable_view)
+            counts.append(
+                [
+                    (wt.scene, wt.osc, wt.n_tables)
+                    for wt in wavetables
+                    if wt.n_samples == n_samples
+                ]
+            )
+            del wavetables
+
+    total = sum(n for found in counts for _, _, n in found)
+    tables = np.empty((total, n_samples), dtype=np.float32)
+    index = np.empty(
+        total, dtype=[("file", "i4"), ("scene", "i1"), ("osc", "i1"), ("table", "i4")]
+    )
+    row = 0
+    for file, (path, found) in enumerate(zip(paths, counts)):
+        if not found:
+            continue
+        with FXPReader(path) as reader:
+            for wt in split_wavetables(reader.patchHeader, reader.wavetable_view):
+                if wt.n_samples != n_samples:
+                    continue
+                end = row + wt.n_tables
+                wt.to_float32(out=tables[row:end])
+                index[row:end] = [
+                    (file, wt.scene, wt.osc, t) for t in range(wt.n_tables)
+                ]
+                row = end
+            # Release the NumPy views before the file is unmapped
+            wt = None
+    return tables, index
@@ -0,0 +1,281 @@
+"""
+Per-stage timers and byte counters for loading, converting and saving presets.
+
+Off by default: stage() and record() then return a shared no-op context
+manager, so the hooks in FXP.load/save and the backends cost one global
+lookup and a call each.
+
+    recorder = instrument.enable()
+    fxp = FXP.load(path)   # read, header, copy
+    fxp.json               # parse, dump (per backend)
+    fxp.save(out)          # serialize, write
+    recorder.records[-1]   # {"source": path, "seconds": ..., "stages": {...}}
+    print(recorder.summary())
+
+Stages run inside record(source) are also summed into that source's
+per-file record; records nest, the outermost wins. Every stage feeds a
+log2-bucketed histogram of its durations.
+"""
+
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, List, Optional
+
+# Bucket i holds durations in [2**(i-1), 2**i) microseconds; the last is open
+BUCKETS = 40
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+    def add_bytes(self, nbytes: int) -> None:
+        pass
+
+
+_NULL = _NullStage()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKETS
+        self.count: int = 0
+        self.seconds: float = 0.0
+        self.max_seconds: float = 0.0
+        self.bytes: int = 0
+
+    def add(self, seconds: float, nbytes: int = 0) -> None:
+        self.counts[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.seconds += seconds
+        self.bytes += nbytes
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper edge, in seconds, of the bucket holding the q-th percentile."""
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min((1 << i) / 1e6, self.max_seconds)
+        return self.max_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "seconds": self.seconds,
+            "max_seconds": self.max_seconds,
+            "bytes": self.bytes,
+            "p50_seconds": self.percentile(50),
+            "p99_seconds": self.percentile(99),
+            "buckets_us": {str(1 << i): n for i, n in enumerate(self.counts) if n},
+        }
+
+
+class Record:
+    """Stage totals for one source file."""
+
+    __slots__ = ("source", "stages", "start")
+
+    def __init__(self, source: str):
+        self.source = source
+        # stage -> [seconds, bytes], summed over repeated runs of the stage
+        self.stages: Dict[str, list] = {}
+        self.start = time.perf_counter()
+
+    def add(self, name: str, seconds: float, nbytes: int) -> None:
+        totals = self.stages.get(name)
+        if totals is None:
+            self.stages[name] = [seconds, nbytes]
+        else:
+            totals[0] += seconds
+            totals[1] += nbytes
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "seconds": time.perf_counter() - self.start,
+            "stages": {
+                name: {"seconds": s, "bytes": b} for name, (s, b) in self.stages.items()
+            },
+        }
+
+
+_current: ContextVar[Optional[Record]] = ContextVar("fxp_record", default=None)
+
+
+class _Stage:
+    __slots__ = ("recorder", "name", "nbytes", "start")
+
+    def __init__(self, recorder: "Recorder", name: str, nbytes: int):
+        self.recorder = recorder
+        self.name = name
+        self.nbytes = nbytes
+
+    def __enter__(self) -> "_Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.recorder.add(self.name, time.perf_counter() - self.start, self.nbytes)
+        return False
+
+    def add_bytes(self, nbytes: int) -> None:
+        self.nbytes += nbytes
+
+
+class _RecordContext:
+    __slots__ = ("recorder", "record", "token")
+
+    def __init__(self, recorder: "Recorder", source: str):
+        self.recorder = recorder
+        self.record = Record(source)
+
+    def __enter__(self) -> Record:
+        self.token = _current.set(self.record)
+        return self.record
+
+    def __exit__(self, *exc_info) -> bool:
+        _current.reset(self.token)
+        self.recorder.add_record(self.record.to_dict(), stages_counted=True)
+        return False
+
+
+class Recorder:
+    def __init__(
+        self, max_records: int = 10000, sink: Optional[Callable[[dict], None]] = None
+    ):
+        self.histograms: Dict[str, Histogram] = {}
+        # Most recent per-file records, as dicts
+        self.records: Deque[dict] = deque(maxlen=max_records)
+        # Called with each finished record, e.g. to append it to a JSON lines file
+        self.sink = sink
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, nbytes: int = 0) -> _Stage:
+        return _Stage(self, name, nbytes)
+
+    def add(self, name: str, seconds: float, nbytes: int = 0) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds, nbytes)
+        record = _current.get()
+        if record is not None:
+            record.add(name, seconds, nbytes)
+
+    def add_record(self, record: dict, stages_counted: bool = False) -> None:
+        """
+        Add a finished per-file record. Records from other processes (see
+        fxpbatch) also feed the stage histograms; local ones already have.
+        """
+        with self._lock:
+            items = [("file", record["seconds"], 0)]
+            if not stages_counted:
+                items += [
+                    (name, s["seconds"], s["bytes"])
+                    for name, s in record["stages"].items()
+                ]
+            for name, seconds, nbytes in items:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram()
+                histogram.add(seconds, nbytes)
+            self.records.append(record)
+        if self.sink is not None:
+            self.sink(record)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": {n: h.to_dict() for n, h in self.histograms.items()},
+                "records": list(self.records),
+            }
+
+    def summary(self) -> str:
+        lines = [
+            f"{'stage':14} {'count':>7} {'total s':>9} {'mean ms':>9} "
+            f"{'p50 ms':>8} {'p99 ms':>8} {'MB/s':>8}"
+        ]
+        with self._lock:
+            histograms = sorted(
+                self.histograms.items(), key=lambda item: -item[1].seconds
+            )
+        for name, h in histograms:
+            mb_s = h.bytes / h.seconds / 1e6 if h.seconds and h.bytes else 0.0
+            lines.append(
+                f"{name:14} {h.count:7} {h.seconds:9.3f} "
+                f"{h.seconds / h.count * 1e3:9.3f} {h.percentile(50) * 1e3:8.3f} "
+                f"{h.percentile(99) * 1e3:8.3f} {mb_s:8.1f}"
+            )
+        return "\n".join(lines)
+
+
+_recorder: Optional[Recorder] = None
+_listeners: List[Callable[[], None]] = []
+
+
+def stage(name: str, nbytes: int = 0):
+    """Context manager timing one stage; .add_bytes(n) counts bytes it handled."""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL
+    return recorder.stage(name, nbytes)
+
+
+def record(source: str):
+    """Context manager collecting the stages run inside it into a per-file record."""
+    recorder = _recorder
+    if recorder is None or _current.get() is not None:
+        return _NULL
+    return _RecordContext(recorder, source)
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def recorder() -> Optional[Recorder]:
+    return _recorder
+
+
+def enable(recorder: Optional[Recorder] = None) -> Recorder:
+    global _recorder
+    _recorder = recorder or Recorder()
+    for listener in _listeners:
+        listener()
+    return _recorder
+
+
+def disable() -> Optional[Recorder]:
+    """Turn instrumentation off, returning the recorder that was active."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    for listener in _listeners:
+        listener()
+    return recorder
+
+
+def on_change(listener: Callable[[], None]) -> None:
+    """Call listener whenever instrumentation is enabled or disabled."""
+    _listeners.append(listener)
+
+
+def size(data) -> int:
+    """Byte count of a bytes-like object (characters for str, 0 for streams)."""
+    if isinstance(data, memoryview):
+        return data.nbytes
+    try:
+        return len(data)
+    except TypeError:
+        return 0
@@ -0,0 +1,161 @@
+"""
+The canonical JSON shape of a patch, and comparison of JSON trees.
+
+An element becomes a dict of its attributes and children. A tag repeated
+under one parent becomes a list, and an attribute that shares its name with
+a child element is kept under "@name"; an element that ends up with neither
+attributes, children nor text becomes None. Backends build this shape as
+they parse, with add_child() for each child and close_element() when an
+element ends, instead of fixing the tree up afterwards.
+
+    first_difference(json.loads(a), json.loads(b))  # None if equal
+    json_equal(a, b)
+    json_equal(normalize(json.loads(a)), normalize(json.loads(b)))  # up to shape
+
+All walks are iterative, so deep documents cannot hit the recursion limit.
+"""
+
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+_MISSING = object()
+
+
+def add_child(content: dict, tag: str, value: Any) -> None:
+    """Add a child element's value under tag, turning repeated tags into a list."""
+    existing = content.get(tag, _MISSING)
+    if existing is _MISSING:
+        content[tag] = value
+    elif type(existing) is list:
+        existing.append(value)
+    elif type(existing) is str:
+        # An attribute called tag: it becomes "@tag", in its place among the
+        # attributes, so the writer gives back both
+        items = list(content.items())
+        content.clear()
+        content.update((f"@{k}" if k == tag else k, v) for k, v in items)
+        content[tag] = value
+    else:
+        content[tag] = [existing, value]
+
+
+def close_element(content: dict) -> None:
+    """Called once content is complete: its empty child elements become None."""
+    for key, value in content.items():
+        if type(value) is dict:
+            if not value:
+                content[key] = None
+        elif type(value) is list:
+            # Repeated empty siblings, <b/><b/>
+            for i, item in enumerate(value):
+                if type(item) is dict and not item:
+                    value[i] = None
+
+
+def normalize(obj: Any) -> Any:
+    """
+    Canonical shape of a tree built some other way, in place: single-element
+    lists are unwrapped (only as dict values) and empty dicts become None.
+    """
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if isinstance(value, list) and len(value) == 1:
+                    # The element itself still has to be normalized
+                    value = node[key] = value[0]
+                if isinstance(value, dict) and not value:
+                    node[key] = None
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(node, list):
+            for i, value in enumerate(node):
+                if isinstance(value, dict) and not value:
+                    node[i] = None
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+    return obj
+
+
+class Difference:
+    """Where two trees first differ. path is a list of dict keys and list indices."""
+
+    def __init__(self, path: List[Union[str, int]], left: Any, right: Any, reason: str):
+        self.path = path
+        self.left = left
+        self.right = right
+        self.reason = reason
+
+    @property
+    def path_str(self) -> str:
+        return "$" + "".join(
+            f"[{p}]" if isinstance(p, int) else f".{p}" for p in self.path
+        )
+
+    def __str__(self) -> str:
+        return f"{self.path_str}: {self.reason}"
+
+    def __repr__(self) -> str:
+        return f"Difference({str(self)!r})"
+
+
+def _short(value: Any) -> str:
+    text = repr(value)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+
+def first_difference(left: Any, right: Any) -> Optional[Difference]:
+    """
+    First difference between two parsed JSON trees, or None.
+
+    The comparison is strict apart from dict key order: {} is not None and
+    [x] is not x, so a backend that builds another shape is caught. To compare
+    trees that may not be in canonical shape, normalize() both first. The walk
+    is in document order and stops at the first mismatch.
+    """
+    try:
+        # Identical trees, the common case, are settled by one C-level compare
+        if left == right:
+            return None
+    except RecursionError:
+        pass
+    # (left, right, path); path tuples share their prefixes
+    stack: List[Tuple[Any, Any, tuple]] = [(left, right, ())]
+    while stack:
+        a, b, path = stack.pop()
+        if isinstance(a, dict) and isinstance(b, dict):
+            missing = [k for k in a if k not in b]
+            extra = [k for k in b if k not in a]
+            if missing or extra:
+                key = (missing or extra)[0]
+                side = "right" if missing else "left"
+                return Difference(
+                    _unwind(path, key), a, b, f"key {key!r} missing on the {side}"
+                )
+            stack.extend((a[k], b[k], (path, k)) for k in reversed(list(a)))
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                return Difference(_unwind(path), a, b, f"length {len(a)} != {len(b)}")
+            stack.extend((a[i], b[i], (path, i)) for i in reversed(range(len(a))))
+        elif a != b:
+            return Difference(_unwind(path), a, b, f"{_short(a)} != {_short(b)}")
+    return None
+
+
+def _unwind(path: tuple, *tail) -> List[Union[str, int]]:
+    parts = list(tail)
+    while path:
+        path, key = path
+        parts.append(key)
+    parts.reverse()
+    return parts
+
+
+def _load(value: Union[str, bytes, Any]) -> Any:
+    return json.loads(value) if isinstance(value, (str, bytes, bytearray)) else value
+
+
+def json_equal(json1: Union[str, Any], json2: Union[str, Any]) -> bool:
+    """Whether two JSON documents (strings or parsed) are equal, see first_difference."""
+    return first_difference(_load(json1), _load(json2)) is None
@@ -1,57 +1,43 @@
 import json
-from io import BytesIO
 
 from lxml import etree
 
-from lxml_etree_json import json_to_xml
+from json_normalize import add_child, close_element
+from lxml_etree_json import XMLInput, xml_stream
+from xml_writer import json_to_xml, json_to_xml_bytes
 
+# The JSON -> XML side is xml_writer's, re-exported as this backend's
+__all__ = [
+    "xml_to_dict",
+    "xml_to_json",
+    "json_to_xml",
+    "json_to_xml_bytes",
+]
 
-# Flatten lists with single elements
-def flatten_json(obj):
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            if isinstance(value, list) and len(value) == 1:
-                obj[key] = value[0]
-            elif isinstance(value, dict) and value == {}:
-                obj[key] = None
-            elif isinstance(value, (dict, list)):
-                flatten_json(value)
-    elif isinstance(obj, list):
-        for i in range(len(obj)):
-            if isinstance(obj[i], (dict, list)):
-                flatten_json(obj[i])
 
-
-def xml_to_json(xml_string: str) -> str:
-    xml_bytes = BytesIO(xml_string.encode("utf-8"))
-    context = etree.iterparse(xml_bytes, events=("start", "end"))
+def xml_to_dict(xml_string: XMLInput) -> dict:
+    context = etree.iterparse(xml_stream(xml_string), events=("start", "end"))
     root = None
     stack = []
 
     for event, elem in context:
         if event == "start":
-            d = {elem.tag: {"{}".format(k): v for k, v in elem.attrib.items()}}
+            content = {"{}".format(k): v for k, v in elem.attrib.items()}
             if stack:
-                parent = stack[-1]
-                parent_key = list(parent.keys())[0]
-                if elem.tag not in parent[parent_key]:
-                    parent[parent_key][elem.tag] = d[elem.tag]
-                else:
-                    if isinstance(parent[parent_key][elem.tag], list):
-                        parent[parent_key][elem.tag].append(d[elem.tag])
-                    else:
-                        parent[parent_key][elem.tag] = [
-                            parent[parent_key][elem.tag],
-                            d[elem.tag],
-                        ]
-            stack.append(d)
+                add_child(stack[-1], elem.tag, content)
+            stack.append(content)
         elif event == "end":
             current = stack.pop()
             if elem.text and elem.text.strip():
-                current[elem.tag]["#text"] = elem.text.strip()
+                current["#text"] = elem.text.strip()
+            close_element(current)
             if not stack:
-                root = current
+                root = {elem.tag: current}
+                close_element(root)
             elem.clear()
 
-    flatten_json(root)
-    return json.dumps(root, indent=4)
+    return root
+
+
+def xml_to_json(xml_string: XMLInput) -> str:
+    return json.dumps(xml_to_dict(xml_string), indent=4)
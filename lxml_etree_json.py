@@ -1,10 +1,30 @@
+import io
 import json
 from collections import defaultdict
+from typing import BinaryIO, Union
 
 from lxml import etree
 
+from backends import XMLInput
 
-def xml_to_json(xml_string: str) -> str:
+
+def xml_bytes(xml: XMLInput) -> Union[bytes, bytearray, memoryview]:
+    # Only str has to be encoded (lxml rejects str with an XML declaration)
+    if isinstance(xml, str):
+        return xml.encode("utf-8")
+    if hasattr(xml, "read"):
+        return xml.read()
+    return xml
+
+
+def xml_stream(xml: XMLInput) -> BinaryIO:
+    """A binary file object over xml, for iterparse. Wraps bytes without copying."""
+    if hasattr(xml, "read"):
+        return xml
+    return io.BytesIO(xml_bytes(xml))
+
+
+def xml_to_dict(xml_string: XMLInput) -> dict:
     def element_to_dict(element):
         elem_dict = {element.tag: {} if element.attrib else None}
         children = list(element)
@@ -31,11 +51,15 @@ def xml_to_json(xml_string: str) -> str:
                 elem_dict[element.tag] = text
         return elem_dict
 
-    root = etree.fromstring(xml_string.encode("utf-8"))
-    return json.dumps(element_to_dict(root), indent=4)
+    root = etree.fromstring(xml_bytes(xml_string))
+    return element_to_dict(root)
 
 
-def json_to_xml(json_string: str) -> str:
+def xml_to_json(xml_string: XMLInput) -> str:
+    return json.dumps(xml_to_dict(xml_string), indent=4)
+
+
+def json_to_xml_bytes(json_string: Union[str, bytes]) -> bytes:
     def dict_to_element(d):
         def _to_element(tag, value):
             element = etree.Element(tag)
@@ -57,4 +81,8 @@ def json_to_xml(json_string: str) -> str:
 
     d = json.loads(json_string)
     root = dict_to_element(d)
-    return etree.tostring(root, pretty_print=False).decode()
+    return etree.tostring(root, pretty_print=False)
+
+
+def json_to_xml(json_string: Union[str, bytes]) -> str:
+    return json_to_xml_bytes(json_string).decode()
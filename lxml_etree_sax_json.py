@@ -2,62 +2,60 @@ import json
 
 from lxml import etree
 
-from lxml_etree_json import json_to_xml
+from json_normalize import add_child, close_element
+from lxml_etree_json import XMLInput, xml_bytes
+from xml_writer import json_to_xml, json_to_xml_bytes
+
+# The JSON -> XML side is xml_writer's, re-exported as this backend's
+__all__ = [
+    "xml_to_dict",
+    "xml_to_json",
+    "json_to_xml",
+    "json_to_xml_bytes",
+]
 
 
 class SAXHandler:
     def __init__(self):
         self.stack = []
-        self.data = None
+        # Per open element: its text chunks so far, or once its first child
+        # has started, its text joined (like lxml's elem.text)
+        self._texts = []
+        self.root = None
 
     def start(self, tag, attrib):
-        self.stack.append({tag: {"{}".format(k): v for k, v in attrib.items()}})
+        if self._texts and type(self._texts[-1]) is list:
+            self._texts[-1] = "".join(self._texts[-1])
+        self.stack.append({"{}".format(k): v for k, v in attrib.items()})
+        self._texts.append([])
 
     def end(self, tag):
         current = self.stack.pop()
-        if self.data:
-            current[tag]["#text"] = self.data
-            self.data = None
+        text = self._texts.pop()
+        text = ("".join(text) if type(text) is list else text).strip()
+        if text:
+            current["#text"] = text
+        close_element(current)
         if self.stack:
-            parent = self.stack[-1]
-            parent_key = list(parent.keys())[0]
-            if tag not in parent[parent_key]:
-                parent[parent_key][tag] = current[tag]
-            else:
-                if isinstance(parent[parent_key][tag], list):
-                    parent[parent_key][tag].append(current[tag])
-                else:
-                    parent[parent_key][tag] = [parent[parent_key][tag], current[tag]]
+            add_child(self.stack[-1], tag, current)
         else:
-            self.stack.append(current)
+            self.root = {tag: current}
+            close_element(self.root)
 
     def data(self, data):
-        if data.strip():
-            self.data = data.strip()
+        if type(self._texts[-1]) is list:
+            self._texts[-1].append(data)
 
     def close(self):
-        return self.stack[0]
-
-
-def simplify_json(obj):
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            if isinstance(value, list) and len(value) == 1:
-                obj[key] = value[0]
-            elif isinstance(value, dict) and value == {}:
-                obj[key] = None
-            elif isinstance(value, dict) or isinstance(value, list):
-                simplify_json(value)
-    elif isinstance(obj, list):
-        for i in range(len(obj)):
-            if isinstance(obj[i], dict) or isinstance(obj[i], list):
-                simplify_json(obj[i])
+        return self.root
 
 
-def xml_to_json(xml_string: str) -> str:
+def xml_to_dict(xml_string: XMLInput) -> dict:
     handler = SAXHandler()
     parser = etree.XMLParser(target=handler)
-    etree.XML(xml_string.encode("utf-8"), parser)
-    json_obj = handler.close()
-    simplify_json(json_obj)
-    return json.dumps(json_obj, indent=4)
+    etree.XML(xml_bytes(xml_string), parser)
+    return handler.close()
+
+
+def xml_to_json(xml_string: XMLInput) -> str:
+    return json.dumps(xml_to_dict(xml_string), indent=4)
@@ -0,0 +1,198 @@
+import io
+import shutil
+import tempfile
+from json.encoder import encode_basestring_ascii
+
+from lxml import etree
+
+from lxml_etree_json import XMLInput, xml_stream
+from xml_writer import json_to_xml, json_to_xml_bytes
+
+# The JSON -> XML side is xml_writer's, re-exported as this backend's
+__all__ = [
+    "xml_to_json_stream",
+    "xml_to_json",
+    "json_to_xml",
+    "json_to_xml_bytes",
+]
+
+# Bytes of pending output kept in memory per nesting level before spilling
+# to a temporary file
+DEFAULT_SPOOL_SIZE = 1 << 20
+# Encoded object keys are cached, up to this many distinct names
+KEY_CACHE_SIZE = 4096
+
+
+class _Spool:
+    """Holds the serialized first element of a run until we know if it is a list."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.parts = []
+        self.size = 0
+        self.file = None
+
+    def write(self, s):
+        if self.file is not None:
+            self.file.write(s)
+            return
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size > self.max_size:
+            self.file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+            self.file.write("".join(self.parts))
+            self.parts = None
+
+    def replay(self, out):
+        if self.file is None:
+            out.write("".join(self.parts))
+        else:
+            self.file.seek(0)
+            shutil.copyfileobj(self.file, out)
+            self.file.close()
+
+
+class _Frame:
+    __slots__ = (
+        "out",
+        "attrib",
+        "single",
+        "opened",
+        "run_tag",
+        "run_count",
+        "spool",
+        "seen",
+    )
+
+    def __init__(self, out, attrib=None, single=False):
+        self.out = out
+        # Attributes are written when the element ends, once we know which
+        # of them share their name with a child element (those are "@name")
+        self.attrib = attrib
+        # The document frame has exactly one child, so never needs to spool
+        self.single = single
+        self.opened = False
+        # Tag of the current run of same-named siblings
+        self.run_tag = None
+        self.run_count = 0
+        self.spool = None
+        self.seen = set()
+
+
+class _Writer:
+    def __init__(self, out, spool_size):
+        self.spool_size = spool_size
+        self.stack = [_Frame(out, single=True)]
+        self.key_cache = {}
+
+    def member(self, frame, key):
+        encoded = self.key_cache.get(key)
+        if encoded is None:
+            encoded = encode_basestring_ascii(key) + ": "
+            if len(self.key_cache) < KEY_CACHE_SIZE:
+                self.key_cache[key] = encoded
+        if frame.opened:
+            frame.out.write(", ")
+        else:
+            frame.out.write("{")
+            frame.opened = True
+        frame.out.write(encoded)
+
+    def close_run(self, frame):
+        if frame.run_tag is None:
+            return
+        if frame.run_count == 1:
+            self.member(frame, frame.run_tag)
+            frame.spool.replay(frame.out)
+            frame.spool = None
+        else:
+            frame.out.write("]")
+        frame.seen.add(frame.run_tag)
+        frame.run_tag = None
+
+    def child_out(self, frame, tag):
+        # Where the value of a new child element called tag is written.
+        # A single element is a plain value, a run of two or more is a list;
+        # we only know which once the next sibling starts, so the first
+        # element of each run is spooled until then.
+        if frame.single:
+            self.member(frame, tag)
+            return frame.out
+        if frame.run_tag == tag:
+            if frame.run_count == 1:
+                self.member(frame, tag)
+                frame.out.write("[")
+                frame.spool.replay(frame.out)
+                frame.spool = None
+            frame.out.write(", ")
+            frame.run_count += 1
+            return frame.out
+        self.close_run(frame)
+        if tag in frame.seen:
+            raise ValueError(
+                f"<{tag}> elements are not contiguous; cannot stream them as one list"
+            )
+        frame.run_tag = tag
+        frame.run_count = 1
+        frame.spool = _Spool(self.spool_size)
+        if frame.attrib and tag in frame.attrib:
+            frame.attrib = {
+                (f"@{k}" if k == tag else k): v for k, v in frame.attrib.items()
+            }
+        return frame.spool
+
+    def start(self, elem):
+        out = self.child_out(self.stack[-1], elem.tag)
+        self.stack.append(_Frame(out, dict(elem.attrib)))
+
+    def end(self, elem):
+        frame = self.stack.pop()
+        self.close_run(frame)
+        for k, v in frame.attrib.items():
+            self.member(frame, k)
+            frame.out.write(encode_basestring_ascii(v))
+        if elem.text and elem.text.strip():
+            self.member(frame, "#text")
+            frame.out.write(encode_basestring_ascii(elem.text.strip()))
+        # An element with no attributes, children or text is null
+        frame.out.write("}" if frame.opened else "null")
+
+    def close(self):
+        frame = self.stack.pop()
+        frame.out.write("}" if frame.opened else "null")
+
+
+def xml_to_json_stream(source, out, spool_size: int = DEFAULT_SPOOL_SIZE) -> None:
+    """
+    Convert XML to JSON, writing tokens to out (anything with .write(str)) as
+    parse events arrive.
+
+    source is a filename or a binary file object. The output has the same
+    shape as lxml_etree_iterparse_json.xml_to_json, but compact and with
+    attributes after child elements.
+
+    Memory is bounded by document depth: parsed elements are discarded as soon
+    as they are written, and at most spool_size characters of pending output
+    per level are held in memory (the rest spills to a temporary file). Only
+    the set of child tag names of each open element is remembered, to reject
+    repeated tags that are not contiguous siblings (Surge patches have none).
+    """
+    writer = _Writer(out, spool_size)
+    for event, elem in etree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            writer.start(elem)
+        else:
+            writer.end(elem)
+            # Free what we have written: this element and its finished siblings
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+    writer.close()
+
+
+def xml_to_json(xml_string: XMLInput) -> str:
+    out = io.StringIO()
+    xml_to_json_stream(xml_stream(xml_string), out)
+    return out.getvalue()
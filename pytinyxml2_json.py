@@ -2,87 +2,52 @@ import json
 
 import pytinyxml2 as tinyxml2
 
-from lxml_etree_iterparse_json import flatten_json
+from json_normalize import add_child, close_element
+from lxml_etree_json import xml_bytes
 
+# JSON -> XML is written directly, without building a tinyxml2 document
+from xml_writer import json_to_xml, json_to_xml_bytes
 
-def dict_to_element(doc, parent, content):
-    for key, value in content.items():
-        if isinstance(value, dict):
-            child = doc.NewElement(key)
-            parent.InsertEndChild(child)
-            dict_to_element(doc, child, value)
-        elif isinstance(value, list):
-            for item in value:
-                if isinstance(item, dict):
-                    child = doc.NewElement(key)
-                    parent.InsertEndChild(child)
-                    dict_to_element(doc, child, item)
-        else:
-            # WARNING: This might be wrong
-            if value is None:
-                # Create a self-closing tag for None values
-                child = doc.NewElement(key)
-                parent.InsertEndChild(child)
-            elif isinstance(value, str):
-                parent.SetAttribute(key, value)
-            elif isinstance(value, int):
-                parent.SetAttribute(key, str(value))
-            elif isinstance(value, bool):
-                parent.SetAttribute(key, str(value).lower())
-            elif isinstance(value, float):
-                parent.SetAttribute(key, str(value))
-            else:
-                raise TypeError(
-                    f"Unsupported attribute type for key '{key}': {type(value)}"
-                )
+__all__ = [
+    "xml_to_dict",
+    "xml_to_json",
+    "json_to_xml",
+    "json_to_xml_bytes",
+]
 
 
-# Function to convert XML to JSON using tinyxml2
-def xml_to_json(xml_str):
+# Function to convert XML to a dict using tinyxml2
+def xml_to_dict(xml_str):
+    if not isinstance(xml_str, str):
+        # tinyxml2 parses str only: decode once, straight from the buffer
+        xml_str = str(xml_bytes(xml_str), "utf-8")
     xml_doc = tinyxml2.XMLDocument()
     xml_doc.Parse(xml_str)
 
     def element_to_dict(element):
-        elem_dict = {element.Value(): {}}
+        content = {}
         # Convert attributes
         attr = element.FirstAttribute()
         while attr:
-            elem_dict[element.Value()][attr.Name()] = attr.Value()
+            content[attr.Name()] = attr.Value()
             attr = attr.Next()
         # Convert child elements
         child = element.FirstChildElement()
-        children = []
         while child:
-            child_dict = element_to_dict(child)
-            tag = child.Value()
-            if tag in elem_dict[element.Value()]:
-                if not isinstance(elem_dict[element.Value()][tag], list):
-                    elem_dict[element.Value()][tag] = [elem_dict[element.Value()][tag]]
-                elem_dict[element.Value()][tag].append(child_dict[tag])
-            else:
-                elem_dict[element.Value()].update(child_dict)
+            add_child(content, child.Value(), element_to_dict(child))
             child = child.NextSiblingElement()
         # Convert text
-        if element.GetText():
-            elem_dict[element.Value()]["text"] = element.GetText()
-        return elem_dict
+        text = element.GetText()
+        if text and text.strip():
+            content["#text"] = text.strip()
+        close_element(content)
+        return content
 
     root = xml_doc.RootElement()
-    root_content = element_to_dict(root)
-    flatten_json(root_content)
-    return json.dumps(root_content, indent=4)
-
+    root_content = {root.Value(): element_to_dict(root)}
+    close_element(root_content)
+    return root_content
 
-# Function to convert JSON back to XML using tinyxml2
-def json_to_xml(json_str):
-    json_obj = json.loads(json_str)
 
-    xml_doc = tinyxml2.XMLDocument()
-    root_tag, root_content = list(json_obj.items())[0]
-    root_elem = xml_doc.NewElement(root_tag)
-    xml_doc.InsertFirstChild(root_elem)
-    dict_to_element(xml_doc, root_elem, root_content)
-
-    buffer = tinyxml2.XMLPrinter()
-    xml_doc.Print(buffer)
-    return buffer.CStr()
+def xml_to_json(xml_str):
+    return json.dumps(xml_to_dict(xml_str), indent=4)
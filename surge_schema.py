@@ -0,0 +1,197 @@
+"""
+Typed decoding of Surge patch XML.
+
+Parameters are mapped to a fixed SurgeSchema (name -> column) and decoded into
+flat float64 arrays, with modulation routings in a separate columnar table:
+
+    schema = SurgeSchema.from_patches(xml_strings)
+    matrix = decode_many(xml_strings, schema)
+    matrix.values[:, schema.index["a_env1_attack"]]
+    matrix.modrouting[matrix.modrouting["depth"] > 0.5]
+
+Both Surge's own layout (<a_env1_attack type="2" value="..."> with
+<modrouting source=".." depth=".." .../> children) and the dict-style layout
+of test.xml (values in child elements, routings under modrouting/item) are read.
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+from lxml import etree
+
+MODROUTING_DTYPE = np.dtype(
+    [
+        ("patch", "i4"),
+        ("param", "i4"),
+        ("source", "i4"),
+        ("source_index", "i4"),
+        ("depth", "f8"),
+        ("muted", "i1"),
+    ]
+)
+
+
+def _parse(xml: Union[str, bytes]):
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    root = etree.fromstring(xml)
+    parameters = root if root.tag == "parameters" else root.find(".//parameters")
+    if parameters is None:
+        raise ValueError("No <parameters> element in patch XML")
+    return parameters
+
+
+def _field(elem, name: str) -> Optional[str]:
+    # A child element wins over an attribute: in the dict-style layout the
+    # attribute "type" is the container type and <type> is the value we want
+    child = elem.find(name)
+    if child is not None:
+        return (child.text or "").strip()
+    return elem.get(name)
+
+
+def _routings(param):
+    for modrouting in param.iterfind("modrouting"):
+        items = modrouting.findall("item")
+        if items:
+            yield from items
+        else:
+            yield modrouting
+
+
+class SurgeSchema:
+    """Ordered parameter names; index maps each name to its column."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str) -> int:
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    @staticmethod
+    def from_patches(xmls: Iterable[Union[str, bytes]]) -> "SurgeSchema":
+        """Union of parameter names over xmls, in first-seen order."""
+        schema = SurgeSchema()
+        for xml in xmls:
+            for param in _parse(xml):
+                if isinstance(param.tag, str):
+                    schema.add(param.tag)
+        return schema
+
+
+class DecodedPatch:
+    """
+    One patch against a schema. values/types are indexed by schema column;
+    parameters missing from the patch are NaN with type -1.
+    """
+
+    def __init__(self, schema: SurgeSchema):
+        self.schema = schema
+        n = len(schema)
+        self.values = array("d", [math.nan]) * n
+        self.types = array("b", [-1]) * n
+        # Modrouting table, one entry per routing, as parallel columns
+        self.mod_param = array("i")
+        self.mod_source = array("i")
+        self.mod_source_index = array("i")
+        self.mod_depth = array("d")
+        self.mod_muted = array("b")
+
+    def __getitem__(self, name: str) -> float:
+        return self.values[self.schema.index[name]]
+
+    def modrouting(self, patch: int = 0) -> np.ndarray:
+        table = np.empty(len(self.mod_param), dtype=MODROUTING_DTYPE)
+        table["patch"] = patch
+        table["param"] = np.frombuffer(self.mod_param, dtype=np.intc)
+        table["source"] = np.frombuffer(self.mod_source, dtype=np.intc)
+        table["source_index"] = np.frombuffer(self.mod_source_index, dtype=np.intc)
+        table["depth"] = np.frombuffer(self.mod_depth, dtype=np.float64)
+        table["muted"] = np.frombuffer(self.mod_muted, dtype=np.int8)
+        return table
+
+
+def decode_patch(
+    xml: Union[str, bytes], schema: SurgeSchema, extend: bool = False
+) -> DecodedPatch:
+    """
+    Decode one patch. Parameters not in schema are skipped, or added to it
+    when extend is True.
+    """
+    parameters = _parse(xml)
+    if extend:
+        for param in parameters:
+            if isinstance(param.tag, str):
+                schema.add(param.tag)
+    patch = DecodedPatch(schema)
+    index = schema.index
+    for param in parameters:
+        i = index.get(param.tag)
+        if i is None:
+            continue
+        value = _field(param, "value")
+        if value is not None:
+            patch.values[i] = float(value)
+        type_ = _field(param, "type")
+        if type_ is not None and type_.lstrip("-").isdigit():
+            patch.types[i] = int(type_)
+        for routing in _routings(param):
+            patch.mod_param.append(i)
+            patch.mod_source.append(int(_field(routing, "source") or 0))
+            patch.mod_source_index.append(int(_field(routing, "source_index") or 0))
+            patch.mod_depth.append(float(_field(routing, "depth") or 0.0))
+            patch.mod_muted.append(int(_field(routing, "muted") or 0))
+    return patch
+
+
+class SurgeMatrix:
+    """
+    Many patches against one schema: values[i, j] is parameter j of patch i,
+    modrouting is a MODROUTING_DTYPE table whose "patch" column is i.
+    """
+
+    def __init__(
+        self,
+        schema: SurgeSchema,
+        values: np.ndarray,
+        types: np.ndarray,
+        modrouting: np.ndarray,
+    ):
+        self.schema = schema
+        self.values = values
+        self.types = types
+        self.modrouting = modrouting
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.schema.index[name]]
+
+
+def decode_many(xmls: Iterable[Union[str, bytes]], schema: SurgeSchema) -> SurgeMatrix:
+    """Decode patches into one (n_patches, len(schema)) matrix."""
+    rows = []
+    type_rows = []
+    tables = []
+    for i, xml in enumerate(xmls):
+        patch = decode_patch(xml, schema)
+        rows.append(np.frombuffer(patch.values, dtype=np.float64))
+        type_rows.append(np.frombuffer(patch.types, dtype=np.int8))
+        tables.append(patch.modrouting(i))
+    n = len(schema)
+    values = np.vstack(rows) if rows else np.empty((0, n))
+    types = np.vstack(type_rows) if type_rows else np.empty((0, n), dtype=np.int8)
+    modrouting = (
+        np.concatenate(tables) if tables else np.empty(0, dtype=MODROUTING_DTYPE)
+    )
+    return SurgeMatrix(schema, values, types, modrouting)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backends import available_backends
+from fxppreset import DEFAULT_BACKEND, FXP, PatchHeader
+
+# The XML samples shipped with the repo
+SAMPLES = ("test.xml", "test2.xml", "test3.xml")
+
+
+def sample_bytes(name: str) -> bytes:
+    with open(os.path.join(ROOT, name), "rb") as f:
+        return f.read()
+
+
+def make_fxp_bytes(
+    xml: bytes,
+    wavetables: bytes = b"",
+    prgName: str = "Test",
+    byteSize: int = 0,
+) -> bytes:
+    """A complete .fxp file around xml, with wavetables as its opaque tail."""
+    chunkSize = 32 + len(xml) + len(wavetables)
+    fxp = FXP(
+        b"CcnK",
+        byteSize and 52 + chunkSize,
+        b"FPCh",
+        1,
+        int.from_bytes(b"cjs3", "big"),
+        1,
+        1,
+        prgName,
+        chunkSize,
+        PatchHeader(b"sub3", len(xml), 0, 0, 0, 0, 0, 0),
+        xml,
+        [wavetables],
+    )
+    return fxp.to_bytes()
+
+
+@pytest.fixture(scope="session")
+def backend() -> str:
+    """A canonical backend that is installed, FXP's default if it is."""
+    names = available_backends(canonical=True)
+    if not names:
+        pytest.skip("no canonical XML backend installed")
+    return DEFAULT_BACKEND if DEFAULT_BACKEND in names else names[0]
@@ -0,0 +1,88 @@
+import importlib.util
+import io
+import json
+import sys
+
+import pytest
+
+from backends import Backend, available_backends, backend_names, get_backend
+from xml_writer import detect_style
+
+TEXT_XML = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n'
+    b'<patch revision="16">\n'
+    b'<meta name="Init" category="Basic" />\n'
+    b"<notes>Slow attack &amp; a long &lt;release&gt;</notes>\n"
+    b'<parameters>\n<a_pitch type="2" value="0.5" />\n</parameters>\n'
+    b"</patch>\n"
+)
+
+
+def _round_trip_exact():
+    return [
+        name
+        for name in backend_names()
+        if get_backend(name).capabilities["round_trip_exact"]
+    ]
+
+
+@pytest.mark.parametrize("name", _round_trip_exact())
+def test_round_trip_exact_keeps_text(name):
+    backend = get_backend(name)
+    if not backend.available:
+        pytest.skip(f"{name} is not installed")
+    json_str = backend.xml_to_json(TEXT_XML)
+    tree = json.loads(json_str)
+    assert tree["patch"]["notes"] == {"#text": "Slow attack & a long <release>"}
+    assert backend.json_to_xml_bytes(json_str, detect_style(TEXT_XML)) == TEXT_XML
+
+
+def test_availability_does_not_import():
+    backend = Backend("fxp2json_test_backend", requires=("no_such_module",))
+    assert not backend.available
+    assert "no_such_module" not in sys.modules
+
+
+def test_requires_only_what_is_imported(monkeypatch):
+    find_spec = importlib.util.find_spec
+    if find_spec("xmltodict") is None:
+        pytest.skip("xmltodict is not installed")
+    # As if lxml were not installed
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda name, *args: None if name == "lxml" else find_spec(name, *args),
+    )
+    for name, available in (("xmltodict_json", True), ("lxml_etree_json", False)):
+        # Fresh, never imported: availability comes from requires alone
+        backend = Backend(name, requires=get_backend(name).requires)
+        assert backend.available == available, name
+
+
+def test_unknown_names():
+    with pytest.raises(KeyError):
+        get_backend("no_such_backend")
+    with pytest.raises(ValueError):
+        Backend("fxp2json_test_backend", fast=True)
+
+
+def test_filter_by_capability():
+    for name in available_backends(streaming=True):
+        assert get_backend(name).capabilities["streaming"]
+    assert set(available_backends()) <= set(backend_names())
+
+
+@pytest.mark.parametrize("name", backend_names())
+def test_every_input_type(name):
+    backend = get_backend(name)
+    if not backend.available:
+        pytest.skip(f"{name} is not installed")
+    expected = backend.xml_to_json(TEXT_XML.decode("utf-8"))
+    for xml in (
+        TEXT_XML,
+        bytearray(TEXT_XML),
+        memoryview(TEXT_XML),
+        io.BytesIO(TEXT_XML),
+    ):
+        assert backend.xml_to_json(xml) == expected, type(xml).__name__
+    assert backend.xml_to_dict(memoryview(TEXT_XML)) == json.loads(expected)
@@ -0,0 +1,96 @@
+import asyncio
+import io
+import time
+
+import pytest
+
+import fxpasync
+from benchmark import synthetic_patch_xml
+from conftest import make_fxp_bytes, sample_bytes
+from fxpasync import AsyncConverter, convert_library, read_source, write_target
+from fxppreset import FXP
+
+
+@pytest.fixture
+def converter(monkeypatch):
+    # The shared converter, with fewer slots than the tasks below
+    converter = AsyncConverter(max_concurrency=2)
+    monkeypatch.setattr(fxpasync, "_converter", converter)
+    return converter
+
+
+def test_converter_survives_new_event_loops(converter):
+    async def contend():
+        return await asyncio.gather(
+            *(converter.run(time.sleep, 0.01) for _ in range(6))
+        )
+
+    # Each asyncio.run() is a new loop; the semaphore must not be the first's
+    for _ in range(2):
+        assert asyncio.run(contend()) == [None] * 6
+
+
+def test_async_round_trip(converter, backend):
+    data = make_fxp_bytes(sample_bytes("test2.xml"))
+
+    async def round_trip():
+        fxps = await asyncio.gather(
+            *(FXP.aload(io.BytesIO(data), backend) for _ in range(4))
+        )
+        jsons = await asyncio.gather(*(fxp.ajson() for fxp in fxps))
+        out = io.BytesIO()
+        await fxps[0].asave(out)
+        return jsons, out.getvalue()
+
+    for _ in range(2):
+        jsons, out = asyncio.run(round_trip())
+        assert len(set(jsons)) == 1
+        assert out == data
+
+
+def test_convert_library_twice(converter, backend, tmp_path):
+    for i in range(3):
+        xml = synthetic_patch_xml(20, seed=i).encode("utf-8")
+        (tmp_path / "src").mkdir(exist_ok=True)
+        (tmp_path / "src" / f"p{i}.fxp").write_bytes(make_fxp_bytes(xml))
+    for run in range(2):
+        summary = asyncio.run(
+            convert_library(
+                str(tmp_path / "src"), str(tmp_path / f"out{run}"), backend=backend
+            )
+        )
+        assert (summary.converted, summary.failed) == (3, 0)
+
+
+class _AsyncStream:
+    def __init__(self, data=b""):
+        self.data = data
+
+    async def read(self):
+        return self.data
+
+    async def write(self, data):
+        self.data += data
+
+
+def test_sources_and_targets(tmp_path):
+    async def go():
+        path = tmp_path / "f.bin"
+        await write_target(str(path), b"file")
+        stream = _AsyncStream()
+        await write_target(stream, b"async")
+        sync = io.BytesIO()
+        await write_target(sync, b"sync")
+        return [
+            await read_source(str(path)),
+            await read_source(stream),
+            await read_source(io.BytesIO(sync.getvalue())),
+            await read_source(memoryview(b"view")),
+        ]
+
+    assert [bytes(d) for d in asyncio.run(go())] == [
+        b"file",
+        b"async",
+        b"sync",
+        b"view",
+    ]
@@ -0,0 +1,66 @@
+import pytest
+
+from conftest import make_fxp_bytes, sample_bytes
+from fxpbank import FXB, FXBReader, join_programs, split_bank
+from fxppreset import FXP, FXPReader
+
+
+@pytest.fixture
+def programs(backend):
+    return [
+        FXP.from_bytes(
+            make_fxp_bytes(sample_bytes(name), bytes([i]) * 100, prgName=f"P{i}"),
+            backend,
+        )
+        for i, name in enumerate(["test2.xml", "test3.xml", "test2.xml"])
+    ]
+
+
+def test_bank_round_trip(backend, programs, tmp_path):
+    path = str(tmp_path / "bank.fxb")
+    FXB.from_programs(programs, backend).save(path)
+    with FXBReader(path) as reader:
+        assert reader.names == ["P0", "P1", "P2"]
+        for i, program in enumerate(programs):
+            assert bytes(reader.program_view(i)) == program.to_bytes()
+    with FXB.load(path, backend) as bank:
+        assert len(bank) == 3
+        assert bank[1].to_bytes() == programs[1].to_bytes()
+
+
+def test_edit_and_save_over_the_source(backend, programs, tmp_path):
+    path = str(tmp_path / "bank.fxb")
+    FXB.from_programs(programs, backend).save(path)
+    bank = FXB.load(path, backend)
+    bank[1].set_param("a_pitch", value="2")
+    del bank[0]
+    bank.append(programs[0])
+    bank.save(path)
+    bank.close()
+    with FXB.load(path, backend) as saved:
+        assert saved.names == ["P1", "P2", "P0"]
+        params = saved[0].json_tree["patch"]["parameters"]
+        assert params["a_pitch"]["value"] == "2"
+        assert saved[1].to_bytes() == programs[2].to_bytes()
+
+
+def test_split_and_join(backend, programs, tmp_path):
+    path = str(tmp_path / "bank.fxb")
+    FXB.from_programs(programs, backend).save(path)
+    files = split_bank(path, str(tmp_path / "split"))
+    assert len(files) == 3
+    joined = str(tmp_path / "joined.fxb")
+    join_programs(files, joined)
+    with open(path, "rb") as a, open(joined, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_program_files_are_rejected(programs):
+    with pytest.raises(AssertionError):
+        FXBReader(programs[0].to_bytes())
+
+
+def test_fxp_reader_rejects_banks(backend, programs):
+    bank = FXB.from_programs(programs[:1], backend)
+    with pytest.raises(ValueError, match="FXB"):
+        FXPReader(bank.to_bytes())
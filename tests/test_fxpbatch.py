@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+import validation
+from benchmark import synthetic_patch_xml
+from conftest import make_fxp_bytes
+from fxpbatch import convert_library, iter_files, main, resolve_backend
+
+
+@pytest.fixture
+def library(tmp_path):
+    src = tmp_path / "src"
+    for i, sub in enumerate(["a", "a", "b/c"]):
+        (src / sub).mkdir(parents=True, exist_ok=True)
+        xml = synthetic_patch_xml(20, seed=i).encode("utf-8")
+        (src / sub / f"p{i}.fxp").write_bytes(make_fxp_bytes(xml, bytes([i]) * 64))
+    return src
+
+
+def test_round_trip_is_byte_exact(backend, library, tmp_path):
+    summary = convert_library(
+        str(library), str(tmp_path / "json"), max_workers=2, backend=backend
+    )
+    assert (summary.converted, summary.failed) == (3, 0)
+    summary = convert_library(
+        str(tmp_path / "json"),
+        str(tmp_path / "fxp"),
+        reverse=True,
+        max_workers=1,
+        max_in_flight=1,
+        backend=backend,
+    )
+    assert summary.converted == 3
+    for src_path in iter_files(str(library), ".fxp"):
+        rel = os.path.relpath(src_path, library)
+        with open(src_path, "rb") as a, open(tmp_path / "fxp" / rel, "rb") as b:
+            assert a.read() == b.read()
+
+
+def test_a_bad_file_does_not_stop_the_run(backend, library, tmp_path):
+    (library / "a" / "bad.fxp").write_bytes(b"junk")
+    summary = convert_library(
+        str(library), str(tmp_path / "json"), max_workers=1, backend=backend
+    )
+    assert (summary.converted, summary.failed) == (3, 1)
+    assert summary.errors[0][0].endswith("bad.fxp")
+
+
+def test_profile(backend, library, tmp_path):
+    summary = convert_library(
+        str(library),
+        str(tmp_path / "json"),
+        max_workers=1,
+        profile=True,
+        backend=backend,
+    )
+    assert len(summary.recorder.records) == 3
+
+
+def test_backend_must_be_installed(backend):
+    assert resolve_backend(backend) == backend
+    with pytest.raises(KeyError):
+        resolve_backend("no_such_backend")
+    with pytest.raises(SystemExit):
+        main(["--backend", "no_such_backend", "src", "dst"])
+
+
+def test_cli_defaults_to_boundary(backend, library, tmp_path, monkeypatch):
+    monkeypatch.delenv(validation.ENV_VAR, raising=False)
+    previous = validation.validation_level()
+    try:
+        assert main(["--backend", backend, str(library), str(tmp_path / "a")]) == 0
+        assert validation.validation_level() == validation.BOUNDARY
+        # Exported, for workers that start from scratch
+        assert os.environ[validation.ENV_VAR] == validation.BOUNDARY
+        monkeypatch.setenv(validation.ENV_VAR, "off")
+        main(["--backend", backend, str(library), str(tmp_path / "b")])
+        assert validation.validation_level() == validation.OFF
+        main(
+            ["--validation", "full", "--backend", backend, str(library), str(tmp_path)]
+        )
+        assert validation.validation_level() == validation.FULL
+    finally:
+        validation.set_validation_level(previous)
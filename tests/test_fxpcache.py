@@ -0,0 +1,73 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from fxpcache import ConversionCache, content_key
+
+
+def test_memory_lru():
+    cache = ConversionCache(maxsize=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"  # a is now the most recent
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats.memory_evictions == 1
+    assert (cache.stats.memory_hits, cache.stats.misses) == (3, 1)
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    ConversionCache(directory=str(tmp_path)).put("k" * 40, '{"a": 1}')
+    cache = ConversionCache(directory=str(tmp_path))
+    assert cache.get("k" * 40) == '{"a": 1}'
+    assert cache.stats.disk_hits == 1
+
+
+def test_replacing_an_entry_counts_its_bytes_once(tmp_path):
+    cache = ConversionCache(directory=str(tmp_path), max_disk_bytes=10_000)
+    for _ in range(20):
+        cache.put("k" * 40, "x" * 1000)
+    assert cache._disk_bytes == 1000
+    assert cache.stats.disk_evictions == 0
+
+
+def test_disk_eviction_keeps_the_newest(tmp_path):
+    cache = ConversionCache(maxsize=1, directory=str(tmp_path), max_disk_bytes=5000)
+    keys = [f"{i:02d}" * 20 for i in range(6)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 1000)
+        os.utime(cache._disk_path(key), (i, i))
+    assert cache.stats.disk_evictions > 0
+    assert cache._disk_bytes <= 5000
+    assert os.path.exists(cache._disk_path(keys[-1]))
+    assert not os.path.exists(cache._disk_path(keys[0]))
+
+
+def test_threads_keep_the_books(tmp_path):
+    cache = ConversionCache(maxsize=4, directory=str(tmp_path), max_disk_bytes=6000)
+    keys = [f"{i:02d}" * 20 for i in range(10)]
+
+    def work(n):
+        for i in range(200):
+            key = keys[(n + i) % len(keys)]
+            if cache.get(key) is None:
+                cache.put(key, "x" * 500)
+
+    interval = sys.getswitchinterval()
+    # Switch threads as often as possible, to give races a chance
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(work, range(8)))
+    finally:
+        sys.setswitchinterval(interval)
+    stats = cache.stats
+    assert stats.hits + stats.misses == 8 * 200
+    on_disk = sum(size for _, _, size in cache._disk_entries())
+    assert cache._disk_bytes == on_disk <= 6000
+
+
+def test_content_key_depends_on_backend():
+    assert content_key(b"<a />", "x") == content_key("<a />", "x")
+    assert content_key(b"<a />", "x") != content_key(b"<a />", "y")
@@ -0,0 +1,33 @@
+import os
+
+from conftest import make_fxp_bytes, sample_bytes
+from fxpcatalog import Catalog, build_catalog
+
+
+def test_incremental_update(tmp_path):
+    root = tmp_path / "lib"
+    (root / "sub").mkdir(parents=True)
+    xml = sample_bytes("test2.xml")
+    for i, rel in enumerate(["a.fxp", "sub/b.fxp"]):
+        (root / rel).write_bytes(make_fxp_bytes(xml, prgName=f"Patch {i}"))
+    index = str(tmp_path / "index.npy")
+
+    catalog = build_catalog(str(root), index)
+    assert len(catalog) == 2
+    assert sorted(catalog.records["prgName"].tolist()) == ["Patch 0", "Patch 1"]
+    assert (catalog.records["xmlSize"] == len(xml)).all()
+    assert len(catalog.query(chunkmagic=b"CcnK", fxVersion=1)) == 2
+
+    # Nothing changed: no header is read again
+    catalog = Catalog.load(index)
+    assert catalog.update(str(root)) == 0 and len(catalog) == 2
+
+    (root / "a.fxp").write_bytes(make_fxp_bytes(xml, b"\0" * 8, prgName="Changed"))
+    os.remove(root / "sub" / "b.fxp")
+    (root / "bad.fxp").write_bytes(b"junk")
+    assert catalog.update(str(root)) == 1
+    assert catalog.records["prgName"].tolist() == ["Changed"]
+    assert catalog.paths(catalog.records["chunkSize"] > 32 + len(xml)) == [
+        str(root / "a.fxp")
+    ]
+    assert [os.path.basename(path) for path, _ in catalog.errors] == ["bad.fxp"]
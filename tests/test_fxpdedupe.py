@@ -0,0 +1,80 @@
+import re
+
+import pytest
+
+from backends import get_backend
+from benchmark import synthetic_patch_xml
+from conftest import make_fxp_bytes
+from fxpdedupe import DedupeIndex, canonical_hash, features, index_library
+
+
+@pytest.fixture(scope="module")
+def trees(backend):
+    parse = get_backend(backend).xml_to_dict
+    base = synthetic_patch_xml(300)
+    values = iter(range(10**6))
+    return {
+        "base": parse(base),
+        # Another name, tabs, attributes reordered, numbers respelled
+        "renamed": parse(base.replace('name="Synthetic 0"', 'name="Copy"')),
+        "tabs": parse(base.replace("    ", "\t")),
+        "reordered": parse(
+            re.sub(r'type="(\d)" value="([^"]*)"', r'value="\2" type="\1"', base)
+        ),
+        "respelled": parse(base.replace('muted="1"', 'muted="1.000"')),
+        # A handful of parameters changed
+        "tweaked": parse(
+            re.sub(
+                r'value="(-?\d+\.\d+)"',
+                lambda m: f'value="{float(m.group(1)) + 5 * (next(values) % 40 == 0)}"',
+                base,
+            )
+        ),
+        "other": parse(synthetic_patch_xml(300, seed=1)),
+    }
+
+
+def test_canonical_hash_ignores_name_and_formatting(trees):
+    digest = canonical_hash(trees["base"])
+    for name in ("renamed", "tabs", "reordered", "respelled"):
+        assert canonical_hash(trees[name]) == digest, name
+    assert canonical_hash(trees["tweaked"]) != digest
+
+
+def test_features_quantize_numbers():
+    tree = {"patch": {"parameters": {"a": {"value": "0.50123"}}}}
+    assert features(tree) == {"patch/parameters/a@value=0.5"}
+    assert features(tree, digits=4) == {"patch/parameters/a@value=0.5012"}
+
+
+def test_index(trees):
+    index = DedupeIndex()
+    for name, tree in trees.items():
+        index.add(name, tree)
+    assert len(index) == len(trees)
+    assert index.exact_duplicates() == [
+        ["base", "renamed", "tabs", "reordered", "respelled"]
+    ]
+    (near,) = index.near_duplicates()
+    assert set(near) == set(trees) - {"other"}
+    matches = dict(index.query(trees["tweaked"]))
+    assert "other" not in matches and matches["tweaked"] == 1.0
+
+
+def test_banding():
+    assert DedupeIndex().lsh_threshold == pytest.approx(0.707, abs=0.001)
+    assert DedupeIndex(num_bands=32).lsh_threshold < 0.5
+    with pytest.raises(ValueError):
+        DedupeIndex(num_bands=7)
+
+
+def test_index_library(backend, tmp_path):
+    xml = synthetic_patch_xml(50).encode("utf-8")
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.fxp").write_bytes(make_fxp_bytes(xml, prgName=name))
+    (tmp_path / "bad.fxp").write_bytes(b"junk")
+    index, errors = index_library(str(tmp_path), backend=backend, max_workers=1)
+    assert [path for path, _ in errors] == [str(tmp_path / "bad.fxp")]
+    assert [sorted(keys) for keys in index.exact_duplicates()] == [
+        [str(tmp_path / "a.fxp"), str(tmp_path / "b.fxp")]
+    ]
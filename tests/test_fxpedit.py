@@ -0,0 +1,92 @@
+import pytest
+
+from backends import get_backend
+from conftest import sample_bytes
+from fxpedit import ParamEditor, index_params
+
+INDENTED = (
+    b"<patch>\n\t<parameters>\n"
+    b'\t\t<a type="2" value="1" />\n'
+    b'\t\t<b type="2" value="2">\n\t\t\t<modrouting source="1" />\n\t\t</b>\n'
+    b"\t</parameters>\n</patch>\n"
+)
+
+
+def test_unedited_is_unchanged():
+    for xml in (sample_bytes("test2.xml"), sample_bytes("test3.xml"), INDENTED):
+        assert ParamEditor(xml).apply() == xml
+
+
+def test_newline_only_layout():
+    xml = sample_bytes("test2.xml")
+    editor = ParamEditor(xml)
+    editor.add_modrouting("a_pitch", source=5, depth=0.5)
+    out = editor.apply()
+    routing = b'<modrouting source="5" depth="0.5" muted="0" source_index="0" />'
+    assert b'source_index="0" />\n' + routing + b"\n</a_pitch>" in out
+    assert out.replace(routing + b"\n", b"") == xml
+
+
+def test_compact_layout_stays_compact():
+    xml = sample_bytes("test3.xml")
+    editor = ParamEditor(xml)
+    editor.add_modrouting("a_pitch", source=5, depth=0.5)
+    out = editor.apply()
+    assert out.count(b"\n") == xml.count(b"\n")
+    assert b'source_index="0" /></a_pitch>' in out
+
+
+def test_indented_layout():
+    editor = ParamEditor(INDENTED)
+    editor.add_modrouting("a", source=3, depth=0.25)
+    editor.add_modrouting("b", source=4, depth=0.75)
+    assert editor.apply() == (
+        b"<patch>\n\t<parameters>\n"
+        b'\t\t<a type="2" value="1">\n'
+        b'\t\t\t<modrouting source="3" depth="0.25" muted="0" source_index="0" />\n'
+        b"\t\t</a>\n"
+        b'\t\t<b type="2" value="2">\n\t\t\t<modrouting source="1" />\n'
+        b'\t\t\t<modrouting source="4" depth="0.75" muted="0" source_index="0" />\n'
+        b"\t\t</b>\n\t</parameters>\n</patch>\n"
+    )
+
+
+def test_set_param(backend):
+    editor = ParamEditor(sample_bytes("test2.xml"))
+    editor.set_param("a_pitch", value=1.25, extend_range=True, temposync=0)
+    tree = get_backend(backend).xml_to_dict(editor.apply())
+    param = tree["patch"]["parameters"]["a_pitch"]
+    assert (param["value"], param["extend_range"], param["temposync"]) == (
+        "1.25",
+        "1",
+        "0",
+    )
+
+
+def test_quoted_angle_bracket():
+    xml = b'<p><parameters><a name="x > y" value="1" /><b value="2" /></parameters></p>'
+    assert list(index_params(xml)) == ["a", "b"]
+    editor = ParamEditor(xml)
+    editor.set_param("a", value="3 < 4")
+    assert editor.apply() == xml.replace(b'value="1"', b'value="3 &lt; 4"')
+
+
+def test_either_quote_style():
+    xml = b"<p><parameters><a name='value=\"0\"' value='1' /></parameters></p>"
+    editor = ParamEditor(xml)
+    editor.set_param("a", value=2)
+    assert editor.apply() == xml.replace(b"value='1'", b'value="2"')
+
+
+def test_control_characters(backend):
+    editor = ParamEditor(sample_bytes("test2.xml"))
+    editor.set_param("a_pitch", value="1\t2\r\n3")
+    tree = get_backend(backend).xml_to_dict(editor.apply())
+    assert tree["patch"]["parameters"]["a_pitch"]["value"] == "1\t2\r\n3"
+    with pytest.raises(ValueError):
+        editor.set_param("a_pitch", value="\x01")
+
+
+def test_unknown_parameter():
+    with pytest.raises(KeyError):
+        ParamEditor(sample_bytes("test2.xml")).set_param("nope", value=1)
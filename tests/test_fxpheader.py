@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from conftest import make_fxp_bytes, sample_bytes
+from fxpheader import (
+    FXP_HEADER,
+    PATCH_HEADER_SIZE,
+    RAW_FIELDS,
+    XML_OFFSET,
+    PatchHeader,
+    read_headers,
+)
+
+
+def test_patch_header_round_trip():
+    header = PatchHeader(b"sub3", 100, 1, 2, 3, 4, 5, 6)
+    data = header.to_bytes
+    assert len(data) == PATCH_HEADER_SIZE
+    assert PatchHeader.unpack_from(b"\0" + data, 1).fields == header.fields
+    assert header.wavetableSizes == [[1, 2, 3], [4, 5, 6]]
+
+
+def test_read_headers(tmp_path):
+    data = make_fxp_bytes(sample_bytes("test2.xml"), prgName="One")
+    paths = [str(tmp_path / name) for name in ("a.fxp", "short.fxp", "missing.fxp")]
+    (tmp_path / "a.fxp").write_bytes(data)
+    (tmp_path / "short.fxp").write_bytes(data[:50])
+
+    # Into a bytearray, after one slot already in use
+    out = bytearray(b"\xff" * (4 * XML_OFFSET))
+    errors = read_headers(paths, out, start=1)
+    assert [i for i, _ in errors] == [1, 2]
+    assert errors[0][1].startswith("ValueError") and "FileNotFound" in errors[1][1]
+    assert out[:XML_OFFSET] == b"\xff" * XML_OFFSET
+    assert out[XML_OFFSET : 2 * XML_OFFSET] == data[:XML_OFFSET]
+    assert out[2 * XML_OFFSET :] == bytes(2 * XML_OFFSET)
+
+    # Into a structured array, decoded column-wise
+    raw = np.zeros(1, dtype=RAW_FIELDS)
+    assert read_headers(paths[:1], raw) == []
+    fields = FXP_HEADER.unpack_from(data)
+    assert raw["chunkmagic"][0] == fields[0] and raw["chunkSize"][0] == fields[-1]
+    assert raw["prgName"][0] == b"One"
+    assert raw["xmlSize"][0] == len(sample_bytes("test2.xml"))
+
+    with pytest.raises(ValueError):
+        read_headers(paths, bytearray(XML_OFFSET))
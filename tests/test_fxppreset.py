@@ -0,0 +1,78 @@
+import io
+import json
+
+import pytest
+
+from conftest import make_fxp_bytes, sample_bytes
+from fxppreset import FXP, FXPReader
+
+WAVETABLES = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize("name", ["test2.xml", "test3.xml"])
+def test_load_save_is_byte_exact(backend, tmp_path, name):
+    data = make_fxp_bytes(sample_bytes(name), WAVETABLES)
+    path = tmp_path / "preset.fxp"
+    path.write_bytes(data)
+    fxp = FXP.load(str(path), backend)
+    out = io.BytesIO()
+    fxp.save(out)
+    assert out.getvalue() == data
+    assert fxp.prgName == "Test"
+    assert fxp.wavetables == [WAVETABLES]
+
+
+@pytest.mark.parametrize("name", ["test2.xml", "test3.xml"])
+def test_json_document_round_trip(backend, name):
+    data = make_fxp_bytes(sample_bytes(name), WAVETABLES)
+    doc = FXP.from_bytes(data, backend).to_json_document()
+    assert FXP.from_json_document(doc, backend).to_bytes() == data
+
+
+def test_json_document_recomputes_sizes(backend):
+    data = make_fxp_bytes(sample_bytes("test2.xml"), WAVETABLES, byteSize=1)
+    fxp = FXP.from_bytes(data, backend)
+    tree = fxp.json_tree
+    tree["patch"]["meta"]["name"] = "A much longer name than the original one"
+    fxp.json = json.dumps(tree)
+    rebuilt = FXP.from_json_document(fxp.to_json_document(), backend)
+    out = rebuilt.to_bytes()
+    assert rebuilt.byteSize == len(out) - 8
+    assert rebuilt.chunkSize == len(out) - 60
+    assert rebuilt.patchHeader.xmlSize == len(out) - 92 - len(WAVETABLES)
+
+
+def test_set_param_keeps_the_rest(backend):
+    xml = sample_bytes("test2.xml")
+    fxp = FXP.from_bytes(make_fxp_bytes(xml), backend)
+    fxp.set_param("a_pitch", value="1.5")
+    out = FXP.from_bytes(fxp.to_bytes(), backend)
+    assert out.json_tree["patch"]["parameters"]["a_pitch"]["value"] == "1.5"
+    assert out.xmlBytes == xml.replace(b'"0.00000000000000"', b'"1.5"')
+
+
+def test_reader_reads_headers_only():
+    data = make_fxp_bytes(sample_bytes("test2.xml"), WAVETABLES, prgName="Tuba")
+    with FXPReader(data) as reader:
+        assert reader.prgName == "Tuba"
+        assert reader.patchHeader.xmlSize == len(sample_bytes("test2.xml"))
+        assert bytes(reader.wavetable_view) == WAVETABLES
+
+
+def test_reader_rejects_bad_input(tmp_path):
+    data = bytearray(make_fxp_bytes(sample_bytes("test2.xml")))
+    with pytest.raises(ValueError):
+        FXPReader(bytes(data[:50]))
+    data[28:32] = b"\xff\xfe\xff\xfe"  # prgName is not UTF-8
+    path = tmp_path / "bad.fxp"
+    path.write_bytes(data)
+    with pytest.raises(UnicodeDecodeError):
+        FXPReader(str(path))
+
+
+def test_bytes_in_json_documents_out(backend):
+    data = make_fxp_bytes(sample_bytes("test2.xml"))
+    fxp = FXP.from_bytes(memoryview(data), backend)
+    doc = fxp.to_json_document()
+    assert FXP.from_json_document(doc.encode("utf-8"), backend).to_bytes() == data
+    assert fxp.json_tree == json.loads(fxp.json)
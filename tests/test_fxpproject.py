@@ -0,0 +1,60 @@
+import io
+
+import pytest
+
+pytest.importorskip("lxml")
+
+import fxpproject
+from backends import get_backend
+from benchmark import synthetic_patch_xml
+from conftest import make_fxp_bytes
+from fxppreset import FXP
+from fxpproject import param_values, project, project_files
+
+XML = synthetic_patch_xml(40, seed=1).encode("utf-8")
+
+
+def test_same_subtrees_as_a_full_parse(backend):
+    tree = get_backend(backend).xml_to_dict(XML)["patch"]
+    parameters = tree["parameters"]
+    names = list(parameters)[::7]
+    targets = names + ["patch/meta", "/patch/revision", "no_such_param"]
+    result = project(io.BytesIO(XML), targets)
+    for name in names:
+        assert result[name] == parameters[name], name
+    assert result["patch/meta"] == tree["meta"]
+    # An attribute, not an element
+    assert result["/patch/revision"] is None
+    assert result["no_such_param"] is None
+
+    routings = project(XML, ["patch/parameters/*/modrouting"])
+    assert routings["patch/parameters/*/modrouting"] == {
+        f"patch/parameters/{name}/modrouting": value["modrouting"]
+        for name, value in parameters.items()
+        if value and "modrouting" in value
+    }
+
+
+def test_param_values():
+    name = "a_osc1_pitch0"
+    expected = float(project(XML, [name])[name]["value"])
+    assert param_values(XML.decode("utf-8"), [name, "nope"]) == {
+        name: expected,
+        "nope": None,
+    }
+
+
+def test_stops_early(monkeypatch):
+    monkeypatch.setattr(fxpproject, "CHUNK_SIZE", 64)
+    # Anything after the target is never parsed
+    broken = XML.replace(b"</parameters>", b"<<<") + b"<" * 1000
+    assert project(broken, ["a_osc1_pitch0"]) == project(XML, ["a_osc1_pitch0"])
+
+
+def test_project_files_and_fxp(backend, tmp_path):
+    path = tmp_path / "p.fxp"
+    path.write_bytes(make_fxp_bytes(XML))
+    [(source, result)] = project_files([str(path)], ["patch/meta"])
+    assert source == str(path) and result["patch/meta"]["author"] == "benchmark"
+    fxp = FXP.load(str(path), backend)
+    assert fxp.project(["patch/meta"]) == result
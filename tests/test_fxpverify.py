@@ -0,0 +1,53 @@
+import pytest
+
+from backends import available_backends
+from conftest import SAMPLES, make_fxp_bytes, sample_bytes
+from fxpverify import BackendResult, compare_results, verify_files, verify_xml
+
+
+@pytest.fixture(scope="module")
+def canonical():
+    names = available_backends(canonical=True)
+    if len(names) < 2:
+        pytest.skip("needs two canonical backends")
+    return names
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_canonical_backends_agree(canonical, sample):
+    report = verify_xml(sample_bytes(sample), canonical)
+    assert report.ok, str(report)
+    assert report.reference == canonical[0]
+    assert all(result.seconds > 0 for result in report.results.values())
+
+
+def test_first_divergence_and_errors():
+    results = {
+        "a": BackendResult("a", {"p": {"x": ["1", "2"]}}),
+        "b": BackendResult("b", {"p": {"x": ["1", "3"]}}),
+        "c": BackendResult("c", error="Traceback\nValueError: broken\n"),
+        "d": BackendResult("d", {"p": {"x": ["1", "2"]}}),
+    }
+    report = compare_results(results, reference="d")
+    assert not report.ok
+    assert list(report.differences) == ["b"]
+    assert report.differences["b"].path == ["p", "x", 1]
+    assert report.errors == {"c": results["c"].error}
+    assert "c raised ValueError: broken" in str(report)
+    pairwise = compare_results(results, pairwise=True)
+    assert sorted(pairwise.differences) == ["a vs b", "b vs d"]
+
+
+def test_verify_files(canonical, tmp_path):
+    xml = sample_bytes("test2.xml")
+    (tmp_path / "a.xml").write_bytes(xml)
+    (tmp_path / "b.fxp").write_bytes(make_fxp_bytes(xml))
+    (tmp_path / "bad.fxp").write_bytes(b"junk")
+    paths = [str(tmp_path / name) for name in ("a.xml", "b.fxp", "bad.fxp")]
+    reports = {
+        report.source: report
+        for report in verify_files(paths, canonical, max_workers=1, max_in_flight=1)
+    }
+    assert reports[paths[0]].ok and reports[paths[1]].ok
+    assert set(reports[paths[2]].errors) == set(canonical)
+    assert list(reports[paths[1]].results) == canonical
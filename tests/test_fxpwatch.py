@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from benchmark import synthetic_patch_xml
+from conftest import make_fxp_bytes
+from fxpwatch import IN_CLOSE_WRITE, Inotify, Mirror
+
+
+@pytest.fixture
+def library(tmp_path):
+    src = tmp_path / "src"
+    for i, sub in enumerate(["a", "a", "b"]):
+        (src / sub).mkdir(parents=True, exist_ok=True)
+        xml = synthetic_patch_xml(20, seed=i).encode("utf-8")
+        (src / sub / f"p{i}.fxp").write_bytes(make_fxp_bytes(xml))
+    return src
+
+
+@pytest.fixture
+def mirror(backend, library, tmp_path):
+    with Mirror(
+        str(library), str(tmp_path / "dst"), max_workers=1, backend=backend
+    ) as m:
+        yield m
+
+
+def test_sync_converts_only_changes(mirror, library):
+    assert mirror.sync().converted == 3
+    assert mirror.sync().total == 0
+    with open(mirror.mirror_path(str(library / "a" / "p0.fxp"))) as f:
+        assert json.load(f)["patch"]["patch"]["meta"]["name"] == "Synthetic 0"
+    os.utime(library / "a" / "p0.fxp", ns=(1, 1))
+    summary = mirror.sync()
+    assert (summary.total, summary.unchanged) == (0, 1)
+
+
+def test_state_survives_a_restart(mirror, library, backend):
+    mirror.sync()
+    with Mirror(mirror.src_dir, mirror.dst_dir, backend=backend) as again:
+        assert len(again.state) == 3
+        assert again.sync().total == 0
+
+
+def test_deleted_presets_leave_the_mirror(mirror, library):
+    mirror.sync()
+    os.remove(library / "b" / "p2.fxp")
+    summary = mirror.update([str(library / "b" / "p2.fxp")])
+    assert summary.removed == 1
+    assert not os.path.exists(os.path.join(mirror.dst_dir, "b"))
+
+
+def test_failed_conversion_drops_the_stale_mirror(mirror, library):
+    mirror.sync()
+    preset = library / "a" / "p1.fxp"
+    good = preset.read_bytes()
+    preset.write_bytes(b"junk")
+    summary = mirror.update([str(preset)])
+    assert summary.failed == 1
+    assert not os.path.exists(mirror.mirror_path(str(preset)))
+    assert mirror.sync().total == 0
+    preset.write_bytes(good)
+    assert mirror.update([str(library / "a")]).converted == 1
+
+
+def _wait_for(inotify, path, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for event_path, mask in inotify.read(0.1):
+            if event_path == path and mask & IN_CLOSE_WRITE:
+                return True
+    return False
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify")
+def test_inotify_follows_moved_directories(tmp_path):
+    src = tmp_path / "src"
+    (src / "a" / "sub").mkdir(parents=True)
+    (tmp_path / "outside").mkdir()
+    inotify = Inotify(str(src))
+    try:
+        os.rename(src / "a", src / "b")
+        (src / "b" / "sub" / "p.fxp").write_bytes(b"x")
+        assert _wait_for(inotify, str(src / "b" / "sub" / "p.fxp"))
+        assert sorted(inotify.dirs.values()) == [
+            str(src),
+            str(src / "b"),
+            str(src / "b" / "sub"),
+        ]
+        # Out of the tree: its watches go
+        os.rename(src / "b", tmp_path / "outside" / "b")
+        (tmp_path / "outside" / "b" / "sub" / "q.fxp").write_bytes(b"x")
+        assert not _wait_for(inotify, str(src / "b" / "sub" / "q.fxp"), 0.5)
+        assert list(inotify.dirs.values()) == [str(src)]
+    finally:
+        inotify.close()
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from conftest import sample_bytes
+from fxppreset import FXP, FXPReader, PatchHeader
+from fxpwavetables import (
+    WT_HEADER,
+    WT_MAGIC,
+    WTF_INT16,
+    split_wavetables,
+    stack_library,
+)
+
+
+def wavetable_block(n_tables: int, n_samples: int, int16: bool = False) -> bytes:
+    count = n_tables * n_samples
+    if int16:
+        samples = (np.arange(count, dtype="<i2") * 8).tobytes()
+    else:
+        samples = np.linspace(-1, 1, count, dtype="<f4").tobytes()
+    flags = WTF_INT16 if int16 else 0
+    return WT_HEADER.pack(WT_MAGIC, n_samples, n_tables, flags) + samples
+
+
+def make_fxp(blocks) -> FXP:
+    """A preset with blocks[scene][osc] (bytes or None) as its wavetables."""
+    xml = sample_bytes("test2.xml")
+    sizes = [[len(b) if b else 0 for b in row] for row in blocks]
+    region = b"".join(b for row in blocks for b in row if b)
+    header = PatchHeader(b"sub3", len(xml), *sizes[0], *sizes[1])
+    return FXP(
+        b"CcnK",
+        0,
+        b"FPCh",
+        1,
+        int.from_bytes(b"cjs3", "big"),
+        1,
+        1,
+        "Wavetables",
+        32 + len(xml) + len(region),
+        header,
+        xml,
+        [region],
+    )
+
+
+def test_decode():
+    fxp = make_fxp(
+        [[wavetable_block(2, 8), None, None], [None, wavetable_block(3, 4, True), None]]
+    )
+    first, second = fxp.decode_wavetables()
+    assert (first.scene, first.osc, first.samples.shape) == (0, 0, (2, 8))
+    assert (second.scene, second.osc, second.samples.shape) == (1, 1, (3, 4))
+    assert second.is_int16 and second.to_float32()[0, 1] == 8 / 16384
+    assert first.to_float32()[0, 0] == -1
+    # Views of the region, not copies
+    assert not first.samples.flags.owndata
+
+
+def test_resized_wavetable_updates_wtsize():
+    fxp = make_fxp([[wavetable_block(2, 8), None, wavetable_block(1, 4)], [None] * 3])
+    fxp.wavetables = [wavetable_block(4, 16) + wavetable_block(1, 4)]
+    fxp.mark_dirty()
+    data = fxp.to_bytes()
+    with FXPReader(data) as reader:
+        sizes = reader.patchHeader.wavetableSizes
+        assert sizes == [[WT_HEADER.size + 4 * 16 * 4, 0, WT_HEADER.size + 16], [0] * 3]
+        wavetables = split_wavetables(reader.patchHeader, bytes(reader.wavetable_view))
+        assert [wt.samples.shape for wt in wavetables] == [(4, 16), (1, 4)]
+        assert reader.chunkSize == len(data) - 60
+
+
+def test_leftover_bytes_are_rejected():
+    fxp = make_fxp([[wavetable_block(1, 4), None, None], [None] * 3])
+    fxp.wavetables = [wavetable_block(1, 4) + b"\0\0"]
+    fxp.mark_dirty()
+    with pytest.raises(ValueError):
+        fxp.to_bytes()
+
+
+def test_stack_library(tmp_path):
+    paths = []
+    for i, blocks in enumerate(
+        [
+            [[wavetable_block(2, 8), None, None], [None, wavetable_block(1, 16), None]],
+            [[None] * 3, [wavetable_block(3, 8, True), None, None]],
+        ]
+    ):
+        path = str(tmp_path / f"p{i}.fxp")
+        make_fxp(blocks).save(path)
+        paths.append(path)
+    tables, index = stack_library(paths, n_samples=8)
+    assert tables.shape == (5, 8)
+    assert index["file"].tolist() == [0, 0, 1, 1, 1]
+    assert index["scene"].tolist() == [0, 0, 1, 1, 1]
+    assert index["table"].tolist() == [0, 1, 0, 1, 2]
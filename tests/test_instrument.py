@@ -0,0 +1,62 @@
+import pytest
+
+import instrument
+from conftest import make_fxp_bytes, sample_bytes
+from fxppreset import FXP
+from instrument import Histogram, Recorder
+
+
+@pytest.fixture
+def recorder():
+    sunk = []
+    yield instrument.enable(Recorder(sink=sunk.append)), sunk
+    instrument.disable()
+
+
+def test_off_is_a_shared_no_op():
+    assert not instrument.enabled()
+    assert instrument.stage("parse") is instrument.record("x")
+
+
+def test_load_convert_save(recorder, backend, tmp_path):
+    recorder, sunk = recorder
+    path = tmp_path / "p.fxp"
+    data = make_fxp_bytes(sample_bytes("test2.xml"))
+    path.write_bytes(data)
+    with instrument.record(str(path)):
+        fxp = FXP.load(str(path), backend)
+        fxp.json
+        # Nested: counted in the outer record, not a record of its own
+        fxp.save(str(tmp_path / "out.fxp"))
+    assert sunk == list(recorder.records) and len(sunk) == 1
+    stages = sunk[0]["stages"]
+    assert sunk[0]["source"] == str(path)
+    assert stages["read"]["bytes"] == len(data)
+    assert {"header", "serialize", "write"} <= set(stages)
+    assert recorder.histograms["file"].count == 1
+    assert recorder.histograms["read"].bytes == len(data)
+    assert "read" in recorder.summary()
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for us in [1] * 98 + [1000, 100000]:
+        histogram.add(us / 1e6)
+    assert histogram.percentile(50) <= 2e-6
+    assert histogram.percentile(99) >= 1e-3
+    assert histogram.percentile(100) == histogram.max_seconds == 0.1
+
+
+def test_records_from_elsewhere():
+    recorder = Recorder(max_records=1)
+    for source in ("a", "b"):
+        recorder.add_record(
+            {
+                "source": source,
+                "seconds": 0.5,
+                "stages": {"parse": {"seconds": 0.25, "bytes": 10}},
+            }
+        )
+    assert [r["source"] for r in recorder.records] == ["b"]
+    assert recorder.histograms["parse"].bytes == 20
+    assert recorder.to_dict()["histograms"]["file"]["count"] == 2
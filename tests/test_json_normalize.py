@@ -0,0 +1,43 @@
+import pytest
+
+from backends import available_backends, get_backend
+from fxpverify import verify_xml
+from json_normalize import first_difference, json_equal, normalize
+
+EMPTY_SIBLINGS = b'<patch><p><b/><b/></p><q><c/><c x="1"/></q></patch>'
+
+
+def test_comparison_is_strict_about_shape():
+    assert first_difference({"a": {}}, {"a": None}) is not None
+    assert first_difference({"a": [1]}, {"a": 1}) is not None
+    assert not json_equal('{"a": {}}', '{"a": null}')
+
+
+def test_key_order_is_ignored():
+    assert json_equal('{"a": 1, "b": [1, 2]}', '{"b": [1, 2], "a": 1}')
+
+
+def test_normalize_then_compare():
+    assert json_equal(normalize({"a": [{}]}), normalize({"a": None}))
+
+
+def test_normalize_empty_list_items():
+    assert normalize({"a": [{}, {"b": {}}]}) == {"a": [None, {"b": None}]}
+
+
+@pytest.mark.parametrize("name", available_backends(canonical=True))
+def test_repeated_empty_siblings(name):
+    assert get_backend(name).xml_to_dict(EMPTY_SIBLINGS) == {
+        "patch": {"p": {"b": [None, None]}, "q": {"c": [None, {"x": "1"}]}}
+    }
+
+
+def test_canonical_backends_agree_on_empty_siblings():
+    report = verify_xml(EMPTY_SIBLINGS, available_backends(canonical=True))
+    assert report.ok, str(report)
+
+
+def test_difference_path():
+    difference = first_difference({"a": [1, {"b": "x"}]}, {"a": [1, {"b": "y"}]})
+    assert difference.path == ["a", 1, "b"]
+    assert difference.path_str == "$.a[1].b"
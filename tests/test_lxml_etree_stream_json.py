@@ -0,0 +1,34 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from conftest import SAMPLES, sample_bytes
+from lxml_etree_iterparse_json import xml_to_json as tree_to_json
+from lxml_etree_stream_json import xml_to_json_stream
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+@pytest.mark.parametrize("spool_size", [1, 1 << 20])
+def test_same_tree_as_iterparse(sample, spool_size):
+    xml = sample_bytes(sample)
+    out = io.StringIO()
+    # spool_size=1 spills every pending sibling to a temporary file
+    xml_to_json_stream(io.BytesIO(xml), out, spool_size=spool_size)
+    assert json.loads(out.getvalue()) == json.loads(tree_to_json(xml))
+
+
+def test_runs_and_singles():
+    xml = b'<p a="1"><x/><x v="2"/><y>t</y><z><x/></z></p>'
+    out = io.StringIO()
+    xml_to_json_stream(io.BytesIO(xml), out, spool_size=1)
+    assert json.loads(out.getvalue()) == {
+        "p": {"x": [None, {"v": "2"}], "y": {"#text": "t"}, "z": {"x": None}, "a": "1"}
+    }
+
+
+def test_rejects_split_runs():
+    with pytest.raises(ValueError):
+        xml_to_json_stream(io.BytesIO(b"<p><x/><y/><x/></p>"), io.StringIO())
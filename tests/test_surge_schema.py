@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("lxml")
+
+from conftest import SAMPLES, sample_bytes
+from surge_schema import SurgeSchema, decode_many, decode_patch
+
+SURGE = (
+    b"<patch><parameters>"
+    b'<a_pitch type="2" value="0.5">'
+    b'<modrouting source="3" depth="0.25" muted="1" source_index="2" />'
+    b'<modrouting source="4" depth="-1" />'
+    b"</a_pitch>"
+    b'<a_octave type="0" value="-1" />'
+    b"</parameters></patch>"
+)
+DICT_STYLE = (
+    b'<patch><parameters><a_pitch type="dict"><type>2</type><value>0.75</value>'
+    b'<modrouting type="list"><item type="dict"><source>7</source>'
+    b"<depth>0.5</depth></item></modrouting>"
+    b"</a_pitch></parameters></patch>"
+)
+
+
+def test_both_layouts():
+    schema = SurgeSchema(["a_pitch"])
+    patch = decode_patch(SURGE, schema)
+    # Not in the schema, so skipped
+    assert len(schema) == 1 and patch["a_pitch"] == 0.5
+    assert patch.types.tolist() == [2]
+    table = patch.modrouting()
+    assert table[["source", "source_index", "depth", "muted"]].tolist() == [
+        (3, 2, 0.25, 1),
+        (4, 0, -1.0, 0),
+    ]
+    patch = decode_patch(DICT_STYLE, schema)
+    assert patch["a_pitch"] == 0.75 and patch.types.tolist() == [2]
+    assert patch.modrouting()[["source", "depth"]].tolist() == [(7, 0.5)]
+
+
+def test_decode_many():
+    schema = SurgeSchema.from_patches([SURGE, DICT_STYLE])
+    assert schema.names == ["a_pitch", "a_octave"]
+    matrix = decode_many([DICT_STYLE, SURGE], schema)
+    assert matrix.column("a_pitch").tolist() == [0.75, 0.5]
+    assert math.isnan(matrix.values[0, 1]) and matrix.types[0, 1] == -1
+    assert matrix.modrouting["patch"].tolist() == [0, 1, 1]
+    empty = decode_many([], schema)
+    assert empty.values.shape == (0, 2) and len(empty.modrouting) == 0
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+def test_samples(sample):
+    xml = sample_bytes(sample)
+    schema = SurgeSchema()
+    patch = decode_patch(xml, schema, extend=True)
+    assert len(schema) > 0
+    assert np.isfinite(np.frombuffer(patch.values)).any()
+
+
+def test_no_parameters():
+    with pytest.raises(ValueError):
+        decode_patch(b"<patch/>", SurgeSchema())
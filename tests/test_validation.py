@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import validation
+from validation import BOUNDARY, FULL, OFF, set_validation_level, validated
+
+
+@validated(boundary=("entry",))
+class Thing:
+    def entry(self, x: int) -> int:
+        return x
+
+    def internal(self, x: int) -> int:
+        return x
+
+    @property
+    def size(self) -> int:
+        return "big"
+
+    @staticmethod
+    def static(x: int) -> int:
+        return x
+
+
+@validated(boundary=True)
+def public(x: int) -> int:
+    return x
+
+
+@pytest.fixture
+def level():
+    previous = validation.validation_level()
+    yield set_validation_level
+    set_validation_level(previous)
+
+
+def _raises(func, *args) -> bool:
+    from typeguard import TypeCheckError
+
+    try:
+        func(*args)
+    except TypeCheckError:
+        return True
+    return False
+
+
+def test_levels(level):
+    thing = Thing()
+    calls = {
+        "entry": lambda: thing.entry("a"),
+        "internal": lambda: thing.internal("a"),
+        "property": lambda: thing.size,
+        "static": lambda: Thing.static("a"),
+        # Through the module global, as a caller would
+        "function": lambda: globals()["public"]("a"),
+    }
+    expected = {
+        OFF: set(),
+        BOUNDARY: {"entry", "function"},
+        FULL: set(calls),
+    }
+    # Down and back up again: members swap both ways
+    for name in (FULL, OFF, BOUNDARY, FULL, BOUNDARY):
+        level(name)
+        assert {c for c, call in calls.items() if _raises(call)} == expected[name]
+
+
+def test_unknown_level(level):
+    with pytest.raises(ValueError):
+        level("strict")
+
+
+def test_off_does_not_import_typeguard(tmp_path):
+    code = (
+        "import sys\n"
+        "from conftest import make_fxp_bytes, sample_bytes\n"
+        "from fxppreset import FXP\n"
+        "FXP.from_bytes(make_fxp_bytes(sample_bytes('test2.xml'))).to_bytes()\n"
+        "print('typeguard' in sys.modules)\n"
+    )
+    tests = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, FXP2JSON_VALIDATION=OFF, PYTHONPATH=tests)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,61 @@
+import pytest
+
+from backends import available_backends, get_backend
+from conftest import SAMPLES, sample_bytes
+from xml_writer import SURGE_STYLE, XMLStyle, detect_style, dict_to_xml_bytes, escape
+
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_round_trip_is_byte_exact(backend, name):
+    xml = sample_bytes(name)
+    tree = get_backend(backend).xml_to_dict(xml)
+    assert dict_to_xml_bytes(tree, detect_style(xml)) == xml
+
+
+@pytest.mark.parametrize("name", available_backends(canonical=True))
+def test_attribute_and_child_with_one_name(name):
+    xml = b'<a type="dict" x="1"><type type="str">2</type></a>'
+    tree = get_backend(name).xml_to_dict(xml)
+    assert tree == {
+        "a": {"@type": "dict", "x": "1", "type": {"type": "str", "#text": "2"}}
+    }
+    assert [k for k, v in tree["a"].items() if type(v) is str] == ["@type", "x"]
+    style = XMLStyle(declaration=None, indent="", newline="", final_newline=False)
+    assert dict_to_xml_bytes(tree, style) == xml
+
+
+def test_detect_style():
+    assert detect_style(sample_bytes("test.xml")) == XMLStyle(
+        declaration='<?xml version="1.0" ?>', indent="\t"
+    )
+    assert detect_style(sample_bytes("test2.xml")) == SURGE_STYLE
+    compact = detect_style(sample_bytes("test3.xml"))
+    assert (compact.indent, compact.newline, compact.final_newline) == ("", "", True)
+
+
+def test_default_style_is_surges(backend):
+    xml = sample_bytes("test2.xml")
+    assert dict_to_xml_bytes(get_backend(backend).xml_to_dict(xml)) == xml
+
+
+def test_escaped_values_parse_back(backend):
+    name = "a<b & \"c\" 'd'\tz"
+    tree = {"patch": {"meta": {"name": name}, "#text": "x > y"}}
+    xml = dict_to_xml_bytes(tree)
+    assert b"&lt;" in xml and b"&#x09;" in xml
+    parsed = get_backend(backend).xml_to_dict(xml)
+    assert parsed["patch"]["meta"]["name"] == name
+    assert parsed["patch"]["#text"] == "x > y"
+
+
+def test_escape_passes_plain_text_through():
+    assert escape("plain") == "plain"
+    assert escape("<&>") == "&lt;&amp;&gt;"
+
+
+def test_lists_none_and_scalars():
+    tree = {"a": {"n": 1, "f": 0.5, "t": True, "b": [None, {"x": "1"}], "c": None}}
+    style = XMLStyle(declaration=None, indent="", newline="", final_newline=False)
+    assert dict_to_xml_bytes(tree, style) == (
+        b'<a n="1" f="0.5" t="true"><b /><b x="1" /><c /></a>'
+    )
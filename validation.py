@@ -0,0 +1,217 @@
+"""
+Runtime type checking (typeguard) that can be turned down or off.
+
+Levels:
+    off       nothing is instrumented and typeguard is not even imported
+    boundary  only the public entry points (FXP.load, FXP.save, ...)
+    full      every annotated function and method of the decorated classes
+
+The level comes from the FXP2JSON_VALIDATION environment variable (default
+"full"; the batch command-line tools default to "boundary", see
+use_validation_level()) and can be changed at runtime with
+set_validation_level(). Changing
+it swaps instrumented and plain functions on the decorated classes and
+modules, so references taken with "from module import function" before the
+change keep the old behavior. Checked members are instrumented one at a
+time, on first use, so importing costs the same at every level.
+
+    @validated                     # checked at "full"
+    class PatchHeader: ...
+
+    @validated(boundary=("load", "save"))
+    class FXP: ...                 # load/save checked from "boundary" up
+
+    @validated(boundary=True)
+    def xml_to_json(...): ...
+"""
+
+import functools
+import os
+import sys
+from types import FunctionType
+from typing import Dict, List, Optional, Tuple, Union
+
+OFF = "off"
+BOUNDARY = "boundary"
+FULL = "full"
+LEVELS = (OFF, BOUNDARY, FULL)
+ENV_VAR = "FXP2JSON_VALIDATION"
+
+
+def _parse_level(level: str) -> str:
+    level = level.strip().lower()
+    if level not in LEVELS:
+        raise ValueError(
+            f"Unknown validation level {level!r}, expected one of {LEVELS}"
+        )
+    return level
+
+
+_level: str = _parse_level(os.environ.get(ENV_VAR, FULL))
+
+
+def _instrumentable(value, owner: type) -> bool:
+    function = value.fget if isinstance(value, property) else value
+    if isinstance(function, (staticmethod, classmethod)):
+        function = function.__func__
+    # Only what the class itself defines: typeguard finds it by qualname
+    return (
+        isinstance(function, FunctionType)
+        and function.__module__ == owner.__module__
+        and function.__qualname__.startswith(owner.__qualname__ + ".")
+    )
+
+
+def _instrument_member(value):
+    # Imported here, on the first checked call, so "off" never loads typeguard
+    from typeguard import typechecked
+
+    if isinstance(value, property):
+        return property(
+            *(
+                f if f is None else typechecked(f)
+                for f in (value.fget, value.fset, value.fdel)
+            ),
+            value.__doc__,
+        )
+    return typechecked(value)
+
+
+class _Target:
+    """A decorated class or function, with its plain and instrumented members."""
+
+    def __init__(self, target, boundary: Union[bool, Tuple[str, ...]]):
+        self.target = target
+        self.boundary = boundary
+        self.is_class = isinstance(target, type)
+        if self.is_class:
+            self.plain: Dict[str, object] = {
+                name: value
+                for name, value in vars(target).items()
+                if _instrumentable(value, target)
+            }
+        else:
+            self.plain = {target.__name__: target}
+        # Instrumented one member at a time, when first called: typeguard
+        # recompiles the whole module source for each, which would otherwise
+        # be paid at import time (and again in every worker process)
+        self.checked: Dict[str, object] = {}
+        # What apply() last installed, per member
+        self.installed: Dict[str, object] = {}
+
+    def _checked(self, name: str, level: str) -> bool:
+        if level == FULL:
+            return True
+        if level == BOUNDARY:
+            return self.boundary is True or name in (self.boundary or ())
+        return False
+
+    def _instrument(self, name: str):
+        member = self.checked.get(name)
+        if member is None:
+            member = self.checked[name] = _instrument_member(self.plain[name])
+        return member
+
+    def _deferred(self, name: str):
+        """Stand-in for a checked member that instruments it on first use."""
+        value = self.plain[name]
+
+        def resolve():
+            checked = self._instrument(name)
+            if self.installed.get(name) is stand_in:
+                self._install(name, checked)
+            return checked
+
+        if isinstance(value, property):
+            stand_in = property(
+                value.fget and (lambda obj: resolve().fget(obj)),
+                value.fset and (lambda obj, v: resolve().fset(obj, v)),
+                value.fdel and (lambda obj: resolve().fdel(obj)),
+                value.__doc__,
+            )
+            return stand_in
+        if isinstance(value, (staticmethod, classmethod)):
+
+            @functools.wraps(value.__func__)
+            def deferred(*args, **kwargs):
+                return resolve().__func__(*args, **kwargs)
+
+            stand_in = type(value)(deferred)
+            return stand_in
+
+        @functools.wraps(value)
+        def deferred(*args, **kwargs):
+            return resolve()(*args, **kwargs)
+
+        stand_in = deferred
+        return stand_in
+
+    def _install(self, name: str, member) -> None:
+        previous = self.installed.get(name, self.plain[name])
+        self.installed[name] = member
+        if self.is_class:
+            setattr(self.target, name, member)
+            return
+        module = sys.modules.get(self.target.__module__)
+        if module is not None and "." not in self.target.__qualname__:
+            # Rebind the module global; not yet bound while still decorating
+            if getattr(module, name, None) is previous:
+                setattr(module, name, member)
+
+    def apply(self, level: str):
+        """Install the members for level; returns what the decorator should."""
+        for name, plain in self.plain.items():
+            if not self._checked(name, level):
+                member = plain
+            elif name in self.checked:
+                member = self.checked[name]
+            else:
+                member = self._deferred(name)
+            self._install(name, member)
+        if self.is_class:
+            return self.target
+        return self.installed[self.target.__name__]
+
+
+_targets: List[_Target] = []
+
+
+def validated(target=None, *, boundary: Union[bool, Tuple[str, ...]] = ()):
+    """
+    Decorator: typecheck target according to the validation level.
+
+    boundary: for a function, True to check it from "boundary" up; for a
+    class, the names of the methods (and properties) checked from "boundary"
+    up. Everything else is only checked at "full".
+    """
+
+    def decorate(target):
+        entry = _Target(target, boundary)
+        _targets.append(entry)
+        return entry.apply(_level)
+
+    return decorate if target is None else decorate(target)
+
+
+def validation_level() -> str:
+    return _level
+
+
+def set_validation_level(level: str) -> None:
+    """Switch every decorated class and function to level."""
+    global _level
+    _level = _parse_level(level)
+    for entry in _targets:
+        entry.apply(_level)
+
+
+def use_validation_level(level: Optional[str], default: str = FULL) -> str:
+    """
+    For command-line tools: switch to level, else to FXP2JSON_VALIDATION,
+    else to default. The level is exported in FXP2JSON_VALIDATION as well,
+    so worker processes start at it whether forked or spawned.
+    """
+    level = _parse_level(level or os.environ.get(ENV_VAR) or default)
+    os.environ[ENV_VAR] = level
+    set_validation_level(level)
+    return level
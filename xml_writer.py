@@ -0,0 +1,240 @@
+"""
+Direct JSON -> XML serializer for trees in json_normalize's canonical shape.
+
+One pass over the dict, appending cached tag and attribute fragments to a
+list that is joined and encoded once; no DOM is built. Within an element,
+str/int/float/bool members are attributes (in dict order, "@name" written as
+name), dicts, lists and None are child elements and "#text" is the
+element's text.
+
+Output follows an XMLStyle: Surge's own (TinyXML) layout by default, or the
+layout detected from an original document, so an unmodified tree comes back
+byte-for-byte:
+
+    style = detect_style(original_xml_bytes)
+    xml_bytes = dict_to_xml_bytes(tree, style)
+"""
+
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+# Cached fragments, up to this many distinct tag and attribute names each
+FRAGMENT_CACHE_SIZE = 4096
+# Bytes of the document examined by detect_style
+DETECT_SIZE = 4096
+
+
+class XMLStyle(NamedTuple):
+    # Written verbatim before the root element, e.g. '<?xml version="1.0" ?>'
+    declaration: Optional[str] = None
+    # One level of indentation, and the line break after each tag; both ""
+    # for a single-line document
+    indent: str = "    "
+    newline: str = "\n"
+    # How an element with no children or text ends
+    empty_close: str = " />"
+    # Line break after the root element's end tag
+    final_newline: bool = True
+
+
+# What Surge writes: a line per tag, no indentation (see test2.xml)
+SURGE_STYLE = XMLStyle(
+    declaration='<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>',
+    indent="",
+)
+
+_DECLARATION = re.compile(r"<\?xml[^>]*\?>")
+_INDENT = re.compile(r"(\r?\n)([ \t]+)<")
+_EMPTY_CLOSE = re.compile(r"(\s*)/>")
+
+
+def detect_style(xml: Union[str, bytes, bytearray, memoryview]) -> XMLStyle:
+    """The layout of a document, from its first DETECT_SIZE bytes and its end."""
+    if not isinstance(xml, str):
+        view = memoryview(xml)
+        head = str(view[:DETECT_SIZE], "utf-8", "replace")
+        tail = str(view[-2:], "utf-8", "replace")
+    else:
+        head, tail = xml[:DETECT_SIZE], xml[-2:]
+    declaration = _DECLARATION.match(head.lstrip("\ufeff"))
+    indent = _INDENT.search(head)
+    empty_close = _EMPTY_CLOSE.search(head)
+    if indent is not None:
+        newline, indent_unit = indent.groups()
+    elif "\n" in head.rstrip():
+        # Line breaks without indentation
+        newline, indent_unit = ("\r\n" if "\r\n" in head else "\n"), ""
+    else:
+        newline, indent_unit = "", ""
+    return XMLStyle(
+        declaration=declaration.group() if declaration else None,
+        indent=indent_unit,
+        newline=newline,
+        empty_close=" />" if empty_close is None or empty_close.group(1) else "/>",
+        final_newline=tail.endswith("\n"),
+    )
+
+
+# As TinyXML writes them: the five entities, and control characters by number
+_ENTITIES: Dict[str, str] = {
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&apos;",
+}
+_ENTITIES.update({chr(c): f"&#x{c:02X};" for c in range(32)})
+_SPECIAL = re.compile("[&<>\"'\x00-\x1f]")
+_needs_escape = _SPECIAL.search
+
+
+def escape(value: str) -> str:
+    if _needs_escape(value) is None:
+        return value
+    return _SPECIAL.sub(lambda m: _ENTITIES[m.group()], value)
+
+
+_open_tags: Dict[str, str] = {}
+_close_tags: Dict[str, str] = {}
+_attr_prefixes: Dict[str, str] = {}
+
+
+def _fragment(cache: Dict[str, str], name: str, template: str) -> str:
+    fragment = cache.get(name)
+    if fragment is None:
+        fragment = template.format(name)
+        if len(cache) < FRAGMENT_CACHE_SIZE:
+            cache[name] = fragment
+    return fragment
+
+
+def _attr_prefix(name: str) -> str:
+    prefix = _attr_prefixes.get(name)
+    if prefix is None:
+        # "@name" is an attribute that shares its name with a child element
+        prefix = ' {}="'.format(name[1:] if name[:1] == "@" else name)
+        if len(_attr_prefixes) < FRAGMENT_CACHE_SIZE:
+            _attr_prefixes[name] = prefix
+    return prefix
+
+
+def _scalar(value: Any) -> str:
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if type(value) is str:
+        return escape(value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise TypeError(f"Unsupported value type: {type(value)}")
+
+
+def render(tree: dict, style: XMLStyle = SURGE_STYLE) -> List[str]:
+    """The document as a list of str fragments, in order."""
+    assert len(tree) == 1, "The tree must have exactly one root element"
+    indent, newline, empty_close = style.indent, style.newline, style.empty_close
+    parts: List[str] = []
+    append = parts.append
+    if style.declaration is not None:
+        append(style.declaration)
+        append(newline)
+    pads: List[str] = [""]
+
+    # (tag, value, depth) still to write, or a str to append as is. Iterative,
+    # so deep documents cannot hit the recursion limit.
+    stack: List[Any] = [next(iter(tree.items())) + (0,)]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            append(item)
+            continue
+        tag, value, depth = item
+        if depth == len(pads):
+            pads.append(pads[-1] + indent)
+        pad = pads[depth]
+        open_tag = _open_tags.get(tag) or _fragment(_open_tags, tag, "<{}")
+
+        if value is None:
+            append(pad)
+            append(open_tag)
+            append(empty_close)
+            append(newline)
+            continue
+        if type(value) is list:
+            stack.extend((tag, v, depth) for v in reversed(value))
+            continue
+
+        append(pad)
+        append(open_tag)
+        text = None
+        children = None
+        if type(value) is dict:
+            for k, v in value.items():
+                t = type(v)
+                if t is str:
+                    if k == "#text":
+                        text = v
+                        continue
+                    append(_attr_prefixes.get(k) or _attr_prefix(k))
+                    append(escape(v))
+                    append('"')
+                elif t is dict or t is list or v is None:
+                    if children is None:
+                        children = []
+                    children.append((k, v, depth + 1))
+                else:
+                    append(_attr_prefixes.get(k) or _attr_prefix(k))
+                    append(_scalar(v))
+                    append('"')
+        else:
+            # A text-only element, e.g. a str inside a list
+            text = value
+
+        if text is None and children is None:
+            append(empty_close)
+            append(newline)
+            continue
+        close_tag = _close_tags.get(tag) or _fragment(_close_tags, tag, "</{}>")
+        append(">")
+        if text is not None:
+            append(_scalar(text))
+        if children is None:
+            append(close_tag)
+            append(newline)
+            continue
+        append(newline)
+        stack.append(pad + close_tag + newline)
+        children.reverse()
+        stack.extend(children)
+
+    if not style.final_newline and parts and parts[-1] == newline:
+        parts.pop()
+    elif style.final_newline and not newline:
+        # A single-line document that still ends with a line break
+        append("\n")
+    return parts
+
+
+def dict_to_xml_bytes(tree: dict, style: XMLStyle = SURGE_STYLE) -> bytes:
+    return "".join(render(tree, style)).encode("utf-8")
+
+
+def dict_to_xml(tree: dict, style: XMLStyle = SURGE_STYLE) -> str:
+    return "".join(render(tree, style))
+
+
+def write_xml(tree: dict, out, style: XMLStyle = SURGE_STYLE) -> None:
+    """Write the UTF-8 document to out, anything with .write(bytes)."""
+    out.write(dict_to_xml_bytes(tree, style))
+
+
+def json_to_xml_bytes(
+    json_string: Union[str, bytes], style: XMLStyle = SURGE_STYLE
+) -> bytes:
+    return dict_to_xml_bytes(json.loads(json_string), style)
+
+
+def json_to_xml(json_string: Union[str, bytes], style: XMLStyle = SURGE_STYLE) -> str:
+    return dict_to_xml(json.loads(json_string), style)
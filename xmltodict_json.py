@@ -2,10 +2,11 @@ import json
 
 import xmltodict
 
-from lxml_etree_sax_json import simplify_json
 
-
-def xml_to_json(xml_str):
+def xml_to_dict(xml_str):
+    if isinstance(xml_str, (bytearray, memoryview)):
+        # expat takes str, bytes or a file object
+        xml_str = bytes(xml_str)
     # Parse the XML to an ordered dictionary
     parsed_dict = xmltodict.parse(
         # xml_str, dict_constructor=dict, attr_prefix="", force_list=True
@@ -13,8 +14,12 @@ def xml_to_json(xml_str):
         dict_constructor=dict,
         attr_prefix="",
     )
-    # simplify_json(parsed_dict)
-    return json.dumps(parsed_dict, indent=4)
+    # normalize(parsed_dict)
+    return parsed_dict
+
+
+def xml_to_json(xml_str):
+    return json.dumps(xml_to_dict(xml_str), indent=4)
 
 
 def json_to_xml(json_str):